@@ -0,0 +1,50 @@
+import argparse
+
+from filemind.config import DB_PATH
+from filemind.database import DatabaseService
+from filemind.quantization import QUANTIZERS, QUERIES, evaluate
+from filemind.vector_store import RERANK, VectorStoreService
+
+
+# -------------------- RAPPEL / MEMOIRE DES INDEX COMPRESSES --------------------
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare rappel@k et mémoire des représentations compressées "
+        "(float16, int8, PQ) sur les vecteurs indexés par FileMind."
+    )
+    parser.add_argument("-k", type=int, default=10, help="nombre de résultats")
+    parser.add_argument(
+        "--rerank",
+        type=int,
+        default=RERANK,
+        help="candidats reclassés en float32, en multiple de k",
+    )
+    parser.add_argument(
+        "--queries", type=int, default=QUERIES, help="nombre de requêtes tirées"
+    )
+    parser.add_argument(
+        "--only",
+        nargs="*",
+        choices=list(QUANTIZERS),
+        help="représentations à comparer (toutes par défaut)",
+    )
+    args = parser.parse_args()
+
+    db = DatabaseService.get_instance(db_path=DB_PATH)
+    vector_store = VectorStoreService.get_instance(db, readonly=True)
+    matrix = vector_store.matrix
+    print("[VECTORS]", vector_store.space, matrix.ntotal, "x", matrix.dim)
+    if not matrix.ntotal:
+        return
+
+    quantizers = {
+        n: f for n, f in QUANTIZERS.items() if not args.only or n in args.only
+    }
+    for result in evaluate(
+        matrix, quantizers, k=args.k, rerank=args.rerank, queries=args.queries
+    ):
+        print(result.report())
+
+
+if __name__ == "__main__":
+    main()
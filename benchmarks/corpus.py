@@ -0,0 +1,298 @@
+"""
+Génère une arborescence synthétique déterministe pour les benchmarks de FileMind :
+texte, CSV/JSON, petits PDF (texte extractible), PNG/JPEG avec EXIF,
+WAV valides, MP4 minimaux (piste vidéo sans images, lisible par MediaInfo)
+et MP3 factices, plus une part de copies exactes.
+Usage:
+    python benchmarks/corpus.py /tmp/corpus --files 2000 --seed 0
+"""
+
+import argparse, io, json, random, shutil, struct, wave
+from pathlib import Path
+from typing import NamedTuple
+
+# répartition des fichiers générés par type (poids relatifs)
+MIX = {
+    "txt": 30,
+    "csv": 10,
+    "json": 10,
+    "pdf": 10,
+    "png": 8,
+    "jpg": 8,
+    "wav": 4,
+    "mp3": 4,
+    "mp4": 4,
+}
+
+# part des fichiers qui sont des copies exactes d'un fichier déjà généré
+DUPLICATE_RATIO = 0.05
+
+# nombre de fichiers par dossier (la profondeur suit)
+FILES_PER_DIR = 50
+
+# vocabulaire commun des textes (les mots rares rendent chaque fichier retrouvable)
+WORDS = (
+    "facture électricité contrat banque relevé impôts voyage billet photo vacances "
+    "rapport projet réunion budget client fournisseur devis commande livraison "
+    "planning équipe salaire congés assurance santé médecin ordonnance recette "
+    "cuisine jardin maison travaux loyer quittance école inscription"
+).split()
+
+
+class CorpusFile(NamedTuple):
+    """
+    Fichier généré : chemin, type, mots rares du contenu (None pour les binaires)
+    et original dont c'est une copie exacte.
+    """
+
+    path: str
+    kind: str
+    keywords: list[str] | None
+    copyOf: str | None = None
+
+
+def rare_words(rng: random.Random, n: int = 3) -> list[str]:
+    return [
+        "".join(rng.choice("bcdfghjklmnpqrstvwxz") for _ in range(8)) for _ in range(n)
+    ]
+
+
+def sentence(rng: random.Random, n: int = 12) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(n))
+
+
+def pdf_bytes(lines: list[str], pages: int = 1) -> bytes:
+    """
+    PDF minimal (une police standard, une ligne de texte par page), lisible par pypdf.
+    """
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # pages, rempli une fois les pages connues
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    kids = []
+    for i in range(pages):
+        text = lines[i % len(lines)].encode("latin-1", "replace")
+        text = text.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+        stream = b"BT /F1 12 Tf 72 720 Td (" + text + b") Tj ET"
+        objects.append(
+            b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream)
+        )
+        content = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content
+        )
+        kids.append(b"%d 0 R" % len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(kids), pages)
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for n, obj in enumerate(objects, 1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n%s\nendobj\n" % (n, obj))
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for offset in offsets:
+        out.write(b"%010d 00000 n \n" % offset)
+    out.write(
+        b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+        % (len(objects) + 1, xref)
+    )
+    return out.getvalue()
+
+
+def box(kind: bytes, *payload: bytes) -> bytes:
+    """
+    Boîte ISO BMFF (MP4) : taille, type, contenu.
+    """
+    body = b"".join(payload)
+    return struct.pack(">I", 8 + len(body)) + kind + body
+
+
+def full_box(kind: bytes, flags: int, *payload: bytes) -> bytes:
+    # boîte "complète" : version (0) et drapeaux avant le contenu
+    return box(kind, struct.pack(">I", flags), *payload)
+
+
+def mp4_bytes(width: int, height: int, seconds: int, fps: int = 25) -> bytes:
+    """
+    MP4 minimal : une piste vidéo H.264 déclarée (dimensions, durée, cadence)
+    sans aucune image, dont MediaInfo lit les métadonnées.
+    """
+    timescale = 1000
+    duration = seconds * timescale
+    matrix = struct.pack(">9I", 0x10000, 0, 0, 0, 0x10000, 0, 0, 0, 0x40000000)
+    mvhd = full_box(
+        b"mvhd",
+        0,
+        struct.pack(">4I", 0, 0, timescale, duration),
+        struct.pack(">IH", 0x10000, 0x100),
+        b"\0" * 10,
+        matrix,
+        b"\0" * 24,
+        struct.pack(">I", 2),
+    )
+    tkhd = full_box(
+        b"tkhd",
+        3,  # piste active et utilisée
+        struct.pack(">5I", 0, 0, 1, 0, duration),
+        b"\0" * 16,
+        matrix,
+        struct.pack(">II", width << 16, height << 16),
+    )
+    mdhd = full_box(
+        b"mdhd", 0, struct.pack(">4I", 0, 0, timescale, duration), b"\x55\xc4\0\0"
+    )
+    hdlr = full_box(b"hdlr", 0, b"\0" * 4, b"vide", b"\0" * 12, b"VideoHandler\0")
+    avc1 = box(
+        b"avc1",
+        b"\0" * 6,
+        struct.pack(">H", 1),
+        b"\0" * 16,
+        struct.pack(">HHII", width, height, 0x480000, 0x480000),
+        b"\0" * 4,
+        struct.pack(">H", 1),
+        b"\0" * 32,
+        struct.pack(">Hh", 0x18, -1),
+        box(b"avcC", bytes([1, 0x42, 0, 0x1E, 0xFF, 0xE0, 0])),
+    )
+    stbl = box(
+        b"stbl",
+        full_box(b"stsd", 0, struct.pack(">I", 1), avc1),
+        full_box(b"stts", 0, struct.pack(">3I", 1, seconds * fps, timescale // fps)),
+        full_box(b"stsc", 0, struct.pack(">I", 0)),
+        full_box(b"stsz", 0, struct.pack(">II", 0, 0)),
+        full_box(b"stco", 0, struct.pack(">I", 0)),
+    )
+    dinf = box(
+        b"dinf", full_box(b"dref", 0, struct.pack(">I", 1), full_box(b"url ", 1))
+    )
+    minf = box(b"minf", full_box(b"vmhd", 1, b"\0" * 8), dinf, stbl)
+    trak = box(b"trak", tkhd, box(b"mdia", mdhd, hdlr, minf))
+    return box(b"ftyp", b"isom", struct.pack(">I", 0x200), b"isomavc1") + box(
+        b"moov", mvhd, trak
+    )
+
+
+def write_image(path: Path, rng: random.Random, fmt: str):
+    from PIL import Image
+
+    image = Image.new("RGB", (64, 48), tuple(rng.randrange(256) for _ in range(3)))
+    exif = Image.Exif()
+    exif[0x010F] = "FileMind"  # Make
+    exif[0x0110] = f"Bench-{rng.randrange(100)}"  # Model
+    exif[0x0132] = "2024:01:%02d 12:00:00" % rng.randint(1, 28)  # DateTime
+    image.save(path, format=fmt, exif=exif)
+
+
+def write_wav(path: Path, rng: random.Random, seconds: float = 0.2):
+    rate = 8000
+    with wave.open(str(path), "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(
+            b"".join(
+                struct.pack("<h", rng.randint(-2000, 2000))
+                for _ in range(int(rate * seconds))
+            )
+        )
+
+
+def write_file(path: Path, kind: str, rng: random.Random) -> list[str] | None:
+    """
+    Écrit un fichier du type demandé ; retourne ses mots rares (types textuels).
+    """
+    keywords = rare_words(rng)
+    if kind == "txt":
+        lines = [" ".join(keywords)] + [
+            sentence(rng) for _ in range(rng.randint(3, 30))
+        ]
+        path.write_text("\n".join(lines), encoding="utf-8")
+    elif kind == "csv":
+        rows = ["id,libelle,montant"] + [
+            f"{i},{rng.choice(WORDS)} {keywords[i % 3]},{rng.randint(1, 9999)}"
+            for i in range(rng.randint(5, 50))
+        ]
+        path.write_text("\n".join(rows), encoding="utf-8")
+    elif kind == "json":
+        doc = {
+            "titre": " ".join(keywords),
+            "tags": [rng.choice(WORDS) for _ in range(5)],
+            "lignes": [sentence(rng, 6) for _ in range(rng.randint(2, 10))],
+        }
+        path.write_text(json.dumps(doc, ensure_ascii=False), encoding="utf-8")
+    elif kind == "pdf":
+        lines = [" ".join(keywords) + " " + sentence(rng, 6)] + [
+            sentence(rng) for _ in range(3)
+        ]
+        path.write_bytes(pdf_bytes(lines, pages=rng.randint(1, 8)))
+    elif kind in ("png", "jpg"):
+        write_image(path, rng, "PNG" if kind == "png" else "JPEG")
+        return None
+    elif kind == "wav":
+        write_wav(path, rng)
+        return None
+    elif kind == "mp4":
+        width, height = rng.choice(((320, 240), (640, 360), (1280, 720)))
+        path.write_bytes(mp4_bytes(width, height, rng.randint(1, 600)))
+        return None
+    else:
+        # audio factice : contenu aléatoire, extension seule
+        path.write_bytes(rng.randbytes(rng.randint(256, 4096)))
+        return None
+    return keywords
+
+
+def generate(
+    root: Path,
+    files: int = 1000,
+    seed: int = 0,
+    mix: dict[str, int] = MIX,
+    duplicate_ratio: float = DUPLICATE_RATIO,
+    files_per_dir: int = FILES_PER_DIR,
+) -> list[CorpusFile]:
+    """
+    (Re)crée `root` avec `files` fichiers ; même graine => mêmes octets et mêmes chemins
+    (à l'exception des dates des fichiers).
+    """
+    rng = random.Random(seed)
+    if root.exists():
+        shutil.rmtree(root)
+    kinds, weights = list(mix), list(mix.values())
+    out: list[CorpusFile] = []
+    for i in range(files):
+        directory = root.joinpath(
+            *(f"d{(i // files_per_dir) // 10 ** level % 10}" for level in (1, 0))
+        )
+        directory.mkdir(parents=True, exist_ok=True)
+        if out and rng.random() < duplicate_ratio:
+            original = rng.choice([f for f in out if f.copyOf is None])
+            path = directory / f"copie_{i:06d}{Path(original.path).suffix}"
+            shutil.copyfile(original.path, path)
+            out.append(CorpusFile(str(path), original.kind, None, original.path))
+            continue
+        kind = rng.choices(kinds, weights)[0]
+        path = directory / f"f{i:06d}.{kind}"
+        out.append(CorpusFile(str(path), kind, write_file(path, kind, rng)))
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("root", type=Path)
+    parser.add_argument("--files", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    corpus = generate(args.root, args.files, args.seed)
+    counts = {}
+    for f in corpus:
+        counts[f.kind] = counts.get(f.kind, 0) + 1
+    print("[CORPUS]", args.root, len(corpus), counts)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Temps d'import et mémoire (RSS max) des points d'entrée de FileMind,
+chacun mesuré dans un interpréteur neuf.
+Usage:
+    python benchmarks/import_time.py [-n 5]
+"""
+
+import argparse, json, subprocess, sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# modules importés par chaque point d'entrée
+TARGETS = {
+    "extract": ["filemind.extract"],
+    "search": ["search"],
+    "watcher": ["watcher"],
+}
+
+# dépendances lourdes dont on vérifie qu'elles ne sont pas chargées à l'import
+HEAVY = ["pypdf", "PIL", "tinytag", "pymediainfo", "faiss", "pydantic"]
+
+CHILD = """
+import importlib, json, resource, sys, time
+t0 = time.perf_counter()
+for name in {modules!r}:
+    importlib.import_module(name)
+elapsed = time.perf_counter() - t0
+print(json.dumps({{
+    "ms": elapsed * 1000,
+    "rssKb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    "heavy": [m for m in {heavy!r} if m in sys.modules],
+}}))
+"""
+
+
+def measure(modules: list[str]) -> dict:
+    out = subprocess.run(
+        [sys.executable, "-c", CHILD.format(modules=modules, heavy=HEAVY)],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("-n", type=int, default=5, help="nombre de mesures par cible")
+    args = parser.parse_args()
+
+    for name, modules in TARGETS.items():
+        runs = [measure(modules) for _ in range(args.n)]
+        ms = sorted(r["ms"] for r in runs)
+        print(
+            f"{name:<8} import={ms[len(ms) // 2]:7.1f}ms (min {ms[0]:.1f}) "
+            f"rss={max(r['rssKb'] for r in runs) / 1024:6.1f}MB "
+            f"heavy={','.join(runs[-1]['heavy']) or '-'}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+"""
+Modèle d'embedding factice pour les benchmarks (hors ligne, déterministe) :
+sac de mots haché, normalisé L2. Deux textes partageant des mots rares
+sont proches, ce qui rend le rappel de la recherche mesurable.
+"""
+
+import re, zlib
+import numpy as np
+
+from filemind.embedding_model import EmbeddingModel
+
+# dimension des vecteurs factices
+STUB_DIM = 256
+
+
+class HashingEmbeddingModel(EmbeddingModel):
+    def __init__(self, dim: int = STUB_DIM):
+        super().__init__(None, model_name=f"stub-hashing-{dim}", space="stub")
+        self.dim = dim
+
+    def getDimension(self):
+        return self.dim
+
+    def encode(self, text: str | list[str], normalize_embeddings=True):
+        texts = text if isinstance(text, list) else [text]
+        out = np.zeros((len(texts), self.dim), dtype="float32")
+        for row, t in enumerate(texts):
+            for token in re.findall(r"\w+", t.lower()):
+                h = zlib.crc32(token.encode("utf-8"))
+                out[row, h % self.dim] += 1.0 if h & 1 << 31 else -1.0
+        if normalize_embeddings:
+            norms = np.linalg.norm(out, axis=1, keepdims=True)
+            out /= np.where(norms == 0, 1, norms)
+        return out
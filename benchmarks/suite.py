@@ -0,0 +1,316 @@
+"""
+Suite de benchmarks de FileMind sur un corpus synthétique déterministe, hors ligne
+(modèle d'embedding factice) : parcours initial (scan), débit d'indexation de bout
+en bout, tempête d'événements à travers Handler, latence et rappel de la recherche.
+Les résultats sont écrits en JSON et comparés à une référence.
+Usage:
+    python benchmarks/suite.py --files 2000 --out results.json
+    python benchmarks/suite.py --files 2000 --baseline results.json --tolerance 0.2
+"""
+
+import argparse, json, platform, queue, random, shutil, sys, tempfile, time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from watchdog.events import (
+    FileCreatedEvent,
+    FileDeletedEvent,
+    FileModifiedEvent,
+    FileMovedEvent,
+)
+
+from benchmarks.corpus import CorpusFile, generate
+from benchmarks.stub_model import HashingEmbeddingModel
+from filemind.database import DatabaseService
+from filemind.duplicates import DuplicateFinder
+from filemind.embedding_batcher import EmbeddingBatcher
+from filemind.extract import extractFile
+from filemind.handler import EventCoalescer, Handler, Worker
+from filemind.hybrid_search import HybridSearch
+from filemind.indexer import FILES_TOTAL, STAGE_SECONDS, Indexer
+from filemind.logs import setupLogging
+from filemind.quarantine import QuarantineService
+from filemind.reconcile import reconcile
+from filemind.scheduler import JobScheduler
+from filemind.vector_store import VectorStoreService
+
+# nombre d'événements de la tempête, en multiple du nombre de fichiers
+STORM_FACTOR = 20
+
+# nombre de requêtes de recherche
+QUERIES = 200
+
+# dégradation tolérée par rapport à la référence (0.2 : 20 %)
+TOLERANCE = 0.2
+
+
+class Results:
+    """
+    Mesures d'un passage : [nom] => {value, unit, better ("higher" / "lower")}.
+    """
+
+    def __init__(self, meta: dict):
+        self.meta = meta
+        self.metrics: dict[str, dict] = {}
+
+    def add(self, name: str, value: float, unit: str, better: str = "lower"):
+        self.metrics[name] = {"value": round(value, 6), "unit": unit, "better": better}
+        print(f"  {name:<36} {value:12.3f} {unit}")
+
+    def to_json(self) -> dict:
+        return {"meta": self.meta, "metrics": self.metrics}
+
+
+def percentile(values: list[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else 0.0
+
+
+# -------------------- SCAN INITIAL --------------------
+
+
+def bench_scan(root: Path, db: DatabaseService, results: Results) -> JobScheduler:
+    print("[SCAN]")
+    qjobs = JobScheduler([str(root)], max_backlog=sys.maxsize)
+    t0 = time.perf_counter()
+    stats = reconcile([root], db, qjobs)
+    elapsed = time.perf_counter() - t0
+    files = sum(s.files for s in stats)
+    results.add("scan.seconds", elapsed, "s")
+    results.add("scan.files_per_s", files / elapsed, "files/s", "higher")
+    return qjobs
+
+
+# -------------------- INDEXATION DE BOUT EN BOUT --------------------
+
+
+def bench_index(
+    db: DatabaseService,
+    vector_store: VectorStoreService,
+    qjobs: JobScheduler,
+    workers: int,
+    use_pool: bool,
+    results: Results,
+):
+    print("[INDEX]")
+    embedder = EmbeddingBatcher(vector_store)
+    embedder.start()
+    extraction = None
+    extractor = extractFile
+    if use_pool:
+        from filemind.extract.pool import ExtractionPool
+
+        extraction = ExtractionPool()
+        extractor = extraction.extract
+    indexer = Indexer(
+        db,
+        vector_store,
+        embedder,
+        extractor=extractor,
+        quarantine=QuarantineService.get_instance(db),
+        duplicates=DuplicateFinder(db),
+    )
+
+    jobs = qjobs.qsize()
+    t0 = time.perf_counter()
+    for i in range(workers):
+        Worker(qjobs, indexer, name=f"bench-worker-{i}", daemon=True).start()
+    qjobs.join()
+    embedder.flush()
+    db.flush()
+    elapsed = time.perf_counter() - t0
+    if extraction:
+        extraction.shutdown()
+    embedder.stop()
+    vector_store.saveIndex()
+
+    results.add("index.seconds", elapsed, "s")
+    results.add("index.files_per_s", jobs / elapsed, "files/s", "higher")
+    outcomes = {}
+    for labels, n in FILES_TOTAL.values.items():
+        outcome = dict(labels)["outcome"]
+        outcomes[outcome] = outcomes.get(outcome, 0) + n
+    print("  outcomes", outcomes)
+    for labels, (_, total, n) in sorted(STAGE_SECONDS.series.items()):
+        stage = dict(labels)["stage"]
+        results.add(f"index.stage.{stage}_ms", total * 1000 / max(1, n), "ms/file")
+
+
+# -------------------- TEMPETE D'EVENEMENTS --------------------
+
+
+def storm_events(corpus: list[CorpusFile], n: int, seed: int) -> list:
+    """
+    Rafales réalistes : modifications répétées d'un petit ensemble de fichiers
+    « chauds », créations, renommages et suppressions.
+    """
+    rng = random.Random(seed)
+    paths = [f.path for f in corpus]
+    hot = rng.sample(paths, max(1, len(paths) // 20))
+    events = []
+    for i in range(n):
+        r = rng.random()
+        if r < 0.6:
+            events.append(FileModifiedEvent(rng.choice(hot)))
+        elif r < 0.8:
+            p = rng.choice(paths)
+            events.append(FileCreatedEvent(p + ".new"))
+            events.append(FileModifiedEvent(p + ".new"))
+        elif r < 0.9:
+            p = rng.choice(paths)
+            events.append(FileMovedEvent(p, p + f".{i}.moved"))
+        else:
+            events.append(FileDeletedEvent(rng.choice(paths)))
+    return events
+
+
+def bench_events(corpus: list[CorpusFile], seed: int, results: Results):
+    print("[EVENTS]")
+    events = storm_events(corpus, STORM_FACTOR * len(corpus), seed)
+    out: queue.Queue = queue.Queue()
+    # coalesceur non démarré : tout reste en attente jusqu'au flush (une seule rafale)
+    handler = Handler(out, EventCoalescer(out.put))
+    t0 = time.perf_counter()
+    for event in events:
+        handler.dispatch(event)
+    pushed = time.perf_counter() - t0
+    handler.coalescer.flush()
+    results.add("events.per_s", len(events) / pushed, "events/s", "higher")
+    results.add("events.us_per_event", pushed * 1e6 / len(events), "us")
+    results.add("events.jobs_per_event", out.qsize() / len(events), "ratio")
+
+
+# -------------------- RECHERCHE --------------------
+
+
+def bench_search(
+    db: DatabaseService,
+    vector_store: VectorStoreService,
+    corpus: list[CorpusFile],
+    k: int,
+    seed: int,
+    results: Results,
+):
+    print("[SEARCH]")
+    rng = random.Random(seed)
+    targets = [f for f in corpus if f.keywords]
+    targets = rng.sample(targets, min(QUERIES, len(targets)))
+    hybrid = HybridSearch(db, vector_store)
+    modes = {
+        "text": lambda q: db.searchText(q, k=k),
+        "vector": lambda q: vector_store.search(q, k=k),
+        "hybrid": lambda q: hybrid.search(q, k=k),
+    }
+    for mode, search in modes.items():
+        latencies, hits = [], 0
+        for f in targets:
+            query = " ".join(f.keywords[:2])
+            t0 = time.perf_counter()
+            found = search(query)
+            latencies.append(time.perf_counter() - t0)
+            hits += f.path in {path for path, _ in found}
+        results.add(f"search.{mode}.p50_ms", percentile(latencies, 0.5) * 1000, "ms")
+        results.add(f"search.{mode}.p95_ms", percentile(latencies, 0.95) * 1000, "ms")
+        results.add(
+            f"search.{mode}.recall_at_{k}",
+            hits / max(1, len(targets)),
+            "ratio",
+            "higher",
+        )
+
+
+# -------------------- COMPARAISON A LA REFERENCE --------------------
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list[str]:
+    """
+    Compare deux passages ; retourne les mesures dégradées au-delà de la tolérance.
+    """
+    regressions = []
+    print(f"[COMPARE] tolérance {tolerance:.0%}")
+    for name, base in baseline["metrics"].items():
+        cur = current["metrics"].get(name)
+        if cur is None or not base["value"]:
+            continue
+        ratio = cur["value"] / base["value"]
+        worse = (
+            ratio < 1 - tolerance
+            if base["better"] == "higher"
+            else ratio > 1 + tolerance
+        )
+        flag = "REGRESSION" if worse else ""
+        print(
+            f"  {name:<36} {base['value']:12.3f} -> {cur['value']:12.3f} "
+            f"({ratio - 1:+.1%}) {flag}"
+        )
+        if worse:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--files", type=int, default=1000, help="taille du corpus")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=4, help="threads Worker")
+    parser.add_argument(
+        "--pool", action="store_true", help="extraction dans le pool de processus"
+    )
+    parser.add_argument("-k", type=int, default=10, help="résultats par recherche")
+    parser.add_argument("--workdir", type=Path, help="dossier de travail (temporaire)")
+    parser.add_argument("--out", type=Path, help="fichier JSON des résultats")
+    parser.add_argument("--baseline", type=Path, help="résultats de référence")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    args = parser.parse_args()
+
+    # les fichiers audio/vidéo factices finissent en quarantaine : pas de log par fichier
+    setupLogging("ERROR")
+    workdir = args.workdir or Path(tempfile.mkdtemp(prefix="filemind-bench-"))
+    workdir.mkdir(parents=True, exist_ok=True)
+    root = workdir / "corpus"
+    for name in ("app.db", "app.db-wal", "app.db-shm"):
+        (workdir / name).unlink(missing_ok=True)
+    for stale in workdir.glob("app.db.*"):
+        stale.unlink()
+
+    results = Results(
+        {
+            "files": args.files,
+            "seed": args.seed,
+            "workers": args.workers,
+            "pool": args.pool,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+    )
+    print("[CORPUS]", root, args.files)
+    t0 = time.perf_counter()
+    corpus = generate(root, args.files, args.seed)
+    print(f"  generated in {time.perf_counter() - t0:.1f}s")
+
+    db = DatabaseService.get_instance(db_path=str(workdir / "app.db"))
+    vector_store = VectorStoreService(db, model=HashingEmbeddingModel())
+
+    qjobs = bench_scan(root, db, results)
+    bench_index(db, vector_store, qjobs, args.workers, args.pool, results)
+    bench_events(corpus, args.seed, results)
+    bench_search(db, vector_store, corpus, args.k, args.seed, results)
+    db.close()
+
+    current = results.to_json()
+    if args.out:
+        args.out.write_text(json.dumps(current, indent=2), encoding="utf-8")
+        print("[RESULTS]", args.out)
+    if not args.workdir:
+        shutil.rmtree(workdir, ignore_errors=True)
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        if compare(current, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+import argparse
+from pathlib import Path
+
+from filemind.bulk_import import BULK_IN_FLIGHT, BulkImporter
+from filemind.config import DB_PATH
+from filemind.database import DatabaseService
+from filemind.duplicates import DuplicateFinder
+from filemind.embedding_batcher import EmbeddingBatcher
+from filemind.extract.pool import EXTRACT_PROCESSES, ExtractionPool
+from filemind.indexer import Indexer
+from filemind.logs import LOG_FORMAT, setupLogging
+from filemind.quarantine import QuarantineService
+from filemind.vector_store import VectorStoreService
+
+
+# -------------------- IMPORT EN MASSE --------------------
+def main():
+    parser = argparse.ArgumentParser(
+        description="Importe une fois une grosse arborescence (archives, disque externe) "
+        "dans FileMind, en flux et avec reprise après interruption."
+    )
+    parser.add_argument("paths", nargs="+", help="dossiers à importer")
+    parser.add_argument(
+        "--flat", action="store_true", help="sans descendre dans les sous-dossiers"
+    )
+    parser.add_argument(
+        "--restart",
+        action="store_true",
+        help="ignore le point de reprise d'un import interrompu",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="réindexe tous les fichiers, même inchangés",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=max(4, 2 * EXTRACT_PROCESSES),
+        help="threads d'indexation",
+    )
+    parser.add_argument(
+        "--in-flight",
+        type=int,
+        default=BULK_IN_FLIGHT,
+        help="fichiers parcourus mais pas encore indexés, au plus",
+    )
+    parser.add_argument("--log-level", default="WARNING", help="niveau du journal")
+    parser.add_argument("--log-format", choices=("kv", "json"), default=LOG_FORMAT)
+    args = parser.parse_args()
+    setupLogging(args.log_level, args.log_format)
+
+    db = DatabaseService.get_instance(db_path=DB_PATH)
+    vector_store = VectorStoreService.get_instance(db)
+    embedder = EmbeddingBatcher(vector_store)
+    embedder.start()
+    extraction = ExtractionPool()
+    indexer = Indexer(
+        db,
+        vector_store,
+        embedder,
+        force=args.force,
+        extractor=extraction.extract,
+        quarantine=QuarantineService.get_instance(db),
+        duplicates=DuplicateFinder(db),
+    )
+    importer = BulkImporter(
+        db, indexer, embedder, workers=args.workers, in_flight=args.in_flight
+    )
+
+    try:
+        for p in args.paths:
+            stats = importer.run(Path(p), deep=not args.flat, restart=args.restart)
+            print("[BULK]", stats.report())
+            if stats.interrupted:
+                print("[BULK] interrompu : relancer la même commande pour reprendre")
+                break
+    finally:
+        extraction.shutdown()
+        embedder.stop()
+        print("[EMBEDDING-STATS]", embedder.stats.report())
+        db.flush()
+        vector_store.saveIndex()
+
+
+if __name__ == "__main__":
+    main()
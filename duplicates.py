@@ -0,0 +1,42 @@
+import argparse
+from pathlib import Path
+
+from filemind.config import DB_PATH
+from filemind.database import DatabaseService
+from filemind.duplicates import DuplicateFinder
+from filemind.extract.utils import format_filesize
+
+
+# -------------------- FICHIERS EN DOUBLE --------------------
+def main():
+    parser = argparse.ArgumentParser(
+        description="Liste les fichiers indexés au contenu identique "
+        "(taille, puis empreinte tête/queue, puis empreinte complète)."
+    )
+    parser.add_argument("root", nargs="?", help="dossier à examiner (tous par défaut)")
+    parser.add_argument("-n", type=int, default=50, help="nombre de groupes listés")
+    parser.add_argument(
+        "--no-scan",
+        action="store_true",
+        help="liste les doublons connus sans calculer les empreintes manquantes",
+    )
+    args = parser.parse_args()
+
+    db = DatabaseService.get_instance(db_path=DB_PATH)
+    finder = DuplicateFinder(db)
+    root = Path(args.root).resolve() if args.root else None
+
+    if not args.no_scan:
+        print("[SCAN]", finder.scan(root))
+
+    for group in finder.groups(root, limit=args.n):
+        print(
+            f"{len(group.paths)} x {format_filesize(group.size)} "
+            f"({format_filesize(group.wasted)} en trop)  {group.contentHash}"
+        )
+        for path in group.paths:
+            print("   ", path)
+
+
+if __name__ == "__main__":
+    main()
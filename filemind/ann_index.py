@@ -0,0 +1,139 @@
+import os
+import faiss
+import numpy as np
+from pathlib import Path
+
+# description de l'index FAISS (cf. faiss.index_factory), IDMap2 pour indexer par `vectors.id`
+INDEX_FACTORY = "IDMap2,Flat"
+
+# nombre de modifications de l'index avant une sauvegarde automatique sur disque
+SAVE_EVERY = 1000
+
+# listes inversées parcourues par recherche dans un index IVF (rappel contre vitesse)
+IVF_NPROBE = 16
+
+
+class AnnIndex:
+    """
+    Index FAISS de plus proches voisins (produit scalaire sur vecteurs normalisés),
+    dont les identifiants sont ceux de la table `vectors`.
+    La fabrique doit supporter `remove_ids` (pas HNSW) : l'index est mis à jour
+    à chaque validation, vecteurs remplacés ou supprimés compris.
+    L'index est persisté dans un fichier à côté de la base SQLite.
+    """
+
+    def __init__(
+        self,
+        index_path: str,
+        dim: int,
+        factory: str = INDEX_FACTORY,
+        save_every: int = SAVE_EVERY,
+        nprobe: int = IVF_NPROBE,
+    ):
+        self.index_path = Path(index_path)
+        self.dim = dim
+        self.factory = factory
+        self.save_every = save_every
+        self.nprobe = nprobe
+
+        # nombre de modifications depuis la dernière sauvegarde
+        self.pending = 0
+        self.index = self._new_index()
+        try:
+            # l'index suit chaque lot d'écriture : il doit savoir retirer des vecteurs
+            self.index.remove_ids(np.empty(0, dtype="int64"))
+        except RuntimeError:
+            raise ValueError(
+                f"index FAISS '{factory}' sans suppression (remove_ids) : "
+                "utiliser Flat, SQ ou PQ"
+            ) from None
+
+    def _new_index(self):
+        return self._tune(
+            faiss.index_factory(self.dim, self.factory, faiss.METRIC_INNER_PRODUCT)
+        )
+
+    def _tune(self, index):
+        # nombre de listes parcourues (non conservé par tous les formats de fichier)
+        ivf = faiss.try_extract_index_ivf(index)
+        if ivf is not None:
+            ivf.nprobe = min(self.nprobe, ivf.nlist)
+        return index
+
+    @property
+    def ntotal(self) -> int:
+        return int(self.index.ntotal)
+
+    @property
+    def nlist(self) -> int:
+        """
+        Nombre de listes inversées (0 hors IVF).
+        """
+        ivf = faiss.try_extract_index_ivf(self.index)
+        return int(ivf.nlist) if ivf is not None else 0
+
+    def load(self) -> bool:
+        """
+        Charge l'index depuis le disque. Retourne False s'il est absent ou inutilisable.
+        """
+        if not self.index_path.exists():
+            return False
+        try:
+            index = faiss.read_index(str(self.index_path))
+        except RuntimeError:
+            return False
+        if index.d != self.dim:
+            return False
+        self.index = self._tune(index)
+        self.pending = 0
+        return True
+
+    def reset(self):
+        """
+        Vide l'index (avant une reconstruction).
+        """
+        self.index = self._new_index()
+        self.pending = 0
+
+    def train(self, vecs: np.ndarray):
+        """
+        Entraîne l'index si la fabrique choisie l'exige (IVF, PQ, ...).
+        """
+        if not self.index.is_trained:
+            self.index.train(np.ascontiguousarray(vecs, dtype="float32"))
+
+    def add(self, ids: np.ndarray, vecs: np.ndarray):
+        if len(ids) == 0:
+            return
+        self.index.add_with_ids(
+            np.ascontiguousarray(vecs, dtype="float32"),
+            np.ascontiguousarray(ids, dtype="int64"),
+        )
+        self.pending += len(ids)
+
+    def remove(self, ids: np.ndarray):
+        if len(ids) == 0:
+            return
+        self.index.remove_ids(np.ascontiguousarray(ids, dtype="int64"))
+        self.pending += len(ids)
+
+    def search(self, query: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Retourne (scores, ids) des k plus proches voisins de la requête.
+        Les ids à -1 correspondent à des places vides (moins de k vecteurs).
+        """
+        query = np.ascontiguousarray(query, dtype="float32").reshape(1, -1)
+        scores, ids = self.index.search(query, k)
+        return scores[0], ids[0]
+
+    def should_save(self) -> bool:
+        return self.pending >= self.save_every
+
+    def save(self):
+        """
+        Écrit l'index sur disque de façon atomique (fichier temporaire + renommage).
+        """
+        tmp = self.index_path.with_name(self.index_path.name + ".tmp")
+        faiss.write_index(self.index, str(tmp))
+        os.replace(tmp, self.index_path)
+        self.pending = 0
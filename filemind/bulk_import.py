@@ -0,0 +1,241 @@
+import logging, queue, threading, time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import NamedTuple
+
+from .database import DatabaseService
+from .embedding_batcher import EmbeddingBatcher
+from .indexer import Indexer
+from .logs import log
+from .preprocessing import Preprocessor
+
+# nombre de threads qui indexent les fichiers (extraction dans le pool de processus)
+BULK_WORKERS = 8
+
+# nombre maximal de fichiers parcourus mais pas encore indexés
+BULK_IN_FLIGHT = 256
+
+# intervalle (en secondes) entre deux points de reprise
+CHECKPOINT_EVERY_S = 10
+
+
+class BulkState(NamedTuple):
+    """
+    Point de reprise d'un import : dernier fichier (chemin relatif) dont tous
+    les prédécesseurs dans l'ordre du parcours sont écrits dans la base.
+    """
+
+    root: str
+    cursor: str | None
+    done: int
+    startedAt: int
+    updatedAt: int
+    finishedAt: int | None
+
+
+@dataclass
+class BulkStats:
+    """
+    Compteurs d'un import : fichiers parcourus, résultats de l'indexation, débit.
+    """
+
+    root: str
+    resumedAfter: str | None = None
+    walked: int = 0
+    outcomes: dict[str, int] = field(default_factory=dict)
+    seconds: float = 0.0
+    interrupted: bool = False
+
+    def report(self) -> str:
+        rate = self.walked / self.seconds if self.seconds else 0.0
+        outcomes = " ".join(f"{k}={v}" for k, v in sorted(self.outcomes.items()))
+        return (
+            f"{self.root} walked={self.walked} {outcomes} "
+            f"time={self.seconds:.1f}s rate={rate:.1f}/s"
+            + (f" resumed_after={self.resumedAfter}" if self.resumedAfter else "")
+            + (" INTERRUPTED" if self.interrupted else "")
+        )
+
+
+class _Watermark:
+    """
+    Suit les fichiers en cours dans l'ordre du parcours : le point de reprise avance
+    jusqu'au dernier fichier dont tous les prédécesseurs sont terminés.
+    """
+
+    def __init__(self, cursor: str | None):
+        self.lock = threading.Lock()
+        # [numéro d'ordre] => (chemin relatif, terminé), dans l'ordre du parcours
+        self.pending: dict[int, list] = {}
+        self.cursor = cursor
+        # fichiers terminés jusqu'au point de reprise inclus
+        self.done = 0
+
+    def start(self, seq: int, rel: str):
+        with self.lock:
+            self.pending[seq] = [rel, False]
+
+    def finish(self, seq: int):
+        with self.lock:
+            self.pending[seq][1] = True
+            while self.pending:
+                first = next(iter(self.pending))
+                rel, finished = self.pending[first]
+                if not finished:
+                    break
+                self.cursor = rel
+                self.done += 1
+                del self.pending[first]
+
+
+class BulkImporter:
+    """
+    Import en masse d'une arborescence (archive, disque externe) en flux :
+    parcours trié à la demande -> filtre -> extraction (pool de processus)
+    -> embeddings (par lots) -> écriture (lots de transactions), chaque étape
+    dans ses propres threads/processus, avec au plus `in_flight` fichiers
+    parcourus mais pas encore indexés.
+    Un point de reprise (table `bulk_imports`) est enregistré régulièrement, une fois
+    les fichiers qui le précèdent écrits : un import interrompu reprend après lui.
+    Usage:
+        importer = BulkImporter(db, indexer, embedder)
+        print(importer.run(Path("/archives")).report())
+    """
+
+    def __init__(
+        self,
+        db: DatabaseService,
+        indexer: Indexer,
+        embedder: EmbeddingBatcher | None = None,
+        workers: int = BULK_WORKERS,
+        in_flight: int = BULK_IN_FLIGHT,
+        checkpoint_every_s: float = CHECKPOINT_EVERY_S,
+    ):
+        self.db = db
+        self.pool = db.pool
+        self.indexer = indexer
+        self.embedder = embedder
+        self.workers = workers
+        self.in_flight = in_flight
+        self.checkpoint_every_s = checkpoint_every_s
+
+        # initialisation de la base de données
+        self.pool.execute(
+            """
+            -- points de reprise des imports en masse, par racine
+            CREATE TABLE IF NOT EXISTS bulk_imports(
+              root TEXT PRIMARY KEY,
+              cursor TEXT,                 -- chemin relatif du dernier fichier écrit
+              done INTEGER NOT NULL,
+              startedAt INTEGER NOT NULL,
+              updatedAt INTEGER NOT NULL,
+              finishedAt INTEGER
+            );
+            """
+        )
+
+    def state(self, root: Path) -> BulkState | None:
+        """
+        Retourne le point de reprise de l'import de `root`, ou None.
+        """
+        rows = self.pool.query(
+            """SELECT root, cursor, done, startedAt, updatedAt, finishedAt
+               FROM bulk_imports WHERE root = ?;""",
+            (str(root),),
+        )
+        return BulkState(*rows[0]) if rows else None
+
+    def _save(self, root: Path, cursor: str | None, done: int, finished: bool = False):
+        """
+        Enregistre le point de reprise après avoir écrit tous les fichiers qui le précèdent.
+        """
+        if self.embedder:
+            self.embedder.flush()
+        self.db.flush()
+        now = int(time.time())
+        self.pool.submit(
+            """INSERT INTO bulk_imports(root, cursor, done, startedAt, updatedAt, finishedAt)
+               VALUES(?,?,?,?,?,?)
+               ON CONFLICT(root) DO UPDATE SET
+                 cursor=excluded.cursor, done=excluded.done,
+                 updatedAt=excluded.updatedAt, finishedAt=excluded.finishedAt;""",
+            (str(root), cursor, done, now, now, now if finished else None),
+        )
+        self.db.flush()
+
+    def run(self, root: Path, deep: bool = True, restart: bool = False) -> BulkStats:
+        """
+        Importe `root` ; reprend après le dernier point de reprise d'un import
+        inachevé, sauf avec `restart` (un import terminé est refait en entier,
+        les fichiers inchangés sont alors sautés par l'indexeur).
+        """
+        root = root.resolve()
+        state = None if restart else self.state(root)
+        after = state.cursor if state and state.finishedAt is None else None
+        done = state.done if after else 0
+        stats = BulkStats(str(root), resumedAfter=after)
+        mark = _Watermark(after)
+        pre = Preprocessor(str(root), deep)
+        items: queue.Queue = queue.Queue(maxsize=self.in_flight)
+        lock = threading.Lock()
+
+        def work():
+            while True:
+                item = items.get()
+                if item is None:
+                    return
+                seq, path = item
+                try:
+                    outcome = self.indexer.index_path(path)
+                except Exception as e:
+                    outcome = "error"
+                    log("ERROR-BULK", logging.ERROR, path=path, error=repr(e))
+                with lock:
+                    stats.outcomes[outcome] = stats.outcomes.get(outcome, 0) + 1
+                mark.finish(seq)
+
+        threads = [
+            threading.Thread(target=work, name=f"bulk-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        for t in threads:
+            t.start()
+
+        t0 = last = time.monotonic()
+        if not after:
+            # nouvel import : nouvelle date de début
+            self.pool.submit("DELETE FROM bulk_imports WHERE root = ?;", (str(root),))
+            self._save(root, None, 0)
+        try:
+            for seq, path in enumerate(pre.iterFiles(after=after)):
+                mark.start(seq, pre.relative(path))
+                items.put((seq, path))
+                stats.walked += 1
+                if time.monotonic() - last >= self.checkpoint_every_s:
+                    last = time.monotonic()
+                    self._save(root, mark.cursor, done + mark.done)
+                    # visible au niveau par défaut de bulk_import.py (WARNING)
+                    log(
+                        "BULK-PROGRESS",
+                        logging.WARNING,
+                        report=stats.report(),
+                        cursor=mark.cursor,
+                    )
+        except KeyboardInterrupt:
+            # les fichiers parcourus mais pas commencés seront repris au prochain import
+            stats.interrupted = True
+            while True:
+                try:
+                    items.get_nowait()
+                except queue.Empty:
+                    break
+        for _ in threads:
+            items.put(None)
+        for t in threads:
+            t.join()
+
+        self._save(root, mark.cursor, done + mark.done, finished=not stats.interrupted)
+        stats.seconds = time.monotonic() - t0
+        for err in pre.errors[:10]:
+            log("ERROR-BULK", logging.WARNING, error=err)
+        return stats
@@ -14,6 +14,12 @@ TEXT_TYPES = [
     ".yml",
 ]
 IMAGE_TYPES = [".jpg", ".jpeg", ".png", ".gif", ".bmp", ".svg"]
-AUDIO_TYPES = [".mp4", ".avi", ".mkv", ".flv", ".mov", ".wmv", ".webm"]
-VIDEO_TYPES = [".mp3", ".wav", ".ogg", ".flac", ".aac", ".wma"]
+AUDIO_TYPES = [".mp3", ".wav", ".ogg", ".flac", ".aac", ".wma"]
+VIDEO_TYPES = [".mp4", ".avi", ".mkv", ".flv", ".mov", ".wmv", ".webm"]
 DOCUMENT_TYPES = [".pdf"]
+
+# chemin de la base SQLite (fichiers et vecteurs d'embedding)
+DB_PATH = "app.db"
+
+# ancienne base séparée des vecteurs, reprise dans DB_PATH au démarrage si elle existe
+VECTOR_STORE_PATH = "vector_store.db"
@@ -0,0 +1,143 @@
+import atexit, os, sqlite3, threading
+from contextlib import contextmanager
+from pathlib import Path
+
+from .write_batcher import WriteBatcher, WriteOp
+
+# nombre de requêtes préparées gardées en cache par connexion
+CACHED_STATEMENTS = 256
+
+
+def prefixRange(root: Path) -> tuple[str, str]:
+    """
+    Bornes [lo, hi) des chemins situés sous le dossier `root`, pour un parcours
+    par intervalle sur l'index de `path` ('0' suit immédiatement le séparateur '/').
+    """
+    prefix = str(root).rstrip(os.sep) + os.sep
+    return prefix, prefix[:-1] + chr(ord(os.sep) + 1)
+
+
+class ConnectionPool:
+    """
+    Couche de connexion SQLite de la base (partagée par tous les services) :
+    - une seule connexion d'écriture, possédée par un WriteBatcher qui sérialise
+      toutes les écritures via sa file et les valide par lots ;
+    - une connexion en lecture seule par thread lecteur (mode WAL), pour que
+      les recherches et lectures ne soient jamais bloquées par l'indexation.
+    Usage:
+        pool = ConnectionPool("app.db", name="db")
+        pool.execute("CREATE TABLE ...")
+        pool.submit("INSERT INTO ...", params)
+        pool.query("SELECT ...", params)
+        with pool.transaction():   # écritures validées ensemble
+            pool.submit(...)
+            pool.submit(...)
+    """
+
+    def __init__(self, db_path: str, name: str = "db", **writer_kw):
+        self.db_path = Path(db_path)
+
+        conn = sqlite3.connect(
+            self.db_path, check_same_thread=False, cached_statements=CACHED_STATEMENTS
+        )
+        conn.execute("PRAGMA journal_mode=WAL;")  # mode WAL = perfs + accès concurrent
+        conn.execute("PRAGMA synchronous=NORMAL;")
+        conn.execute("PRAGMA foreign_keys=ON;")
+        self.writer = WriteBatcher(conn, name=f"{name}-writer", **writer_kw)
+
+        self.local = threading.local()
+        self.readersLock = threading.Lock()
+        self.readers: list[sqlite3.Connection] = []
+        atexit.register(self.flush)
+
+    def start(self):
+        """
+        Démarre le thread d'écriture (après la création du schéma).
+        """
+        self.writer.start()
+
+    def reader(self) -> sqlite3.Connection:
+        """
+        Retourne la connexion en lecture seule du thread courant (créée au premier appel).
+        """
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(
+                f"{self.db_path.resolve().as_uri()}?mode=ro",
+                uri=True,
+                cached_statements=CACHED_STATEMENTS,
+            )
+            conn.execute("PRAGMA query_only=ON;")
+            self.local.conn = conn
+            with self.readersLock:
+                self.readers.append(conn)
+        return conn
+
+    def query(self, sql: str, params: tuple = ()):
+        """
+        Exécute une requête SELECT sur la connexion de lecture du thread courant.
+        """
+        cur = self.reader().cursor()
+        cur.execute(sql, params)
+        return cur.fetchall()
+
+    def execute(self, sql: str, params: tuple = ()):
+        """
+        Écriture immédiate via le thread d'écriture.
+        """
+        self.writer.execute(sql, params)
+
+    def listen(self, before_flush=None, after_flush=None):
+        """
+        Branche les écouteurs des lots d'écriture (cf. WriteBatcher).
+        """
+        self.writer.before_flush = before_flush
+        self.writer.after_flush = after_flush
+
+    def submit(
+        self, sql: str, params: tuple = (), paths: tuple = (), ranges: tuple = ()
+    ):
+        """
+        Écriture différée, validée avec le prochain lot.
+        """
+        group = getattr(self.local, "group", None)
+        if group is not None:
+            group.append(WriteOp(sql, params, paths, ranges))
+        else:
+            self.writer.submit(sql, params, paths, ranges)
+
+    @contextmanager
+    def transaction(self):
+        """
+        Regroupe les écritures différées soumises par le thread courant dans le bloc :
+        elles partent ensemble et sont validées dans la même transaction
+        (ex. le fichier et son vecteur). Les blocs imbriqués rejoignent le bloc externe.
+        """
+        if getattr(self.local, "group", None) is not None:
+            yield
+            return
+        self.local.group = []
+        try:
+            yield
+            ops = self.local.group
+        finally:
+            self.local.group = None
+        self.writer.submitMany(ops)
+
+    def flush(self):
+        self.writer.flush()
+
+    def close(self):
+        """
+        Valide les écritures en attente puis ferme toutes les connexions.
+        """
+        self.writer.stop()
+        self.writer.conn.close()
+        with self.readersLock:
+            for conn in self.readers:
+                try:
+                    conn.close()
+                except sqlite3.ProgrammingError:
+                    # connexion d'un autre thread : fermée à la fin de celui-ci
+                    pass
+            self.readers.clear()
@@ -1,12 +1,64 @@
-import sqlite3
+import os, re
 from pathlib import Path
 from threading import Lock
-from .extract.base import BaseMetadata
+from typing import TYPE_CHECKING
+from .connection import ConnectionPool, prefixRange
+from .fingerprint import Fingerprint
+
+if TYPE_CHECKING:
+    # pydantic n'est pas chargé par un processus qui ne fait que chercher
+    from .extract.base import BaseMetadata
+
+# colonnes ajoutées après la première version du schéma : [nom] => type
+FILES_MIGRATIONS = {
+    "mtimeNs": "INTEGER",
+    "inode": "INTEGER",
+    "contentHash": "TEXT",
+    "headHash": "TEXT",
+}
+
+# tokenizer de l'index plein texte (accents ignorés : "electricite" trouve "électricité")
+FTS_TOKENIZE = "unicode61 remove_diacritics 2"
+
+
+def basenameSql(column: str) -> str:
+    """
+    Expression SQL du nom de fichier (dernier segment) d'une colonne de chemin.
+    """
+    sep = os.sep.replace("'", "''")
+    return (
+        f"substr({column}, length(rtrim({column}, replace({column}, '{sep}', ''))) + 1)"
+    )
+
+
+def dirnameSql(column: str) -> str:
+    """
+    Expression SQL du dossier parent (séparateur final compris) d'une colonne de chemin.
+    """
+    sep = os.sep.replace("'", "''")
+    return f"rtrim({column}, replace({column}, '{sep}', ''))"
+
+
+def ftsQuery(text: str) -> str | None:
+    """
+    Convertit un texte libre en requête FTS5 : chaque mot devient une expression
+    entre guillemets (la syntaxe FTS5 n'est jamais interprétée), reliées par OR
+    et classées par BM25. None si le texte ne contient aucun mot.
+    """
+    tokens = re.findall(r"\w+", text)
+    if not tokens:
+        return None
+    return " OR ".join(f'"{t}"' for t in tokens)
 
 
 class DatabaseService:
     """
-    Singleton pour gérer la connexion SQLite et exécuter des requêtes.
+    Singleton pour gérer les connexions SQLite et exécuter des requêtes.
+    La base est partagée avec VectorStoreService (table `vectors`) :
+    un seul thread d'écriture, une seule validation pour les deux tables.
+    Les écritures d'indexation (indexPath, deletePath, movePath...) sont différées
+    et validées par lots par le thread d'écriture ; `flush()` les force.
+    Les lectures passent par une connexion en lecture seule propre à chaque thread.
     Usage:
         db = DatabaseService.get_instance("app.db")
         db.execute("INSERT INTO ...", params)
@@ -20,11 +72,8 @@ class DatabaseService:
         if hasattr(self, "_initialized") and self._initialized:
             return
         self.db_path = Path(db_path)
-        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
-        self.conn.execute(
-            "PRAGMA journal_mode=WAL;"
-        )  # mode WAL = perfs + accès concurrent
-        self.conn.execute("PRAGMA synchronous=NORMAL;")
+        # un thread d'écriture + une connexion de lecture par thread
+        self.pool = ConnectionPool(self.db_path, name="db")
 
         # initialisation de la base de données
         self.execute(
@@ -37,10 +86,21 @@ class DatabaseService:
               size INTEGER,
               createdAt INTEGER,
               updatedAt INTEGER,
-              accessedAt INTEGER
+              accessedAt INTEGER,
+              mtimeNs INTEGER,
+              inode INTEGER,
+              contentHash TEXT,
+              headHash TEXT                -- empreinte tête + queue (cf. DuplicateFinder)
             );
             """
         )
+        self._migrate()
+        # fichiers directement dans un dossier, sans parcourir ses sous-dossiers
+        self.execute(
+            f"CREATE INDEX IF NOT EXISTS files_dir ON files({dirnameSql('path')});"
+        )
+        self._createFts()
+        self.pool.start()
 
         self._initialized = True
 
@@ -55,44 +115,119 @@ class DatabaseService:
                 cls._instance = cls(db_path)
             return cls._instance
 
+    def _migrate(self):
+        """
+        Ajoute les colonnes manquantes d'une base créée par une version antérieure.
+        """
+        columns = {row[1] for row in self.query("PRAGMA table_info(files);")}
+        for name, kind in FILES_MIGRATIONS.items():
+            if name not in columns:
+                self.execute(f"ALTER TABLE files ADD COLUMN {name} {kind};")
+
+    def _createFts(self):
+        """
+        Index plein texte FTS5 (nom de fichier + description) sur `files`, synchronisé
+        par des triggers dans la transaction de chaque écriture : indexPath,
+        deletePath, movePath et les opérations de dossier n'ont rien à faire de plus.
+        Un déplacement qui ne change pas le nom du fichier ne touche pas l'index.
+        """
+        exists = self.query(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name='files_fts';"
+        )
+        # les lignes remplacées par UPDATE OR REPLACE déclenchent le trigger de suppression
+        self.execute("PRAGMA recursive_triggers=ON;")
+        self.execute(
+            f"""CREATE VIRTUAL TABLE IF NOT EXISTS files_fts
+                USING fts5(name, description, tokenize='{FTS_TOKENIZE}');"""
+        )
+        new_name, old_name = basenameSql("new.path"), basenameSql("old.path")
+        self.execute(
+            f"""CREATE TRIGGER IF NOT EXISTS files_fts_insert AFTER INSERT ON files BEGIN
+                  INSERT INTO files_fts(rowid, name, description)
+                  VALUES(new.id, {new_name}, new.description);
+                END;"""
+        )
+        self.execute(
+            """CREATE TRIGGER IF NOT EXISTS files_fts_delete AFTER DELETE ON files BEGIN
+                 DELETE FROM files_fts WHERE rowid = old.id;
+               END;"""
+        )
+        self.execute(
+            f"""CREATE TRIGGER IF NOT EXISTS files_fts_update
+                AFTER UPDATE OF path, description ON files
+                WHEN old.description IS NOT new.description OR {old_name} != {new_name}
+                BEGIN
+                  DELETE FROM files_fts WHERE rowid = old.id;
+                  INSERT INTO files_fts(rowid, name, description)
+                  VALUES(new.id, {new_name}, new.description);
+                END;"""
+        )
+        if not exists:
+            # base créée par une version antérieure : on indexe l'existant
+            self.execute(
+                f"""INSERT INTO files_fts(rowid, name, description)
+                    SELECT id, {basenameSql("path")}, description FROM files;"""
+            )
+
     def execute(self, sql: str, params: tuple = ()):
         """
-        Exécute une requête SQL avec commit automatique.
-        Retourne le curseur.
+        Exécute une requête SQL d'écriture et attend sa validation.
         """
-        cur = self.conn.cursor()
-        cur.execute(sql, params)
-        self.conn.commit()
-        return cur
+        self.pool.execute(sql, params)
 
     def query(self, sql: str, params: tuple = ()):
         """
         Exécute une requête SQL SELECT et retourne toutes les lignes.
         """
-        cur = self.conn.cursor()
-        cur.execute(sql, params)
-        return cur.fetchall()
+        return self.pool.query(sql, params)
+
+    def flush(self):
+        """
+        Valide immédiatement les écritures différées.
+        """
+        self.pool.flush()
+
+    def transaction(self):
+        """
+        Bloc dont les écritures différées (de tous les services de la base)
+        sont validées dans la même transaction, cf. ConnectionPool.transaction.
+        """
+        return self.pool.transaction()
 
     def close(self):
         """
-        Ferme la connexion.
+        Valide les écritures en attente puis ferme les connexions.
         """
-        if self.conn:
-            self.conn.close()
-            self.conn = None
+        if self.pool:
+            self.pool.close()
+            self.pool = None
 
-    def indexPath(self, path: Path, metadata: BaseMetadata, description: str = ""):
+    def indexPath(
+        self,
+        path: Path,
+        metadata: "BaseMetadata",
+        description: str = "",
+        fingerprint: Fingerprint | None = None,
+        headHash: str | None = None,
+    ):
         """
         Insère ou met à jour un fichier dans la table 'files'.
+        Les empreintes de contenu non fournies sont effacées (le contenu a pu changer).
         """
-        self.execute(
-            """INSERT INTO files(path,description,size,createdAt,updatedAt,accessedAt)
-                   VALUES(?,?,?,?,?,?)
+        fp = fingerprint or Fingerprint(metadata.fileSize, None, None)
+        self.pool.submit(
+            """INSERT INTO files(path,description,size,createdAt,updatedAt,accessedAt,
+                                 mtimeNs,inode,contentHash,headHash)
+                   VALUES(?,?,?,?,?,?,?,?,?,?)
                    ON CONFLICT(path) DO UPDATE SET description=excluded.description,
                                                   size=excluded.size,
                                                   createdAt=excluded.createdAt,
                                                   updatedAt=excluded.updatedAt,
-                                                  accessedAt=excluded.accessedAt;""",
+                                                  accessedAt=excluded.accessedAt,
+                                                  mtimeNs=excluded.mtimeNs,
+                                                  inode=excluded.inode,
+                                                  contentHash=excluded.contentHash,
+                                                  headHash=excluded.headHash;""",
             (
                 str(path),
                 description,
@@ -100,7 +235,119 @@ class DatabaseService:
                 metadata.fileCreatedAt,
                 metadata.fileUpdatedAt,
                 metadata.fileAccessedAt,
+                fp.mtimeNs,
+                fp.inode,
+                fp.contentHash,
+                headHash,
             ),
+            (str(path),),
+        )
+
+    def getFingerprint(self, path: Path) -> Fingerprint | None:
+        """
+        Retourne l'empreinte enregistrée d'un fichier, ou None s'il n'est pas indexé.
+        """
+        rows = self.query(
+            "SELECT size, mtimeNs, inode, contentHash FROM files WHERE path = ?;",
+            (str(path),),
+        )
+        if not rows or rows[0][1] is None:
+            return None
+        return Fingerprint(*rows[0])
+
+    def getDescription(self, path: Path) -> str | None:
+        rows = self.query("SELECT description FROM files WHERE path = ?;", (str(path),))
+        return rows[0][0] if rows else None
+
+    def iterFingerprints(self, root: Path, batch: int = 5000):
+        """
+        Parcourt, triées par chemin, les empreintes des fichiers indexés sous `root`,
+        par lots (pagination sur l'index unique de `path`, sans LIKE).
+        Produit des couples (chemin, empreinte).
+        """
+        lo, hi = prefixRange(root)
+        last = lo
+        while True:
+            rows = self.query(
+                """SELECT path, size, mtimeNs, inode, contentHash FROM files
+                   WHERE path > ? AND path < ? ORDER BY path LIMIT ?;""",
+                (last, hi, batch),
+            )
+            for path, *fp in rows:
+                yield path, Fingerprint(*fp)
+            if len(rows) < batch:
+                return
+            last = rows[-1][0]
+
+    def dirFingerprints(self, directory: Path) -> list[tuple[str, Fingerprint]]:
+        """
+        Empreintes, triées par chemin, des fichiers indexés directement dans `directory`
+        (index du dossier parent : ses sous-dossiers ne sont pas lus).
+        """
+        rows = self.query(
+            f"""SELECT path, size, mtimeNs, inode, contentHash FROM files
+                WHERE {dirnameSql("path")} = ? ORDER BY path;""",
+            (prefixRange(directory)[0],),
+        )
+        return [(path, Fingerprint(*fp)) for path, *fp in rows]
+
+    def childDirs(self, directory: Path) -> list[str]:
+        """
+        Noms des sous-dossiers de `directory` qui contiennent des fichiers indexés :
+        une recherche sur l'index de `path` par sous-dossier, dont le contenu est sauté.
+        """
+        lo, hi = prefixRange(directory)
+        names, last = [], lo
+        while True:
+            rows = self.query(
+                """SELECT path FROM files WHERE path > ? AND path < ?
+                   AND instr(substr(path, ?), ?) > 0 ORDER BY path LIMIT 1;""",
+                (last, hi, len(lo) + 1, os.sep),
+            )
+            if not rows:
+                return names
+            name = rows[0][0][len(lo) :].split(os.sep, 1)[0]
+            names.append(name)
+            last = prefixRange(Path(lo, name))[1]
+
+    def searchText(self, text: str, k: int = 10) -> list[tuple[str, float]]:
+        """
+        Recherche plein texte (nom de fichier, description) classée par BM25.
+        Retourne [(chemin, score)] trié du plus pertinent au moins pertinent
+        (score BM25 de FTS5 : plus il est négatif, plus le fichier est pertinent).
+        """
+        match = ftsQuery(text)
+        if match is None:
+            return []
+        return self.query(
+            """SELECT f.path, files_fts.rank FROM files_fts
+               JOIN files f ON f.id = files_fts.rowid
+               WHERE files_fts MATCH ? ORDER BY files_fts.rank LIMIT ?;""",
+            (match, k),
+        )
+
+    def updateFingerprint(self, path: Path, fingerprint: Fingerprint):
+        """
+        Met à jour l'empreinte d'un fichier dont le contenu n'a pas changé.
+        """
+        self.pool.submit(
+            "UPDATE files SET size=?, mtimeNs=?, inode=?, contentHash=? WHERE path=?;",
+            (*fingerprint, str(path)),
+            (str(path),),
+        )
+
+    def updateHashes(
+        self, path: Path, headHash: str | None, contentHash: str | None = None
+    ):
+        """
+        Enregistre les empreintes de contenu calculées pour un fichier inchangé
+        (une empreinte absente garde sa valeur).
+        """
+        self.pool.submit(
+            """UPDATE files SET headHash=coalesce(?, headHash),
+                                contentHash=coalesce(?, contentHash)
+               WHERE path=?;""",
+            (headHash, contentHash, str(path)),
         )
 
     def deletePath(self, path: Path):
@@ -108,10 +355,42 @@ class DatabaseService:
         Supprime un fichier de la table 'files' par son chemin.
         """
 
-        self.execute("DELETE FROM files WHERE path = ?;", (str(path),))
+        self.pool.submit(
+            "DELETE FROM files WHERE path = ?;", (str(path),), (str(path),)
+        )
 
     def movePath(self, old: Path, new: Path):
         """
         Met à jour le chemin d'un fichier (cas de renommage/déplacement).
+        Une ligne déjà présente à la destination est remplacée.
         """
-        self.execute("UPDATE files SET path=? WHERE path=?;", (str(new), str(old)))
+        self.pool.submit(
+            "UPDATE OR REPLACE files SET path=? WHERE path=?;",
+            (str(new), str(old)),
+            (str(old), str(new)),
+        )
+
+    def moveDir(self, old: Path, new: Path):
+        """
+        Déplace tout un dossier en une seule réécriture du préfixe des chemins,
+        bornée par intervalle sur l'index de `path` (pas de LIKE).
+        """
+        lo, hi = prefixRange(old)
+        new_prefix, _ = prefixRange(new)
+        self.pool.submit(
+            """UPDATE OR REPLACE files SET path = ? || substr(path, ?)
+               WHERE path > ? AND path < ?;""",
+            (new_prefix, len(lo) + 1, lo, hi),
+            ranges=((lo, hi), prefixRange(new)),
+        )
+
+    def deleteDir(self, path: Path):
+        """
+        Supprime tous les fichiers indexés sous un dossier.
+        """
+        lo, hi = prefixRange(path)
+        self.pool.submit(
+            "DELETE FROM files WHERE path > ? AND path < ?;",
+            (lo, hi),
+            ranges=((lo, hi),),
+        )
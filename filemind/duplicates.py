@@ -0,0 +1,217 @@
+from collections import defaultdict
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+from .connection import prefixRange
+from .database import DatabaseService
+from .fingerprint import content_hash, head_hash
+
+# taille minimale (en octets) d'un fichier pris en compte (les fichiers vides sont tous identiques)
+MIN_DUPLICATE_SIZE = 1
+
+# têtes manquantes d'autres fichiers calculées au plus par `stage` (chemin de l'indexation) ;
+# les autres attendent `scan`
+MAX_STAGE_HEADS = 16
+
+
+class DuplicateGroup(NamedTuple):
+    """
+    Fichiers au contenu identique (même taille, même empreinte complète).
+    """
+
+    contentHash: str
+    size: int
+    paths: list[str]
+
+    @property
+    def wasted(self) -> int:
+        """
+        Octets occupés par les copies en trop.
+        """
+        return self.size * (len(self.paths) - 1)
+
+
+class StagedHashes(NamedTuple):
+    """
+    Résultat du hachage par étapes d'un fichier : empreintes calculées
+    (None si l'étape n'a pas été nécessaire) et fichier indexé identique s'il existe.
+    """
+
+    headHash: Optional[str]
+    contentHash: Optional[str]
+    source: Optional[str]
+
+
+class DuplicateFinder:
+    """
+    Index des doublons sur la table `files`, par hachage en trois étapes :
+    1. taille (déjà stockée) : un fichier de taille unique n'a pas de doublon ;
+    2. empreinte des premiers et derniers Ko (`headHash`) parmi les fichiers de même taille ;
+    3. empreinte complète (`contentHash`), lue par blocs, des seuls survivants.
+    Les empreintes sont enregistrées dans `files` : `indexPath` les efface quand
+    un fichier change, elles ne sont recalculées que pour ces fichiers-là.
+    Usage:
+        finder = DuplicateFinder(db)
+        finder.scan()            # met l'index à jour pour toute la base
+        finder.groups()          # doublons, du plus coûteux au moins coûteux
+        finder.stage(path, size) # un fichier vu par l'Indexer
+    """
+
+    def __init__(
+        self,
+        db: DatabaseService,
+        min_size: int = MIN_DUPLICATE_SIZE,
+        max_stage_heads: int = MAX_STAGE_HEADS,
+    ):
+        self.db = db
+        self.min_size = min_size
+        self.max_stage_heads = max_stage_heads
+
+        self.db.execute("CREATE INDEX IF NOT EXISTS files_size ON files(size);")
+        self.db.execute(
+            "CREATE INDEX IF NOT EXISTS files_content ON files(contentHash, size);"
+        )
+
+    def _hash(self, fn, path: str, *args) -> str | None:
+        try:
+            return fn(Path(path), *args)
+        except OSError:
+            # fichier disparu ou illisible depuis son indexation
+            return None
+
+    def _stage(
+        self,
+        size: int,
+        rows: list[tuple[str, str | None, str | None]],
+        unsaved: str | None = None,
+    ) -> dict[str, tuple[str | None, str | None]]:
+        """
+        Étapes 2 et 3 pour des fichiers de même taille : calcule les empreintes
+        manquantes (têtes de tous, contenus complets des têtes partagées)
+        et enregistre les nouvelles, sauf celles du chemin `unsaved`.
+        Si `unsaved` est donné, seuls les contenus des fichiers de même tête
+        que lui sont hachés (les autres collisions attendent `scan`).
+        Retourne [chemin] => (headHash, contentHash).
+        """
+        hashes = {}
+        computed = set()
+        for path, head, full in rows:
+            if head is None:
+                head = self._hash(head_hash, path, size)
+                computed.add(path)
+            hashes[path] = (head, full)
+
+        byHead = defaultdict(list)
+        for path, (head, _) in hashes.items():
+            if head is not None:
+                byHead[head].append(path)
+        for paths in byHead.values():
+            if len(paths) < 2 or (unsaved is not None and unsaved not in paths):
+                continue
+            for path in paths:
+                head, full = hashes[path]
+                if full is None:
+                    hashes[path] = (head, self._hash(content_hash, path))
+                    computed.add(path)
+
+        for path in computed - {unsaved}:
+            self.db.updateHashes(path, *hashes[path])
+        return hashes
+
+    def stage(
+        self, path: Path, size: int, contentHash: str | None = None
+    ) -> StagedHashes:
+        """
+        Hachage par étapes d'un fichier (nouveau ou modifié) face aux fichiers indexés
+        de même taille. Les têtes manquantes de ces derniers (au plus `max_stage_heads`,
+        les autres attendent `scan`) sont calculées et enregistrées au passage,
+        leurs contenus complets seulement s'ils partagent la tête du fichier ;
+        les empreintes du fichier sont retournées pour `indexPath`.
+        `source` est un fichier indexé (avec sa description) au contenu identique.
+        """
+        if size < self.min_size:
+            return StagedHashes(None, contentHash, None)
+        rows = [
+            row
+            for row in self.db.query(
+                """SELECT path, headHash, contentHash FROM files
+                   WHERE size = ? AND description IS NOT NULL;""",
+                (size,),
+            )
+            if row[0] != str(path)
+        ]
+        if not rows:
+            return StagedHashes(None, contentHash, None)
+        if contentHash is not None:
+            # empreinte complète déjà connue (CONTENT_HASH) : aucune lecture si elle est indexée
+            source = next((p for p, _, f in rows if f == contentHash), None)
+            if source:
+                return StagedHashes(None, contentHash, source)
+        # lectures bornées : une copie d'un fichier laissé de côté est extraite normalement
+        missing = [row for row in rows if row[1] is None]
+        if len(missing) > self.max_stage_heads:
+            rows = [row for row in rows if row[1] is not None]
+            rows += missing[: self.max_stage_heads]
+
+        # les empreintes du fichier sont enregistrées par indexPath, avec sa description
+        hashes = self._stage(
+            size, [*rows, (str(path), None, contentHash)], unsaved=str(path)
+        )
+        head, full = hashes.pop(str(path))
+        source = next(
+            (p for p, (_, f) in hashes.items() if full is not None and f == full), None
+        )
+        return StagedHashes(head, full, source)
+
+    def scan(self, root: Path | None = None) -> dict[str, int]:
+        """
+        Met à jour l'index des doublons des fichiers indexés (sous `root` si donné) :
+        seules les empreintes manquantes sont calculées.
+        Retourne le nombre de fichiers candidats et d'empreintes calculées par étape.
+        """
+        where, params = "size >= ?", [self.min_size]
+        if root is not None:
+            where += " AND path > ? AND path < ?"
+            params += prefixRange(root)
+        sizes = self.db.query(
+            f"""SELECT size FROM files WHERE {where}
+                GROUP BY size HAVING COUNT(*) > 1;""",
+            tuple(params),
+        )
+
+        stats = {"sizes": len(sizes), "candidates": 0, "heads": 0, "contents": 0}
+        for (size,) in sizes:
+            rows = self.db.query(
+                f"SELECT path, headHash, contentHash FROM files WHERE {where} AND size = ?;",
+                (*params, size),
+            )
+            hashes = self._stage(size, rows)
+            stats["candidates"] += len(rows)
+            old = {path: (head, full) for path, head, full in rows}
+            for path, (head, full) in hashes.items():
+                stats["heads"] += old[path][0] is None and head is not None
+                stats["contents"] += old[path][1] is None and full is not None
+        self.db.flush()
+        return stats
+
+    def groups(
+        self, root: Path | None = None, limit: int | None = None
+    ) -> list[DuplicateGroup]:
+        """
+        Groupes de fichiers au contenu identique parmi les empreintes connues
+        (cf. `scan`), du plus grand nombre d'octets gaspillés au plus petit.
+        """
+        where, params = "contentHash IS NOT NULL AND size >= ?", [self.min_size]
+        if root is not None:
+            where += " AND path > ? AND path < ?"
+            params += prefixRange(root)
+        rows = self.db.query(
+            f"""SELECT contentHash, size, group_concat(path, char(0)) FROM files
+                WHERE {where} GROUP BY contentHash, size HAVING COUNT(*) > 1
+                ORDER BY size * (COUNT(*) - 1) DESC LIMIT ?;""",
+            (*params, -1 if limit is None else limit),
+        )
+        return [
+            DuplicateGroup(full, size, sorted(paths.split("\0")))
+            for full, size, paths in rows
+        ]
@@ -0,0 +1,332 @@
+import logging, threading, time
+import numpy as np
+from collections import Counter, OrderedDict, deque
+from pathlib import Path
+from typing import Callable
+
+from .logs import log
+from .metrics import metrics
+from .vector_store import VectorStoreService
+
+# taille maximale d'un lot envoyé au modèle d'embedding
+MAX_BATCH_SIZE = 32
+
+# attente maximale (en millisecondes) d'une description avant l'envoi de son lot
+MAX_WAIT_MS = 50
+
+# intervalle (en secondes) entre deux affichages des statistiques
+STATS_EVERY_S = 60
+
+# acquittement différé du job d'une description (cf. JobScheduler.defer)
+Ack = Callable[[], None]
+
+# écriture du vecteur calculé d'un chemin : write(chemin, vecteur, ack=...) enregistre
+# le vecteur et appelle l'acquittement (ou None) dans la même transaction
+Write = Callable[..., None]
+
+# durée d'encodage d'un lot (cache compris) et de son écriture (en secondes)
+BATCH_SECONDS = metrics.histogram(
+    "filemind_embedding_batch_seconds",
+    "Durée d'un lot d'embedding, par phase (encode, write)",
+)
+
+# latence de bout en bout d'une description (soumission -> écriture)
+LATENCY_SECONDS = metrics.histogram(
+    "filemind_embedding_latency_seconds",
+    "Latence d'une description entre sa soumission et l'écriture de son vecteur",
+)
+
+# descriptions encodées
+ITEMS_TOTAL = metrics.counter(
+    "filemind_embedding_items_total", "Descriptions passées par le regroupement"
+)
+
+
+def chainAcks(*acks: Ack | None) -> Ack | None:
+    """
+    Regroupe des acquittements en un seul (None s'il n'y en a aucun).
+    """
+    acks = [a for a in acks if a]
+    if len(acks) <= 1:
+        return acks[0] if acks else None
+
+    def ack():
+        for a in acks:
+            a()
+
+    return ack
+
+
+# -------------------- STATISTIQUES --------------------
+
+
+class EmbeddingStats:
+    """
+    Statistiques des lots d'embedding : distribution des tailles de lot,
+    latence de bout en bout (soumission -> écriture) et temps d'encodage.
+    """
+
+    def __init__(self, window: int = 1000):
+        self.lock = threading.Lock()
+        self.batches = 0
+        self.items = 0
+        self.encodeSeconds = 0.0
+        self.writeSeconds = 0.0
+        self.sizes: Counter[int] = Counter()
+        # latences récentes en secondes (fenêtre glissante)
+        self.latencies: deque[float] = deque(maxlen=window)
+
+    def record(self, size: int, encode_s: float, write_s: float, latencies):
+        with self.lock:
+            self.batches += 1
+            self.items += size
+            self.encodeSeconds += encode_s
+            self.writeSeconds += write_s
+            self.sizes[size] += 1
+            self.latencies.extend(latencies)
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            lat = sorted(self.latencies)
+
+            def pct(q: float):
+                return lat[min(len(lat) - 1, int(q * len(lat)))] * 1000 if lat else 0.0
+
+            return {
+                "batches": self.batches,
+                "items": self.items,
+                "meanBatchSize": self.items / self.batches if self.batches else 0.0,
+                "batchSizes": dict(sorted(self.sizes.items())),
+                "encodeSeconds": self.encodeSeconds,
+                "writeSeconds": self.writeSeconds,
+                "latencyP50Ms": pct(0.50),
+                "latencyP95Ms": pct(0.95),
+                "latencyMaxMs": lat[-1] * 1000 if lat else 0.0,
+            }
+
+    def report(self) -> str:
+        s = self.snapshot()
+        return (
+            f"batches={s['batches']} items={s['items']} "
+            f"mean_batch={s['meanBatchSize']:.1f} "
+            f"encode={s['encodeSeconds']:.2f}s write={s['writeSeconds']:.2f}s "
+            f"p50={s['latencyP50Ms']:.1f}ms p95={s['latencyP95Ms']:.1f}ms "
+            f"max={s['latencyMaxMs']:.1f}ms"
+        )
+
+
+# -------------------- REGROUPEMENT DES EMBEDDINGS --------------------
+
+
+class EmbeddingBatcher(threading.Thread):
+    """
+    Thread qui regroupe les descriptions soumises par tous les workers en lots,
+    appelle le modèle une seule fois par lot et écrit les vecteurs en une insertion groupée.
+    Un lot part dès qu'il atteint `max_batch_size` ou que sa plus ancienne description
+    attend depuis `max_wait_ms`.
+    """
+
+    def __init__(
+        self,
+        vectorStore: VectorStoreService,
+        max_batch_size: int = MAX_BATCH_SIZE,
+        max_wait_ms: int = MAX_WAIT_MS,
+        *a,
+        **kw,
+    ):
+        kw.setdefault("name", "embedding-batcher")
+        kw.setdefault("daemon", True)
+        super().__init__(*a, **kw)
+        self.vectorStore = vectorStore
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.stats = EmbeddingStats()
+
+        self.cond = threading.Condition()
+        # descriptions en attente :
+        # [chemin] => (texte, instant de soumission, écriture, acquittement)
+        self.pending: OrderedDict[Path, tuple[str, float, Write | None, Ack | None]] = (
+            OrderedDict()
+        )
+        # chemins du lot en cours d'encodage / d'écriture
+        self.inflight: set[Path] = set()
+        self.flushing = False
+        self.stopped = False
+
+    def submit(
+        self,
+        path: Path,
+        text: str,
+        write: Write | None = None,
+        ack: Ack | None = None,
+    ):
+        """
+        Ajoute une description à encoder. Une soumission plus récente
+        pour le même chemin remplace la précédente (son acquittement est reporté
+        sur la nouvelle écriture).
+        `write(chemin, vecteur, ack=ack)` enregistre le vecteur calculé (par défaut
+        `vectorStore.upsertVectors`, suivi de `ack`) ; le chemin est celui du moment
+        de l'écriture (il suit les déplacements survenus entre-temps).
+        """
+        with self.cond:
+            old = self.pending.pop(path, None)
+            if old is not None:
+                ack = chainAcks(old[3], ack)
+            self.pending[path] = (text, time.monotonic(), write, ack)
+            self.cond.notify_all()
+
+    def discard(self, path: Path) -> Ack | None:
+        """
+        Oublie la description en attente d'un chemin supprimé et attend
+        la fin de l'écriture de son lot s'il est en cours.
+        Retourne l'acquittement de la description oubliée, à appeler par l'appelant
+        avec l'écriture qui la remplace (suppression, copie).
+        """
+        with self.cond:
+            item = self.pending.pop(path, None)
+            while path in self.inflight:
+                self.cond.wait()
+        return item[3] if item else None
+
+    def move(self, old: Path, new: Path):
+        """
+        Reporte la description en attente d'un chemin déplacé sur son nouveau chemin.
+        """
+        with self.cond:
+            while old in self.inflight:
+                self.cond.wait()
+            item = self.pending.pop(old, None)
+            if item is not None:
+                self.pending[new] = item
+
+    def discardDir(self, root: Path) -> Ack | None:
+        """
+        Comme `discard`, pour tous les chemins situés sous un dossier supprimé.
+        """
+        with self.cond:
+            acks = [
+                self.pending.pop(path)[3]
+                for path in [p for p in self.pending if p.is_relative_to(root)]
+            ]
+            while any(p.is_relative_to(root) for p in self.inflight):
+                self.cond.wait()
+        return chainAcks(*acks)
+
+    def moveDir(self, old: Path, new: Path):
+        """
+        Comme `move`, pour tous les chemins situés sous un dossier déplacé.
+        """
+        with self.cond:
+            while any(p.is_relative_to(old) for p in self.inflight):
+                self.cond.wait()
+            for path in [p for p in self.pending if p.is_relative_to(old)]:
+                self.pending[new / path.relative_to(old)] = self.pending.pop(path)
+
+    def flush(self):
+        """
+        Force l'envoi immédiat de tout ce qui est en attente et attend son écriture.
+        """
+        with self.cond:
+            self.flushing = True
+            self.cond.notify_all()
+            while self.pending or self.inflight:
+                self.cond.wait()
+            self.flushing = False
+
+    def stop(self):
+        self.flush()
+        with self.cond:
+            self.stopped = True
+            self.cond.notify_all()
+
+    def _next_batch(
+        self,
+    ) -> list[tuple[Path, str, float, Write | None, Ack | None]] | None:
+        with self.cond:
+            while True:
+                if self.stopped:
+                    return None
+                if self.pending:
+                    _, (_, oldest, _, _) = next(iter(self.pending.items()))
+                    wait = oldest + self.max_wait - time.monotonic()
+                    if (
+                        self.flushing
+                        or len(self.pending) >= self.max_batch_size
+                        or wait <= 0
+                    ):
+                        break
+                    self.cond.wait(wait)
+                else:
+                    self.cond.wait()
+
+            batch = []
+            while self.pending and len(batch) < self.max_batch_size:
+                path, (text, submitted, write, ack) = self.pending.popitem(last=False)
+                batch.append((path, text, submitted, write, ack))
+                self.inflight.add(path)
+            return batch
+
+    def _process(self, batch: list[tuple[Path, str, float, Write | None, Ack | None]]):
+        t0 = time.monotonic()
+        # textes déjà encodés servis par le cache du vector store
+        vecs = self.vectorStore.embedTexts([text for _, text, _, _, _ in batch])
+        t1 = time.monotonic()
+        for (path, _, _, write, ack), vec in zip(batch, vecs):
+            if write:
+                write(path, vec, ack=ack)
+            else:
+                self.vectorStore.upsertVectors([(path, vec)])
+                if ack:
+                    ack()
+        t2 = time.monotonic()
+        BATCH_SECONDS.observe(t1 - t0, phase="encode")
+        BATCH_SECONDS.observe(t2 - t1, phase="write")
+        ITEMS_TOTAL.inc(len(batch))
+        for _, _, submitted, _, _ in batch:
+            LATENCY_SECONDS.observe(t2 - submitted)
+        self.stats.record(
+            len(batch),
+            t1 - t0,
+            t2 - t1,
+            [t2 - submitted for _, _, submitted, _, _ in batch],
+        )
+
+    def _processEach(
+        self, batch: list[tuple[Path, str, float, Write | None, Ack | None]]
+    ):
+        """
+        Rejoue un lot en échec description par description : une seule description
+        fautive ne fait pas perdre les autres. Celles qui échouent encore sont
+        abandonnées et leur job acquitté (le fichier, absent ou périmé dans 'files',
+        est retrouvé par la réconciliation suivante).
+        """
+        for item in batch:
+            try:
+                self._process([item])
+            except Exception as e:
+                path, _, _, _, ack = item
+                log("ERROR-EMBEDDING", logging.ERROR, path=path, error=repr(e))
+                if ack:
+                    ack()
+
+    def run(self):
+        last_report = time.monotonic()
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            try:
+                self._process(batch)
+            except Exception as e:
+                log("ERROR-EMBEDDING", logging.ERROR, items=len(batch), error=repr(e))
+                self._processEach(batch)
+            finally:
+                with self.cond:
+                    self.inflight.clear()
+                    self.cond.notify_all()
+
+            if time.monotonic() - last_report >= STATS_EVERY_S:
+                last_report = time.monotonic()
+                log("EMBEDDING-STATS", report=self.stats.report())
+                if self.vectorStore.cache:
+                    log("EMBEDDING-CACHE", report=self.vectorStore.cache.report())
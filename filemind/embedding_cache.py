@@ -0,0 +1,214 @@
+import hashlib, threading, time
+import numpy as np
+from collections import OrderedDict
+
+from .connection import ConnectionPool
+from .metrics import metrics
+
+# nombre de vecteurs gardés en mémoire (LRU devant la table)
+CACHE_MEMORY_ITEMS = 10000
+
+# nombre maximal de vecteurs dans la table `embedding_cache` (les moins récemment utilisés partent)
+CACHE_MAX_ROWS = 200000
+
+# part de la table libérée à chaque éviction (évite d'évincer à chaque insertion)
+CACHE_EVICT_RATIO = 0.1
+
+# nombre d'insertions entre deux vérifications de la taille de la table
+CACHE_EVICT_EVERY = 1000
+
+# nombre maximal de paramètres par requête "IN (...)"
+IN_BATCH = 500
+
+# consultations du cache, par résultat (memory, disk, miss)
+LOOKUPS_TOTAL = metrics.counter(
+    "filemind_embedding_cache_total",
+    "Consultations du cache d'embeddings, par résultat (memory, disk, miss)",
+)
+
+
+def cache_key(model_name: str, space: str, text: str) -> bytes:
+    """
+    Clé d'un texte encodé par un modèle : empreinte BLAKE2b de (modèle, espace, texte).
+    """
+    h = hashlib.blake2b(digest_size=16)
+    for part in (model_name, space, text):
+        h.update(part.encode("utf-8", "surrogatepass"))
+        h.update(b"\0")
+    return h.digest()
+
+
+class EmbeddingCache:
+    """
+    Cache des vecteurs d'embedding adressé par le contenu : un même texte (copies,
+    fichiers seulement touchés, documents générés sur un même modèle) n'est encodé
+    qu'une fois par modèle et par espace.
+    Un LRU en mémoire est placé devant la table `embedding_cache` de la base ;
+    la table est bornée à `max_rows` vecteurs, les moins récemment utilisés
+    sont évincés (date d'usage mise à jour à chaque lecture depuis la table).
+    Usage:
+        cache = EmbeddingCache(db.pool, model.model_name, model.space, dim)
+        vecs = cache.getMany(texts)     # None pour les absents
+        cache.putMany(texts, computed)
+        cache.report()
+    """
+
+    def __init__(
+        self,
+        pool: ConnectionPool,
+        model_name: str,
+        space: str,
+        dim: int,
+        memory_items: int = CACHE_MEMORY_ITEMS,
+        max_rows: int = CACHE_MAX_ROWS,
+    ):
+        self.pool = pool
+        self.model_name = model_name
+        self.space = space
+        self.dim = dim
+        self.memory_items = memory_items
+        self.max_rows = max_rows
+
+        self.lock = threading.Lock()
+        # [clé] => vecteur, du moins récemment utilisé au plus récent
+        self.memory: OrderedDict[bytes, np.ndarray] = OrderedDict()
+        self.inserted = 0
+        self.memoryHits = 0
+        self.diskHits = 0
+        self.misses = 0
+
+        # initialisation de la base de données
+        self.pool.execute(
+            """
+            -- vecteurs déjà calculés, par empreinte de (modèle, espace, texte)
+            CREATE TABLE IF NOT EXISTS embedding_cache(
+              key BLOB PRIMARY KEY,
+              dim INTEGER NOT NULL,
+              vec BLOB NOT NULL,           -- float32[] en BLOB
+              usedAt INTEGER NOT NULL
+            ) WITHOUT ROWID;
+            """
+        )
+        self.pool.execute(
+            "CREATE INDEX IF NOT EXISTS embedding_cache_used ON embedding_cache(usedAt);"
+        )
+
+    def _key(self, text: str) -> bytes:
+        return cache_key(self.model_name, self.space, text)
+
+    def _remember(self, key: bytes, vec: np.ndarray):
+        self.memory[key] = vec
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_items:
+            self.memory.popitem(last=False)
+
+    def getMany(self, texts: list[str]) -> list[np.ndarray | None]:
+        """
+        Vecteurs en cache des textes (None pour ceux à encoder) :
+        LRU en mémoire, puis une lecture groupée de la table.
+        """
+        keys = [self._key(t) for t in texts]
+        out: list[np.ndarray | None] = [None] * len(texts)
+        missing: dict[bytes, list[int]] = {}
+        with self.lock:
+            for i, key in enumerate(keys):
+                vec = self.memory.get(key)
+                if vec is not None:
+                    self.memory.move_to_end(key)
+                    out[i] = vec
+                    self.memoryHits += 1
+                else:
+                    missing.setdefault(key, []).append(i)
+
+        found = {}
+        unique = list(missing)
+        for start in range(0, len(unique), IN_BATCH):
+            chunk = unique[start : start + IN_BATCH]
+            rows = self.pool.query(
+                f"""SELECT key, vec FROM embedding_cache
+                    WHERE dim = ? AND key IN ({",".join("?" * len(chunk))});""",
+                (self.dim, *chunk),
+            )
+            for key, blob in rows:
+                found[key] = np.frombuffer(blob, dtype="float32", count=self.dim)
+
+        if found:
+            now = int(time.time())
+            for key in found:
+                self.pool.submit(
+                    "UPDATE embedding_cache SET usedAt = ? WHERE key = ?;", (now, key)
+                )
+        disk_hits = misses = 0
+        with self.lock:
+            for key, rows in missing.items():
+                vec = found.get(key)
+                if vec is None:
+                    misses += len(rows)
+                    continue
+                disk_hits += len(rows)
+                self._remember(key, vec)
+                for i in rows:
+                    out[i] = vec
+            self.diskHits += disk_hits
+            self.misses += misses
+        LOOKUPS_TOTAL.inc(len(texts) - disk_hits - misses, result="memory")
+        LOOKUPS_TOTAL.inc(disk_hits, result="disk")
+        LOOKUPS_TOTAL.inc(misses, result="miss")
+        return out
+
+    def putMany(self, texts: list[str], vecs: np.ndarray):
+        """
+        Ajoute des vecteurs calculés (écriture différée, validée avec le prochain lot).
+        """
+        now = int(time.time())
+        with self.lock:
+            for text, vec in zip(texts, vecs):
+                key = self._key(text)
+                vec = np.asarray(vec, dtype="float32").reshape(-1)
+                self._remember(key, vec)
+                self.pool.submit(
+                    """INSERT INTO embedding_cache(key, dim, vec, usedAt) VALUES(?,?,?,?)
+                       ON CONFLICT(key) DO UPDATE SET usedAt=excluded.usedAt;""",
+                    (key, self.dim, vec.tobytes(), now),
+                )
+            self.inserted += len(texts)
+            evict = self.inserted >= CACHE_EVICT_EVERY
+            if evict:
+                self.inserted = 0
+        if evict:
+            self.evict()
+
+    def evict(self):
+        """
+        Ramène la table sous `max_rows` vecteurs en retirant les moins récemment
+        utilisés (avec une marge, pour ne pas évincer à chaque insertion).
+        """
+        count = self.pool.query("SELECT COUNT(*) FROM embedding_cache;")[0][0]
+        if count <= self.max_rows:
+            return
+        excess = count - self.max_rows + int(self.max_rows * CACHE_EVICT_RATIO)
+        self.pool.submit(
+            """DELETE FROM embedding_cache WHERE key IN (
+                 SELECT key FROM embedding_cache ORDER BY usedAt LIMIT ?);""",
+            (excess,),
+        )
+
+    def stats(self) -> dict:
+        with self.lock:
+            hits = self.memoryHits + self.diskHits
+            total = hits + self.misses
+            return {
+                "memoryHits": self.memoryHits,
+                "diskHits": self.diskHits,
+                "misses": self.misses,
+                "hitRate": hits / total if total else 0.0,
+                "memoryItems": len(self.memory),
+            }
+
+    def report(self) -> str:
+        s = self.stats()
+        return (
+            f"hits={s['memoryHits']}+{s['diskHits']} (mem+disk) "
+            f"misses={s['misses']} hit_rate={s['hitRate']:.1%} "
+            f"memory={s['memoryItems']}"
+        )
@@ -17,10 +17,19 @@ class EmbeddingModel:
     def getDimension(self):
         return 3
 
-    def encode(self, text: str, normalize_embeddings=True):
-        return np.array([[0.3, 0.3, 0.3]])
+    def encode(self, text: str | list[str], normalize_embeddings=True):
+        n = len(text) if isinstance(text, list) else 1
+        return np.full((n, self.getDimension()), 0.3)
 
     def embed_text(self, text: str) -> np.ndarray:
         # avec normalisation L2
         v = self.encode(text, normalize_embeddings=True)
         return v.astype("float32")
+
+    def embed_texts(self, texts: list[str]) -> np.ndarray:
+        """
+        Encode un lot de textes en un seul appel au modèle.
+        Retourne une matrice (len(texts), dim).
+        """
+        v = self.encode(texts, normalize_embeddings=True)
+        return np.asarray(v, dtype="float32").reshape(len(texts), -1)
@@ -7,34 +7,49 @@ from filemind.config import (
     VIDEO_TYPES,
     DOCUMENT_TYPES,
 )
-from .base import getBaseMetadata, describeGlobalFile
-from .audio import getMetadataAudioFile, describeAudio
-from .pdf import getMetadataPdfFile, describePdf
-from .video import getMetadataVideoFile, describeVideo
-from .image import getMetadataImageFile, describeImage
-from .utils import readContentFile
+from .registry import registry
 from pathlib import Path
 
-LIMIT_LENGHT_DESCRIPTION = 600
+# les backends (pypdf, PIL, tinytag, pymediainfo) ne sont importés qu'au premier fichier de leur type
+registry.register(
+    "text",
+    "filemind.extract.text:extract",
+    extensions=TEXT_TYPES,
+    mimetypes=("text/*",),
+)
+registry.register(
+    "image",
+    "filemind.extract.image:extract",
+    "filemind.extract.image:getMetadataImageFile",
+    extensions=IMAGE_TYPES,
+)
+registry.register(
+    "audio",
+    "filemind.extract.audio:extract",
+    "filemind.extract.audio:getMetadataAudioFile",
+    extensions=AUDIO_TYPES,
+)
+registry.register(
+    "video",
+    "filemind.extract.video:extract",
+    "filemind.extract.video:getMetadataVideoFile",
+    extensions=VIDEO_TYPES,
+)
+registry.register(
+    "pdf",
+    "filemind.extract.pdf:extract",
+    "filemind.extract.pdf:getMetadataPdfFile",
+    extensions=[t for t in DOCUMENT_TYPES if t == ".pdf"],
+    mimetypes=("application/pdf",),
+)
 
 
 def filetype(path: Path):
     """
-    Determine the type of file based on its extension.
+    Determine the type of file based on its extension (or MIME type).
     """
-    ext = path.suffix.lower()
-    if ext in TEXT_TYPES:
-        return "text"
-    elif ext in IMAGE_TYPES:
-        return "image"
-    elif ext in AUDIO_TYPES:
-        return "audio"
-    elif ext in VIDEO_TYPES:
-        return "video"
-    elif ext in DOCUMENT_TYPES:
-        if ext == ".pdf":
-            return "pdf"
-    return None
+    spec = registry.lookup(path)
+    return spec.fileType if spec else None
 
 
 def getMetadataFile(pathfile: str):
@@ -42,37 +57,19 @@ def getMetadataFile(pathfile: str):
     if not os.path.exists(pathfile):
         return None
 
-    file_type = filetype(pathfile)
-    if not file_type:
+    spec = registry.lookup(pathfile)
+    if not spec:
         return None
 
+    from .base import getBaseMetadata
+
     base_metadatas = getBaseMetadata(pathfile)
+    base_metadatas.fileType = spec.fileType
     metadata = {}
 
-    if file_type == "text":
-        metadata = base_metadatas.model_dump()
-        metadata["baseMetadata"] = None
-        base_metadatas.fileType = "text"
-
-    if file_type == "image":
-        metadata = getMetadataImageFile(pathfile).model_dump()
-        metadata["baseMetadata"] = None
-        base_metadatas.fileType = "image"
-
-    elif file_type == "audio":
-        metadata = getMetadataAudioFile(pathfile).model_dump()
-        metadata["baseMetadata"] = None
-        base_metadatas.fileType = "audio"
-
-    elif file_type == "video":
-        metadata = getMetadataVideoFile(pathfile).model_dump()
-        metadata["baseMetadata"] = None
-        base_metadatas.fileType = "video"
-
-    elif file_type == "pdf":
-        metadata = getMetadataPdfFile(pathfile).model_dump()
-        metadata["baseMetadata"] = None
-        base_metadatas.fileType = "pdf"
+    if spec.metadata:
+        metadata = registry.load(spec.metadata)(pathfile).model_dump()
+    metadata["baseMetadata"] = None
 
     base_metadatas = base_metadatas.model_dump()
     base_metadatas.update(metadata)
@@ -87,41 +84,14 @@ def extractFile(path: Path):
     if not path.exists():
         return None
 
-    file_type = filetype(path)
-    if not file_type:
+    spec = registry.lookup(path)
+    if not spec:
         return None
 
-    if file_type == "text":
-        metadata = getBaseMetadata(path)
-        metadata.fileType = "text"
-        description = describeGlobalFile(
-            metadata, readContentFile(path), LIMIT_LENGHT_DESCRIPTION
-        )
-
-    if file_type == "image":
-        res = getMetadataImageFile(path)
-        description = describeImage(res, "", LIMIT_LENGHT_DESCRIPTION)
-        metadata = res.baseMetadata.model_copy()
-        metadata.fileType = "image"
-
-    elif file_type == "audio":
-        metadata = getMetadataAudioFile(path)
-        description = describeAudio(metadata, "", LIMIT_LENGHT_DESCRIPTION)
-        metadata = metadata.baseMetadata
-        metadata.fileType = "audio"
-
-    elif file_type == "video":
-        metadata = getMetadataVideoFile(path)
-        description = describeVideo(metadata, "", LIMIT_LENGHT_DESCRIPTION)
-        metadata = metadata.baseMetadata
-        metadata.fileType = "video"
-
-    elif file_type == "pdf":
-        metadata = getMetadataPdfFile(path)
-        description = describePdf(metadata, "", LIMIT_LENGHT_DESCRIPTION)
-        metadata = metadata.baseMetadata
-        metadata.fileType = "pdf"
-    else:
+    result = registry.load(spec.extract)(path)
+    if not result:
         return None
 
+    metadata, description = result
+    metadata.fileType = spec.fileType
     return metadata, description
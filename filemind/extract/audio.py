@@ -2,7 +2,7 @@ from typing import List, Optional
 from pydantic import BaseModel
 from tinytag import TinyTag
 
-from .base import BaseMetadata, getBaseMetadata
+from .base import LIMIT_LENGHT_DESCRIPTION, BaseMetadata, getBaseMetadata
 from .utils import (
     format_list,
     format_channels,
@@ -159,3 +159,12 @@ def describeAudio(
             description += "."
 
     return description
+
+
+def extract(pathfile: str) -> tuple[BaseMetadata, str]:
+    """
+    Extracteur du registre : métadonnées de base et description.
+    """
+    res = getMetadataAudioFile(pathfile)
+    description = describeAudio(res, "", LIMIT_LENGHT_DESCRIPTION)
+    return res.baseMetadata, description
@@ -4,6 +4,12 @@ from pydantic import BaseModel
 
 from .utils import format_filesize, format_timestamp, shorten
 
+# longueur maximale du contenu repris dans une description
+LIMIT_LENGHT_DESCRIPTION = 600
+
+# début du contenu extrait dans une description (après les métadonnées)
+CONTENT_MARKERS = (" Contexte : ", " Contenu textuel : ")
+
 
 class BaseMetadata(BaseModel):
     fileCreatedAt: int
@@ -11,6 +17,7 @@ class BaseMetadata(BaseModel):
     fileAccessedAt: int
     fileSize: int
     fileType: Optional[str] = None
+    fileName: Optional[str] = None
 
 
 def getBaseMetadata(pathfile: str) -> BaseMetadata:
@@ -20,6 +27,7 @@ def getBaseMetadata(pathfile: str) -> BaseMetadata:
         fileUpdatedAt=int(file_stat.st_mtime),
         fileAccessedAt=int(file_stat.st_atime),
         fileSize=int(file_stat.st_size),
+        fileName=os.path.basename(pathfile),
     )
 
 
@@ -34,7 +42,7 @@ def describeGlobalFile(
     date_acces = format_timestamp(metadatas.fileAccessedAt)
 
     intro = (
-        f"Le fichier « {metadatas.filename} » a une taille de {taille}. "
+        f"Le fichier « {metadatas.fileName} » a une taille de {taille}. "
         f"Il a été créé le {date_creation}, modifié pour la dernière fois le {date_modif}, "
         f"et consulté en dernier le {date_acces}."
     )
@@ -46,3 +54,13 @@ def describeGlobalFile(
         return f"{intro} Contexte : {extrait}{suffix}"
 
     return intro
+
+
+def describeCopy(metadatas: BaseMetadata, description: str) -> str:
+    """
+    Description d'une copie identique d'un fichier déjà décrit : introduction refaite
+    avec ses propres métadonnées (nom, taille, dates), contenu extrait repris tel quel.
+    """
+    intro = describeGlobalFile(metadatas)
+    starts = [i for i in map(description.find, CONTENT_MARKERS) if i >= 0]
+    return intro + description[min(starts) :] if starts else intro
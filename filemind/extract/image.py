@@ -2,7 +2,7 @@ from PIL import Image
 from PIL.ExifTags import TAGS as PIL_TAGS
 from pydantic import BaseModel
 from typing import Any, Dict, Optional
-from .base import BaseMetadata, getBaseMetadata
+from .base import LIMIT_LENGHT_DESCRIPTION, BaseMetadata, getBaseMetadata
 
 from .utils import format_filesize, format_timestamp, join_sentences, shorten
 
@@ -118,3 +118,12 @@ def describeImage(
             description += "."
 
     return description
+
+
+def extract(pathfile: str) -> tuple[BaseMetadata, str]:
+    """
+    Extracteur du registre : métadonnées de base et description.
+    """
+    res = getMetadataImageFile(pathfile)
+    description = describeImage(res, "", LIMIT_LENGHT_DESCRIPTION)
+    return res.baseMetadata.model_copy(), description
@@ -1,43 +1,147 @@
-from pypdf import PdfReader
+import logging, time
+from pypdf import PageObject, PdfReader
+from pypdf.generic import DictionaryObject, IndirectObject
 from pydantic import BaseModel
-from typing import Optional
-from .base import BaseMetadata, getBaseMetadata
+from typing import Iterator, Optional
+from ..logs import log
+from .base import LIMIT_LENGHT_DESCRIPTION, BaseMetadata, getBaseMetadata
 
 from .utils import (
+    ExtractionTimeout,
     format_filesize,
     join_sentences,
     format_timestamp,
     shorten,
+    timeLimit,
 )
 
+# nombre maximal de pages lues pour le contenu textuel
+PDF_MAX_PAGES = 5
 
-class PdfMetadata(BaseModel):
-    baseMetadata: BaseMetadata
+# attributs qu'une page hérite des nœuds de l'arbre des pages
+INHERITED_PAGE_KEYS = ("/Resources", "/MediaBox", "/CropBox", "/Rotate")
 
-    title: Optional[str]
-    author: Optional[str]
-    subject: Optional[str]
-    creator: Optional[str]
-    producer: Optional[str]
+# budget de temps (en secondes) de l'extraction du texte d'un PDF
+PDF_TIME_BUDGET_S = 5.0
 
+# au-delà de cette taille (en octets), on ne lit que les métadonnées
+PDF_MAX_BYTES = 200 * 1024 * 1024
 
-def getMetadataPdfFile(pathfile: str) -> PdfMetadata:
-    reader = PdfReader(pathfile)
-    metadata = reader.metadata
+# avertissements de pypdf (fichier abîmé...) : l'échec est déjà signalé par PDF-METADATA-ONLY
+logging.getLogger("pypdf").setLevel(logging.ERROR)
 
-    if metadata is None:
-        return PdfMetadata()
 
+class PdfMetadata(BaseModel):
+    baseMetadata: BaseMetadata
+
+    title: Optional[str] = None
+    author: Optional[str] = None
+    subject: Optional[str] = None
+    creator: Optional[str] = None
+    producer: Optional[str] = None
+
+
+def _openPdf(file) -> PdfReader | None:
+    """
+    Ouvre un PDF sans le charger en mémoire (lecture à la demande dans `file`).
+    Un PDF chiffré n'est lisible que si son mot de passe utilisateur est vide.
+    """
+    reader = PdfReader(file, strict=False)
+    if reader.is_encrypted:
+        try:
+            if not reader.decrypt(""):
+                return None
+        except Exception:
+            return None
+    return reader
+
+
+def _pdfMetadata(reader: PdfReader | None, base: BaseMetadata) -> PdfMetadata:
+    info = reader.metadata if reader else None
+    if info is None:
+        return PdfMetadata(baseMetadata=base)
     return PdfMetadata(
-        baseMetadata=getBaseMetadata(pathfile),
-        title=metadata.title,
-        author=metadata.author,
-        subject=metadata.subject,
-        creator=metadata.creator,
-        producer=metadata.producer,
+        baseMetadata=base,
+        title=info.title,
+        author=info.author,
+        subject=info.subject,
+        creator=info.creator,
+        producer=info.producer,
     )
 
 
+def firstPages(reader: PdfReader, n: int) -> Iterator[PageObject]:
+    """
+    Les `n` premières pages, en ne lisant que les nœuds de l'arbre des pages qui y
+    mènent (`reader.pages` lit l'arbre entier au premier accès). Les attributs hérités
+    sont recopiés sur chaque page, comme le fait pypdf.
+    """
+    stack = [(reader.root_object["/Pages"], {})]
+    seen = set()
+    while stack and n > 0:
+        ref, inherited = stack.pop()
+        node = ref.get_object()
+        if isinstance(ref, IndirectObject):
+            if ref.idnum in seen:
+                # arbre abîmé : un nœud déjà parcouru (cycle)
+                continue
+            seen.add(ref.idnum)
+        if not isinstance(node, DictionaryObject):
+            continue
+        kind = node.get("/Type") or ("/Pages" if "/Kids" in node else "/Page")
+        if kind == "/Pages":
+            inherited = inherited | {
+                k: node[k] for k in INHERITED_PAGE_KEYS if k in node
+            }
+            # pile : premier enfant au sommet
+            stack.extend((kid, inherited) for kid in reversed(node.get("/Kids", [])))
+        else:
+            page = PageObject(reader, ref if isinstance(ref, IndirectObject) else None)
+            page.update(inherited)
+            page.update(node)
+            n -= 1
+            yield page
+
+
+def extractPdfText(
+    reader: PdfReader,
+    max_chars: int = LIMIT_LENGHT_DESCRIPTION,
+    max_pages: int = PDF_MAX_PAGES,
+    time_budget: float = PDF_TIME_BUDGET_S,
+) -> Optional[str]:
+    """
+    Texte des premières pages, page par page, jusqu'à `max_chars` caractères,
+    `max_pages` pages ou `time_budget` secondes : un budget dépassé rend
+    le texte déjà lu. Les pages suivantes ne sont jamais décodées.
+    """
+    parts: list[str] = []
+    length = 0
+    deadline = time.monotonic() + time_budget
+    with timeLimit(time_budget):
+        try:
+            for page in firstPages(reader, max_pages):
+                text = (page.extract_text() or "").strip()
+                if text:
+                    parts.append(text)
+                    length += len(text)
+                if length >= max_chars or time.monotonic() >= deadline:
+                    break
+        except ExtractionTimeout:
+            pass
+    return " ".join(parts)[:max_chars] or None
+
+
+def getMetadataPdfFile(pathfile: str) -> PdfMetadata:
+    base = getBaseMetadata(pathfile)
+    try:
+        with open(pathfile, "rb") as file:
+            return _pdfMetadata(_openPdf(file), base)
+    except Exception as e:
+        # PDF illisible : métadonnées de base seulement
+        log("PDF-METADATA-ONLY", logging.WARNING, path=pathfile, error=repr(e))
+        return PdfMetadata(baseMetadata=base)
+
+
 def describePdf(
     metadata: PdfMetadata,
     contenu_textuel: Optional[str] = None,
@@ -96,3 +200,22 @@ def describePdf(
             description += "."
 
     return description
+
+
+def extract(pathfile: str) -> tuple[BaseMetadata, str]:
+    """
+    Extracteur du registre : métadonnées, puis texte des premières pages
+    dans les budgets de pages, de temps et de taille. Un PDF chiffré ou
+    mal formé donne une description à partir des seules métadonnées.
+    """
+    base = getBaseMetadata(pathfile)
+    res, text = PdfMetadata(baseMetadata=base), None
+    try:
+        with open(pathfile, "rb") as file:
+            reader = _openPdf(file)
+            res = _pdfMetadata(reader, base)
+            if reader is not None and base.fileSize <= PDF_MAX_BYTES:
+                text = extractPdfText(reader)
+    except Exception as e:
+        log("PDF-METADATA-ONLY", logging.WARNING, path=pathfile, error=repr(e))
+    return res.baseMetadata, describePdf(res, text, LIMIT_LENGHT_DESCRIPTION)
@@ -0,0 +1,207 @@
+import logging, multiprocessing, os, threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+from ..logs import log, loggingConfig
+from . import extractFile, filetype
+from .base import BaseMetadata
+from .registry import registry, restore
+from .utils import ExtractionTimeout, memoryLimit, timeLimit
+
+# nombre de processus d'extraction
+EXTRACT_PROCESSES = os.cpu_count() or 1
+
+# nombre maximal d'extractions simultanées par type de fichier
+TYPE_CONCURRENCY = {
+    "text": EXTRACT_PROCESSES,
+    "image": EXTRACT_PROCESSES,
+    "audio": EXTRACT_PROCESSES,
+    "pdf": max(1, EXTRACT_PROCESSES // 2),
+    "video": max(1, EXTRACT_PROCESSES // 2),
+}
+
+# budget de temps d'une extraction par type de fichier (en secondes, None : sans limite)
+TYPE_TIME_BUDGET_S = {
+    "text": 10,
+    "image": 30,
+    "audio": 30,
+    "pdf": 60,
+    "video": 60,
+}
+
+# budget mémoire (espace d'adressage du processus d'extraction, en Mo) par type de fichier
+TYPE_MEMORY_BUDGET_MB = {
+    "text": 1024,
+    "image": 2048,
+    "audio": 1024,
+    "pdf": 2048,
+    "video": 1024,
+}
+
+# délai de grâce (en secondes) après le budget de temps avant de tuer le processus :
+# une extraction bloquée dans du code C n'est pas interrompue par SIGALRM
+HARD_TIMEOUT_GRACE_S = 5
+
+# méthode de démarrage des processus ("spawn" : sûr avec les threads du watcher)
+START_METHOD = "spawn"
+
+
+class ExtractResult(NamedTuple):
+    """
+    Résultat compact (picklable) d'une extraction faite dans un processus fils.
+    """
+
+    fileType: Optional[str]
+    fileName: Optional[str]
+    fileSize: int
+    fileCreatedAt: int
+    fileUpdatedAt: int
+    fileAccessedAt: int
+    description: str
+
+    def metadata(self) -> BaseMetadata:
+        return BaseMetadata(
+            fileCreatedAt=self.fileCreatedAt,
+            fileUpdatedAt=self.fileUpdatedAt,
+            fileAccessedAt=self.fileAccessedAt,
+            fileSize=self.fileSize,
+            fileType=self.fileType,
+            fileName=self.fileName,
+        )
+
+
+def extract_record(
+    pathfile: str,
+    time_budget: float | None = None,
+    memory_budget: int | None = None,
+) -> ExtractResult | None:
+    """
+    Extraction exécutée dans un processus fils : seul un enregistrement compact
+    repasse au processus parent. Les budgets dépassés lèvent ExtractionTimeout
+    ou MemoryError, renvoyées au parent.
+    """
+    with memoryLimit(memory_budget), timeLimit(time_budget):
+        result = extractFile(Path(pathfile))
+    if not result:
+        return None
+    metadata, description = result
+    return ExtractResult(
+        metadata.fileType,
+        metadata.fileName,
+        metadata.fileSize,
+        metadata.fileCreatedAt,
+        metadata.fileUpdatedAt,
+        metadata.fileAccessedAt,
+        description,
+    )
+
+
+class ExtractionPool:
+    """
+    Pool de processus pour les extractions coûteuses en CPU (PDF, EXIF, descriptions),
+    qui ne sont plus sérialisées par le GIL des threads Worker.
+    Le nombre d'extractions simultanées est limité par type de fichier, et chaque
+    extraction a un budget de temps et de mémoire selon son type. Une extraction
+    qui ne rend pas la main après son budget (plus un délai de grâce) est abandonnée :
+    les processus sont tués et le pool remplacé, les autres extractions en cours
+    sont relancées une fois.
+    Usage:
+        pool = ExtractionPool()
+        metadata, description = pool.extract(path)
+    """
+
+    def __init__(
+        self,
+        processes: int = EXTRACT_PROCESSES,
+        concurrency: dict[str, int] = TYPE_CONCURRENCY,
+        time_budgets: dict[str, float] = TYPE_TIME_BUDGET_S,
+        memory_budgets: dict[str, int] = TYPE_MEMORY_BUDGET_MB,
+        grace: float = HARD_TIMEOUT_GRACE_S,
+        start_method: str = START_METHOD,
+    ):
+        self.processes = processes
+        self.start_method = start_method
+        self.time_budgets = time_budgets
+        self.memory_budgets = memory_budgets
+        self.grace = grace
+        self.lock = threading.Lock()
+        self.pool = self._newPool()
+        # pas plus de tâches soumises que de processus : une tâche démarre dès sa soumission
+        # (le délai d'abandon ne compte pas l'attente derrière les autres)
+        self.slots = threading.BoundedSemaphore(processes)
+        self.semaphores = {
+            kind: threading.BoundedSemaphore(n) for kind, n in concurrency.items()
+        }
+
+    def _newPool(self) -> ProcessPoolExecutor:
+        # les extracteurs enregistrés ici (tiers compris) et le journal sont rejoués
+        # dans chaque processus
+        return ProcessPoolExecutor(
+            max_workers=self.processes,
+            mp_context=multiprocessing.get_context(self.start_method),
+            initializer=restore,
+            initargs=(registry.snapshot(), loggingConfig()),
+        )
+
+    def _restart(self, broken: ProcessPoolExecutor):
+        """
+        Tue les processus d'un pool (extraction bloquée) et le remplace.
+        Sans effet si un autre thread l'a déjà remplacé.
+        """
+        with self.lock:
+            if self.pool is not broken:
+                return
+            for process in list((broken._processes or {}).values()):
+                process.kill()
+            broken.shutdown(wait=False, cancel_futures=True)
+            self.pool = self._newPool()
+            log("EXTRACT-POOL-RESTARTED", logging.WARNING)
+
+    def _run(self, path: Path, kind: str) -> ExtractResult | None:
+        seconds = self.time_budgets.get(kind)
+        memory = self.memory_budgets.get(kind)
+        memory = memory * 1024 * 1024 if memory else None
+        for attempt in (1, 2):
+            pool = self.pool
+            with self.slots:
+                future = pool.submit(extract_record, str(path), seconds, memory)
+                try:
+                    return future.result(
+                        timeout=seconds + self.grace if seconds else None
+                    )
+                except TimeoutError:
+                    self._restart(pool)
+                    raise ExtractionTimeout(
+                        f"{kind}: pas de réponse après {seconds + self.grace:g}s"
+                    )
+                except BrokenProcessPool:
+                    # processus tué (extraction bloquée d'un autre fichier, mémoire...) :
+                    # on relance une fois sur un pool neuf
+                    self._restart(pool)
+                    if attempt == 2:
+                        raise
+
+    def extract(self, path: Path) -> tuple[BaseMetadata, str] | None:
+        """
+        Même contrat que `extractFile`, mais exécuté dans le pool de processus.
+        Lève ExtractionTimeout ou MemoryError si le budget du type est dépassé.
+        """
+        kind = filetype(path)
+        if not kind:
+            return None
+
+        sem = self.semaphores.get(kind)
+        if sem is None:
+            record = self._run(path, kind)
+        else:
+            with sem:
+                record = self._run(path, kind)
+
+        if record is None:
+            return None
+        return record.metadata(), record.description
+
+    def shutdown(self):
+        self.pool.shutdown(wait=True, cancel_futures=True)
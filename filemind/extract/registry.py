@@ -0,0 +1,141 @@
+import importlib, logging, os, signal, threading
+from pathlib import Path
+from typing import Any, Callable, NamedTuple
+
+from ..logs import log, setupLogging
+
+# groupe des points d'entrée des extracteurs tiers (paquets installés)
+ENTRY_POINT_GROUP = "filemind.extractors"
+
+
+class ExtractorSpec(NamedTuple):
+    """
+    Extracteur d'un type de fichier. Les cibles sont des références "module:attribut"
+    importées au premier usage : aucun backend (pypdf, PIL...) n'est chargé avant.
+    - extract(path) -> (BaseMetadata, description) | None
+    - metadata(path) -> modèle pydantic des métadonnées détaillées (optionnel)
+    """
+
+    fileType: str
+    extract: str
+    metadata: str | None = None
+
+
+def resolve(target: str) -> Callable[..., Any]:
+    """
+    Importe et retourne l'objet désigné par "module:attribut".
+    """
+    module, _, attr = target.partition(":")
+    return getattr(importlib.import_module(module), attr)
+
+
+class ExtractorRegistry:
+    """
+    Table extension / type MIME => extracteur, avec dispatch par dictionnaire.
+    Les extracteurs tiers s'enregistrent par `register` ou par un point d'entrée
+    du groupe "filemind.extractors" (fonction appelée avec le registre),
+    découvert au premier usage.
+    Usage:
+        registry.register("epub", "monpaquet.epub:extract", extensions=(".epub",))
+        spec = registry.lookup(path)
+        metadata, description = registry.load(spec.extract)(path)
+    """
+
+    def __init__(self):
+        self.byExt: dict[str, ExtractorSpec] = {}
+        self.byMime: dict[str, ExtractorSpec] = {}
+        # enregistrements dans l'ordre (rejoués dans les processus d'extraction)
+        self.registrations: list[tuple] = []
+        self.loaded: dict[str, Callable[..., Any]] = {}
+        self.pluginsLoaded = False
+        self.lock = threading.RLock()
+
+    def register(
+        self,
+        fileType: str,
+        extract: str,
+        metadata: str | None = None,
+        extensions: tuple[str, ...] = (),
+        mimetypes: tuple[str, ...] = (),
+    ):
+        """
+        Associe des extensions (".pdf") et des types MIME ("application/pdf",
+        "text/*") à un extracteur. Un enregistrement plus récent remplace le précédent.
+        """
+        spec = ExtractorSpec(fileType, extract, metadata)
+        with self.lock:
+            for ext in extensions:
+                self.byExt[ext.lower()] = spec
+            for mime in mimetypes:
+                self.byMime[mime.lower()] = spec
+            self.registrations.append(
+                (fileType, extract, metadata, tuple(extensions), tuple(mimetypes))
+            )
+
+    def _loadPlugins(self):
+        with self.lock:
+            if self.pluginsLoaded:
+                return
+            self.pluginsLoaded = True
+            from importlib.metadata import entry_points
+
+            for ep in entry_points(group=ENTRY_POINT_GROUP):
+                try:
+                    ep.load()(self)
+                except Exception as e:
+                    log("ERROR-PLUGIN", logging.ERROR, plugin=ep.name, error=repr(e))
+
+    def lookup(self, path: str | Path) -> ExtractorSpec | None:
+        """
+        Extracteur d'un fichier : par extension, sinon par type MIME deviné du nom.
+        """
+        if not self.pluginsLoaded:
+            self._loadPlugins()
+        spec = self.byExt.get(os.path.splitext(str(path))[1].lower())
+        if spec is None and self.byMime:
+            import mimetypes
+
+            mime, _ = mimetypes.guess_type(str(path))
+            if mime:
+                spec = self.byMime.get(mime) or self.byMime.get(
+                    mime.split("/")[0] + "/*"
+                )
+        return spec
+
+    def load(self, target: str) -> Callable[..., Any]:
+        """
+        Importe la cible au premier appel, puis la sert depuis le cache.
+        """
+        fn = self.loaded.get(target)
+        if fn is None:
+            with self.lock:
+                fn = self.loaded.get(target)
+                if fn is None:
+                    fn = self.loaded[target] = resolve(target)
+        return fn
+
+    def snapshot(self) -> list[tuple]:
+        """
+        Enregistrements faits jusqu'ici (picklables), pour `restore` dans un autre processus.
+        """
+        with self.lock:
+            return list(self.registrations)
+
+    def restore(self, registrations: list[tuple]):
+        for registration in registrations:
+            self.register(*registration)
+
+
+registry = ExtractorRegistry()
+
+
+def restore(registrations: list[tuple], logging_config: tuple[str, str] | None = None):
+    """
+    Initialisation d'un processus d'extraction : rejoue les enregistrements
+    et les réglages du journal du parent.
+    """
+    # Ctrl-C est traité par le parent, qui arrête le pool
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if logging_config:
+        setupLogging(*logging_config)
+    registry.restore(registrations)
@@ -0,0 +1,18 @@
+from .base import (
+    LIMIT_LENGHT_DESCRIPTION,
+    BaseMetadata,
+    describeGlobalFile,
+    getBaseMetadata,
+)
+from .utils import readContentFile
+
+
+def extract(pathfile: str) -> tuple[BaseMetadata, str]:
+    """
+    Extracteur du registre pour les fichiers texte : on ne lit que le début
+    nécessaire à la description (contenu binaire : description des seules
+    métadonnées, nom, taille et dates).
+    """
+    metadata = getBaseMetadata(pathfile)
+    content = readContentFile(pathfile, LIMIT_LENGHT_DESCRIPTION + 1)
+    return metadata, describeGlobalFile(metadata, content, LIMIT_LENGHT_DESCRIPTION)
@@ -1,6 +1,31 @@
+import codecs, signal, threading, time
+from contextlib import contextmanager
 from typing import Optional, List
 from datetime import datetime
 
+# taille des blocs lus dans les fichiers texte
+READ_CHUNK = 8192
+
+# nombre maximal de caractères lus par défaut en tête d'un fichier texte
+MAX_CONTENT_CHARS = 4096
+
+# proportion maximale d'octets de contrôle dans un contenu considéré comme textuel
+MAX_CONTROL_RATIO = 0.30
+
+# encodages essayés (dans l'ordre) quand aucun BOM n'est présent
+FALLBACK_ENCODINGS = ("utf-8", "cp1252", "latin-1")
+
+BOMS = (
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+
+# octets de contrôle qu'on ne trouve pas dans du texte (hors \t \n \f \r et ESC)
+_CONTROL_BYTES = bytes(set(range(32)) - {8, 9, 10, 12, 13, 27}) + b"\x7f"
+
 
 # ---------- Utilitaires ----------
 def format_duration(seconds: Optional[float]) -> Optional[str]:
@@ -94,8 +119,124 @@ def format_timestamp(ts: Optional[int]) -> Optional[str]:
     return datetime.fromtimestamp(ts).strftime("%d/%m/%Y %H:%M")
 
 
-def readContentFile(pathfile: str):
-    with open(pathfile, "r") as file:
-        content = file.read()
-
-    return content
+def looksBinary(head: bytes) -> bool:
+    """
+    Vrai si le début d'un fichier ressemble à du binaire (octet nul ou trop d'octets de contrôle).
+    """
+    if not head:
+        return False
+    if b"\x00" in head:
+        return True
+    control = len(head) - len(head.translate(None, _CONTROL_BYTES))
+    return control / len(head) > MAX_CONTROL_RATIO
+
+
+def detectEncoding(head: bytes) -> str:
+    """
+    Détecte l'encodage d'un début de fichier (BOM, sinon premier encodage qui le décode).
+    """
+    for bom, encoding in BOMS:
+        if head.startswith(bom):
+            return encoding
+    for encoding in FALLBACK_ENCODINGS:
+        try:
+            # final=False : une séquence multi-octets coupée en fin de bloc n'est pas une erreur
+            codecs.getincrementaldecoder(encoding)().decode(head, final=False)
+            return encoding
+        except UnicodeDecodeError:
+            continue
+    return "latin-1"
+
+
+class ExtractionTimeout(Exception):
+    """
+    Budget de temps d'une extraction dépassé.
+    """
+
+
+@contextmanager
+def timeLimit(seconds: Optional[float]):
+    """
+    Interrompt le bloc par ExtractionTimeout au bout de `seconds` secondes (SIGALRM),
+    même au milieu d'un appel de bibliothèque. Effectif seulement dans le thread
+    principal d'un processus (cas des processus d'extraction) ; ailleurs le bloc
+    s'exécute sans limite. Un budget englobant plus court reste prioritaire.
+    """
+    if (
+        not seconds
+        or not hasattr(signal, "setitimer")
+        or threading.current_thread() is not threading.main_thread()
+    ):
+        yield
+        return
+
+    def _timeout(signum, frame):
+        raise ExtractionTimeout("budget de temps dépassé")
+
+    outer, _ = signal.getitimer(signal.ITIMER_REAL)
+    start = time.monotonic()
+    previous = signal.signal(signal.SIGALRM, _timeout)
+    signal.setitimer(signal.ITIMER_REAL, min(seconds, outer) if outer else seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+        if outer:
+            # on réarme le budget englobant pour le temps qui lui reste
+            left = outer - (time.monotonic() - start)
+            signal.setitimer(signal.ITIMER_REAL, max(left, 1e-3))
+
+
+@contextmanager
+def memoryLimit(limit_bytes: Optional[int]):
+    """
+    Limite l'espace d'adressage du processus à `limit_bytes` pendant le bloc
+    (RLIMIT_AS, limite souple) : une allocation au-delà lève MemoryError au lieu
+    de faire tomber la machine. À n'utiliser que dans un processus d'extraction
+    (la limite s'applique à tout le processus) ; sans effet hors POSIX.
+    """
+    try:
+        import resource
+    except ImportError:
+        resource = None
+    if not limit_bytes or resource is None:
+        yield
+        return
+
+    soft, hard = resource.getrlimit(resource.RLIMIT_AS)
+    if hard != resource.RLIM_INFINITY:
+        limit_bytes = min(limit_bytes, hard)
+    resource.setrlimit(resource.RLIMIT_AS, (limit_bytes, hard))
+    try:
+        yield
+    finally:
+        resource.setrlimit(resource.RLIMIT_AS, (soft, hard))
+
+
+def readContentFile(pathfile: str, limit: int = MAX_CONTENT_CHARS) -> Optional[str]:
+    """
+    Lit au plus `limit` caractères en tête d'un fichier texte, par blocs,
+    sans jamais charger le fichier entier. Retourne None si le contenu semble binaire.
+    """
+    with open(pathfile, "rb") as file:
+        head = file.read(READ_CHUNK)
+
+        # les fichiers UTF-16/32 contiennent des octets nuls : on regarde le BOM d'abord
+        encoding = detectEncoding(head)
+        if encoding not in ("utf-16", "utf-32") and looksBinary(head):
+            return None
+
+        decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+        parts = [decoder.decode(head)]
+        length = len(parts[0])
+        while length < limit:
+            chunk = file.read(READ_CHUNK)
+            if not chunk:
+                parts.append(decoder.decode(b"", final=True))
+                break
+            text = decoder.decode(chunk)
+            parts.append(text)
+            length += len(text)
+
+    return "".join(parts)[:limit]
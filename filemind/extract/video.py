@@ -1,7 +1,7 @@
 from pymediainfo import MediaInfo
 from pydantic import BaseModel
 from typing import Optional
-from .base import BaseMetadata, getBaseMetadata
+from .base import LIMIT_LENGHT_DESCRIPTION, BaseMetadata, getBaseMetadata
 
 from .utils import (
     format_filesize,
@@ -104,3 +104,12 @@ def describeVideo(
             description += "."
 
     return description
+
+
+def extract(pathfile: str) -> tuple[BaseMetadata, str]:
+    """
+    Extracteur du registre : métadonnées de base et description.
+    """
+    res = getMetadataVideoFile(pathfile)
+    description = describeVideo(res, "", LIMIT_LENGHT_DESCRIPTION)
+    return res.baseMetadata, description
@@ -0,0 +1,65 @@
+import hashlib, os
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+# calcule aussi une empreinte du contenu (évite de réindexer un fichier seulement "touché")
+CONTENT_HASH = False
+
+# taille des blocs lus pour le hachage du contenu
+HASH_CHUNK = 1 << 20
+
+# octets hachés en tête et en queue de fichier (pré-filtre des doublons)
+HEAD_BYTES = 4096
+
+
+class Fingerprint(NamedTuple):
+    """
+    Empreinte d'un fichier stockée dans la table 'files' pour détecter les changements.
+    """
+
+    size: int
+    mtimeNs: int
+    inode: int
+    contentHash: Optional[str] = None
+
+    @classmethod
+    def from_stat(cls, st: os.stat_result) -> "Fingerprint":
+        return cls(int(st.st_size), int(st.st_mtime_ns), int(st.st_ino))
+
+    def same_stat(self, other: "Fingerprint") -> bool:
+        """
+        Vrai si taille, date de modification et inode sont identiques.
+        """
+        return (self.size, self.mtimeNs, self.inode) == (
+            other.size,
+            other.mtimeNs,
+            other.inode,
+        )
+
+
+def content_hash(p: Path) -> str:
+    """
+    Empreinte BLAKE2b du contenu complet du fichier, lu par blocs.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    with open(p, "rb") as f:
+        while chunk := f.read(HASH_CHUNK):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def head_hash(p: Path, size: int, head_bytes: int = HEAD_BYTES) -> str:
+    """
+    Empreinte BLAKE2b des premiers et derniers `head_bytes` octets (et de la taille) :
+    deux lectures au plus, pour écarter la plupart des faux doublons avant
+    le hachage complet.
+    """
+    h = hashlib.blake2b(str(size).encode(), digest_size=16)
+    with open(p, "rb") as f:
+        h.update(f.read(head_bytes))
+        if size > 2 * head_bytes:
+            f.seek(-head_bytes, os.SEEK_END)
+            h.update(f.read(head_bytes))
+        else:
+            h.update(f.read())
+    return h.hexdigest()
@@ -1,40 +1,226 @@
 import queue, threading, time
+from collections import OrderedDict
 from pathlib import Path
-from watchdog.events import FileSystemEventHandler, FileSystemEvent, FileMovedEvent
+from typing import Callable
+from watchdog.events import (
+    DirCreatedEvent,
+    DirDeletedEvent,
+    DirMovedEvent,
+    FileCreatedEvent,
+    FileDeletedEvent,
+    FileModifiedEvent,
+    FileMovedEvent,
+    FileSystemEvent,
+    FileSystemEventHandler,
+)
 from .indexer import Indexer
-from concurrent.futures import ThreadPoolExecutor
+from .logs import log
+from .metrics import metrics
+import logging
 
-# délai anti-rafale en millisecondes
-DEBOUNCE_MS = 400
+# délai de calme (en millisecondes) avant l'émission de l'état final d'un chemin
+COALESCE_MS = 400
+
+# nombre maximal de chemins en attente (au-delà, les plus anciens sont émis sans attendre)
+MAX_PENDING = 50000
+
+# événements demandés à l'observateur (ceux traités par Handler) : sans les ouvertures
+# et fermetures, les lectures de l'indexation ne remplissent pas la file inotify
+WATCHED_EVENTS = [
+    FileCreatedEvent,
+    FileModifiedEvent,
+    FileDeletedEvent,
+    FileMovedEvent,
+    DirCreatedEvent,
+    DirDeletedEvent,
+    DirMovedEvent,
+]
 
 # Job d'un fichier (type d'événement, chemin, données annexes)
 Job = tuple[str, Path, dict]
 
-# -------------------- ANTI-RAFALE (DEBOUNCE) --------------------
+# événements reçus de l'observateur, par type (avant regroupement)
+EVENTS_TOTAL = metrics.counter(
+    "filemind_events_total", "Événements du système de fichiers reçus, par type"
+)
+
+# jobs traités par les workers, par type et résultat (ok / error)
+JOBS_TOTAL = metrics.counter(
+    "filemind_jobs_total", "Jobs traités par les workers, par type et résultat"
+)
+
+# durée de traitement d'un job par un worker (en secondes)
+JOB_SECONDS = metrics.histogram(
+    "filemind_job_seconds", "Durée de traitement d'un job par un worker, par type"
+)
 
+# -------------------- REGROUPEMENT DES EVENEMENTS --------------------
 
-class Debouncer:
+
+class EventCoalescer(threading.Thread):
     """
-    Empêche le traitement multiple d'un même fichier modifié rapidement à la suite.
+    Regroupe les rafales d'événements : pour chaque chemin, seule l'opération nette
+    en attente est gardée, et elle est émise une fois le chemin resté calme pendant
+    `delay_ms` (front descendant : c'est bien l'état final du fichier qui est indexé).
+    Les suites créé/modifié/supprimé/déplacé sont fusionnées en une seule opération.
+    La table des chemins en attente est bornée par `max_pending`.
     """
 
-    def __init__(self, delay_ms=DEBOUNCE_MS):
+    def __init__(
+        self,
+        emit: Callable[[Job], None],
+        delay_ms: int = COALESCE_MS,
+        max_pending: int = MAX_PENDING,
+        *a,
+        **kw,
+    ):
+        kw.setdefault("name", "event-coalescer")
+        kw.setdefault("daemon", True)
+        super().__init__(*a, **kw)
+        self.emit = emit
         self.delay = delay_ms / 1000
-        self.lock = threading.Lock()
+        self.max_pending = max_pending
+        self.cond = threading.Condition()
+
+        # opérations en attente, de la moins récemment touchée à la plus récente
+        # [chemin] => (type, données annexes, instant du dernier événement)
+        self.pending: OrderedDict[Path, tuple[str, dict, float]] = OrderedDict()
+        # déplacements en attente : [source] => destination
+        self.moves: dict[Path, Path] = {}
+
+    def _pop(self, path: Path) -> tuple[str, dict, float] | None:
+        item = self.pending.pop(path, None)
+        if item and item[0] == "moved":
+            self.moves.pop(item[1]["src"], None)
+        return item
+
+    def _set(self, path: Path, kind: str, extra: dict):
+        self._pop(path)
+        self.pending[path] = (kind, extra, time.monotonic())
+        if kind == "moved":
+            self.moves[extra["src"]] = path
+
+    def _release_move_from(self, path: Path, out: list[Job]):
+        """
+        Un nouvel événement sur la source d'un déplacement en attente :
+        le déplacement doit être émis avant, sinon il déplacerait le nouveau fichier.
+        """
+        dst = self.moves.get(path)
+        if dst is not None:
+            kind, extra, _ = self._pop(dst)
+            out.append((kind, dst, extra))
+
+    def push(self, kind: str, path: Path, extra: dict | None = None):
+        extra = extra or {}
+        out: list[Job] = []
+        with self.cond:
+            if kind == "moved":
+                self._push_move(extra["src"], path, out)
+            else:
+                self._release_move_from(path, out)
+                prev = self._pop(path)
+                self._merge(kind, path, prev)
+
+            # table pleine : on émet les plus anciens sans attendre leur délai
+            while len(self.pending) > self.max_pending:
+                old, (k, e, _) = next(iter(self.pending.items()))
+                self._pop(old)
+                out.append((k, old, e))
+            self.cond.notify_all()
+
+        for job in out:
+            self.emit(job)
 
-        # tableau des derniers fichiers analysees
-        # [chemin] => temps d'enregistrement
-        self.last: dict[Path, float] = {}
+    def _merge(self, kind: str, path: Path, prev: tuple[str, dict, float] | None):
+        pk, pe = (prev[0], prev[1]) if prev else (None, {})
 
-    def accept(self, p: Path) -> bool:
-        now = time.time()
-        with self.lock:
-            t = self.last.get(p, 0)
-            if now - t < self.delay:
-                self.last[p] = now
-                return False
-            self.last[p] = now
-            return True
+        if kind == "deleted":
+            if pk == "moved":
+                # src -> path puis path supprimé : revient à supprimer src
+                self._set(pe["src"], "deleted", {})
+            self._set(path, "deleted", {})
+        elif pk == "moved":
+            # fichier déplacé puis modifié : déplacement + réindexation
+            self._set(path, "moved", {**pe, "reindex": True})
+        elif pk == "created" or (pk == "deleted" and kind == "created"):
+            self._set(path, "created", {})
+        else:
+            self._set(path, kind, {})
+
+    def _push_move(self, src: Path, dst: Path, out: list[Job]):
+        self._release_move_from(src, out)
+        prev = self._pop(src)
+        self._pop(dst)
+        pk, pe = (prev[0], prev[1]) if prev else (None, {})
+
+        if pk == "moved":
+            # a -> src puis src -> dst : revient à a -> dst
+            self._set(dst, "moved", {**pe, "dst": dst})
+        elif pk == "created":
+            # src jamais indexé : on indexe directement dst
+            self._set(src, "deleted", {})
+            self._set(dst, "created", {})
+        else:
+            extra = {"src": src, "dst": dst}
+            if pk == "modified":
+                extra["reindex"] = True
+            self._set(dst, "moved", extra)
+
+    def push_dir(self, kind: str, path: Path, extra: dict | None = None):
+        """
+        Opération sur tout un dossier (déplacement ou suppression), émise sans délai.
+        Elle sert de barrière : les créations/modifications en attente sous la source
+        d'un déplacement sont reportées sous la destination, les autres opérations
+        en attente sous les dossiers touchés sont émises avant elle.
+        """
+        extra = extra or {}
+        src = extra.get("src", path)
+        dirs = (src, path)
+        out: list[Job] = []
+        with self.cond:
+            for p, (k, e, last) in list(self.pending.items()):
+                under = [d for d in dirs if p.is_relative_to(d)]
+                if k == "moved" and any(e["src"].is_relative_to(d) for d in dirs):
+                    under.append(e["src"])
+                if not under:
+                    continue
+                self._pop(p)
+                if kind == "moved" and k in ("created", "modified") and under == [src]:
+                    self.pending[path / p.relative_to(src)] = (k, e, last)
+                else:
+                    out.append((k, p, e))
+            out.append((kind, path, extra))
+            self.cond.notify_all()
+
+        for job in out:
+            self.emit(job)
+
+    def flush(self):
+        """
+        Émet immédiatement toutes les opérations en attente (arrêt).
+        """
+        with self.cond:
+            out = [(k, p, e) for p, (k, e, _) in self.pending.items()]
+            self.pending.clear()
+            self.moves.clear()
+        for job in out:
+            self.emit(job)
+
+    def run(self):
+        while True:
+            out: list[Job] = []
+            with self.cond:
+                while not self.pending:
+                    self.cond.wait()
+                now = time.monotonic()
+                for path, (kind, extra, last) in list(self.pending.items()):
+                    if now - last < self.delay:
+                        self.cond.wait(self.delay - (now - last))
+                        break
+                    self._pop(path)
+                    out.append((kind, path, extra))
+            for job in out:
+                self.emit(job)
 
 
 # -------------------- OBSERVEUR DE REPERTOIRE --------------------
@@ -61,17 +247,20 @@ class Handler(FileSystemEventHandler):
     Traduit les événements watchdog en jobs à mettre dans la file des fichiers à gérer.
     """
 
-    def __init__(self, qjobs: queue.Queue[Job], debouncer: Debouncer = Debouncer()):
+    def __init__(
+        self, qjobs: queue.Queue[Job], coalescer: EventCoalescer | None = None
+    ):
         self.qjobs = qjobs
-        self.debouncer = debouncer
+        if coalescer is None:
+            coalescer = EventCoalescer(self.qjobs.put)
+            coalescer.start()
+        self.coalescer = coalescer
 
     def _enqueue(self, kind: str, path: Path, extra: dict = None):
+        EVENTS_TOTAL.inc(kind=kind)
         if should_ignore(path):
             return
-        if kind in ("created", "modified"):
-            if not self.debouncer.accept(path):
-                return
-        self.qjobs.put((kind, path, extra or {}))
+        self.coalescer.push(kind, path, extra)
 
     def on_created(self, e: FileSystemEvent):
         if not e.is_directory:
@@ -82,16 +271,36 @@ class Handler(FileSystemEventHandler):
             self._enqueue("modified", Path(e.src_path))
 
     def on_deleted(self, e: FileSystemEvent):
-        if not e.is_directory:
+        if e.is_directory:
+            # dossier sorti de l'arborescence ou supprimé : une seule suppression par préfixe
+            path = Path(e.src_path)
+            EVENTS_TOTAL.inc(kind="deleted_dir")
+            if not should_ignore(path):
+                self.coalescer.push_dir("deleted", path, {"directory": True})
+        else:
             self._enqueue("deleted", Path(e.src_path))
 
     def on_moved(self, e: FileMovedEvent):
-        if not e.is_directory:
-            self._enqueue(
-                "moved",
-                Path(e.dest_path),
-                {"src": Path(e.src_path), "dst": Path(e.dest_path)},
+        if e.is_synthetic:
+            # déplacements des fichiers d'un dossier déplacé : couverts par celui du dossier
+            return
+        if e.is_directory:
+            src, dst = Path(e.src_path), Path(e.dest_path)
+            EVENTS_TOTAL.inc(kind="moved_dir")
+            if should_ignore(src) or should_ignore(dst):
+                return
+            self.coalescer.push_dir(
+                "moved", dst, {"src": src, "dst": dst, "directory": True}
             )
+        else:
+            src, dst = Path(e.src_path), Path(e.dest_path)
+            if should_ignore(src):
+                # sauvegarde atomique (fichier temporaire renommé) : dst a changé
+                self._enqueue("modified", dst)
+            elif should_ignore(dst):
+                self._enqueue("deleted", src)
+            else:
+                self._enqueue("moved", dst, {"src": src, "dst": dst})
 
 
 # -------------------- WORKER DE TRAITEMENT DE JOB --------------------
@@ -104,20 +313,37 @@ class Worker(threading.Thread):
         super().__init__(*a, **kw)
         self.qjobs = qjobs  # file de fichier
         self.indexer = indexer
-        self.pool = ThreadPoolExecutor(max_workers=1)
 
     def run(self):
+        # acquittement reporté à l'écriture du résultat (JobScheduler avec journal)
+        defer = getattr(self.qjobs, "defer", None)
         while True:
             kind, path, extra = self.qjobs.get()
+            t0 = time.perf_counter()
+            result = "ok"
             try:
                 if kind in ("created", "modified"):
                     if path.exists() and not should_ignore(path):
-                        self.indexer.index_path(path)
+                        self.indexer.index_path(path, defer)
+                elif kind == "deleted" and path.exists():
+                    # job de suppression périmé : il ne doit pas retirer un fichier recréé
+                    # (il est acquitté par task_done, comme les autres)
+                    pass
+                elif kind == "deleted" and extra.get("directory"):
+                    self.indexer.remove_dir(path)
                 elif kind == "deleted":
                     self.indexer.remove_path(path)
+                elif kind == "moved" and extra.get("directory"):
+                    self.indexer.move_dir(extra["src"], extra["dst"])
                 elif kind == "moved":
                     self.indexer.move_path(extra["src"], extra["dst"])
+                    # déplacé puis modifié pendant la rafale
+                    if extra.get("reindex") and path.exists():
+                        self.indexer.index_path(path, defer)
             except Exception as e:
-                print("[ERROR]", kind, path, e)
+                result = "error"
+                log("ERROR", logging.ERROR, kind=kind, path=path, error=repr(e))
             finally:
+                JOB_SECONDS.observe(time.perf_counter() - t0, kind=kind)
+                JOBS_TOTAL.inc(kind=kind, result=result)
                 self.qjobs.task_done()
@@ -0,0 +1,53 @@
+from collections import defaultdict
+
+from .database import DatabaseService
+from .vector_store import VectorStoreService
+
+# constante de la fusion par rangs réciproques (valeur usuelle de la littérature)
+RRF_K = 60
+
+# nombre de candidats demandés à chaque moteur, en multiple de k
+CANDIDATES = 4
+
+
+def rrf(rankings: list[list[str]], rrf_k: int = RRF_K) -> list[tuple[str, float]]:
+    """
+    Fusion par rangs réciproques (Reciprocal Rank Fusion) : chaque classement
+    apporte 1 / (rrf_k + rang) à ses chemins. Seuls les rangs comptent, ce qui
+    évite de comparer des scores BM25 et des similarités cosinus.
+    Retourne [(chemin, score)] trié par score décroissant.
+    """
+    scores: dict[str, float] = defaultdict(float)
+    for ranking in rankings:
+        for rank, path in enumerate(ranking, start=1):
+            scores[path] += 1 / (rrf_k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+class HybridSearch:
+    """
+    Recherche hybride : les résultats plein texte (BM25 sur FTS5, précis pour les
+    noms de fichiers, auteurs, identifiants...) et ceux des plus proches voisins
+    sémantiques (FAISS) sont fusionnés par rangs réciproques.
+    Usage:
+        search = HybridSearch(db, vector_store)
+        search.search("facture EDF 2023", k=10)
+    """
+
+    def __init__(
+        self,
+        db: DatabaseService,
+        vectorStore: VectorStoreService,
+        rrf_k: int = RRF_K,
+        candidates: int = CANDIDATES,
+    ):
+        self.db = db
+        self.vectorStore = vectorStore
+        self.rrf_k = rrf_k
+        self.candidates = candidates
+
+    def search(self, query: str, k: int = 10) -> list[tuple[str, float]]:
+        n = k * self.candidates
+        text = [path for path, _ in self.db.searchText(query, n)]
+        vector = [path for path, _ in self.vectorStore.search(query, n)]
+        return rrf([text, vector], self.rrf_k)[:k]
@@ -1,10 +1,34 @@
 from .vector_store import VectorStoreService
-from .extract import extractFile
+from .embedding_batcher import EmbeddingBatcher
+from .extract import extractFile, filetype
+from .extract.base import BaseMetadata, describeCopy, getBaseMetadata
 from .database import DatabaseService
+from .duplicates import DuplicateFinder
+from .fingerprint import CONTENT_HASH, Fingerprint, content_hash
+from .logs import log
+from .metrics import metrics
+from .quarantine import QuarantineService
+from functools import partial
 from pathlib import Path
+from typing import Callable
+import logging
+import os
 import stat
+import time
 import numpy as np
 
+# durée de chaque étape de l'indexation d'un fichier (en secondes)
+STAGE_SECONDS = metrics.histogram(
+    "filemind_stage_seconds",
+    "Durée des étapes d'indexation d'un fichier "
+    "(stat, fingerprint, quarantine, dedupe, extract, embed, write, total)",
+)
+
+# fichiers traités, par type de fichier et par résultat
+FILES_TOTAL = metrics.counter(
+    "filemind_files_total", "Fichiers traités par type de fichier et résultat"
+)
+
 
 def is_regular(p: Path):
     """
@@ -19,6 +43,17 @@ def is_regular(p: Path):
         return False
 
 
+def regular_stat(p: Path) -> os.stat_result | None:
+    """
+    Retourne le stat d'un fichier régulier, sinon None.
+    """
+    try:
+        st = p.stat()
+    except FileNotFoundError:
+        return None
+    return st if stat.S_ISREG(st.st_mode) else None
+
+
 def to_blob(vec: np.ndarray) -> bytes:
     return vec.astype("float32").tobytes()
 
@@ -36,39 +71,254 @@ class Indexer:
     Tu peux brancher ici extraction de texte, insertion FTS5, embeddings, etc.
     """
 
-    def __init__(self, db: DatabaseService, vectorStore: VectorStoreService):
+    def __init__(
+        self,
+        db: DatabaseService,
+        vectorStore: VectorStoreService,
+        embedder: EmbeddingBatcher | None = None,
+        force: bool = False,
+        use_content_hash: bool = CONTENT_HASH,
+        extractor: Callable[[Path], tuple | None] = extractFile,
+        quarantine: QuarantineService | None = None,
+        duplicates: DuplicateFinder | None = None,
+    ):
         self.db = db
         self.vectorStore = vectorStore
+        # regroupement des embeddings entre workers (sinon encodage unitaire)
+        self.embedder = embedder
+        # réindexe même les fichiers inchangés (changement de modèle, de description...)
+        self.force = force
+        self.use_content_hash = use_content_hash
+        # extraction (métadonnées, description), ex. ExtractionPool.extract
+        self.extractor = extractor
+        # fichiers dont l'extraction échoue : pas de nouvel essai avant leur délai
+        self.quarantine = quarantine
+        # hachage par étapes des fichiers de même taille (index des doublons) :
+        # une copie identique d'un fichier indexé reprend sa description et son vecteur
+        self.duplicates = duplicates
+
+    def _fingerprint(self, p: Path, st: os.stat_result) -> Fingerprint | None:
+        """
+        Calcule l'empreinte du fichier, ou None s'il est inchangé depuis sa dernière indexation.
+        """
+        fp = Fingerprint.from_stat(st)
+        old = None if self.force else self.db.getFingerprint(p)
+        if old and old.same_stat(fp):
+            return None
 
-    def index_path(self, p: Path):
+        if self.use_content_hash:
+            fp = fp._replace(contentHash=content_hash(p))
+            if old and old.contentHash == fp.contentHash:
+                # contenu identique (fichier seulement touché) : on ne garde que la nouvelle empreinte
+                self.db.updateFingerprint(p, fp)
+                return None
+        return fp
+
+    def index_path(
+        self, p: Path, defer: Callable[[], Callable[[], None] | None] | None = None
+    ) -> str:
+        """
+        Indexe un fichier. `defer` (cf. JobScheduler.defer) reporte l'acquittement du job
+        à la transaction qui écrit le fichier quand celle-ci attend son embedding.
+        """
+        t0 = time.perf_counter()
+        kind = filetype(p) or "other"
+        outcome = "error"
+        try:
+            outcome = self._index(p, kind, defer)
+        finally:
+            STAGE_SECONDS.observe(time.perf_counter() - t0, stage="total")
+            FILES_TOTAL.inc(type=kind, outcome=outcome)
+        return outcome
+
+    def _index(
+        self,
+        p: Path,
+        kind: str,
+        defer: Callable[[], Callable[[], None] | None] | None = None,
+    ) -> str:
+        """
+        Indexe un fichier et retourne le résultat (pour les métriques) :
+        indexed, copy, unchanged, quarantined, failed, unsupported, not_regular.
+        """
 
         # on regarde si le fichier est regulier
-        if not is_regular(p):
-            print("[ERROR-REGULAR]", p)
-            return
+        with STAGE_SECONDS.time(stage="stat"):
+            st = regular_stat(p)
+        if st is None:
+            log("ERROR-REGULAR", logging.WARNING, path=p)
+            return "not_regular"
+
+        # on saute les fichiers inchangés depuis leur dernière indexation
+        with STAGE_SECONDS.time(stage="fingerprint"):
+            fingerprint = self._fingerprint(p, st)
+        if fingerprint is None:
+            log("UNCHANGED", path=p)
+            return "unchanged"
+
+        # fichier en quarantaine, inchangé depuis son dernier échec : on attend son délai
+        with STAGE_SECONDS.time(stage="quarantine"):
+            entry = self.quarantine.get(p) if self.quarantine else None
+        if entry and entry.blocks(fingerprint):
+            log("QUARANTINED", path=p, reason=entry.reason)
+            return "quarantined"
+
+        # copie identique d'un fichier déjà indexé : ni extraction ni embedding
+        headHash = None
+        if self.duplicates:
+            with STAGE_SECONDS.time(stage="dedupe"):
+                staged = self.duplicates.stage(p, st.st_size, fingerprint.contentHash)
+            headHash = staged.headHash
+            fingerprint = fingerprint._replace(contentHash=staged.contentHash)
+            if staged.source and self._indexCopy(
+                p, staged.source, fingerprint, headHash
+            ):
+                if entry:
+                    self.quarantine.release(p)
+                return "copy"
 
         # on essaye l'extraction de la description et des metadonnees du fichier
-        result = extractFile(p)
+        try:
+            with STAGE_SECONDS.time(stage="extract"):
+                result = self.extractor(p)
+        except Exception as e:
+            if self.quarantine is None:
+                raise
+            entry = self.quarantine.record(p, fingerprint, e, entry)
+            log(
+                "QUARANTINE",
+                logging.WARNING,
+                path=p,
+                attempts=entry.attempts,
+                reason=entry.reason,
+            )
+            return "failed"
+        if entry:
+            self.quarantine.release(p)
         if not result:
-            print("[ERROR-EXTRACTION]", p)
-            return
+            log("ERROR-EXTRACTION", logging.WARNING, path=p)
+            return "unsupported"
 
         metadata, description = result
-        self.db.indexPath(p, metadata, description=description)
+        write = partial(
+            self._write,
+            metadata=metadata,
+            description=description,
+            fingerprint=fingerprint,
+            headHash=headHash,
+        )
+
+        # le fichier est écrit avec son vecteur d'embedding, une fois celui-ci calculé,
+        # et le job n'est acquitté qu'avec cette écriture
+        if self.embedder:
+            self.embedder.submit(p, description, write, ack=defer() if defer else None)
+        else:
+            with STAGE_SECONDS.time(stage="embed"):
+                vec = self.vectorStore.embedTexts([description])[0]
+            write(p, vec)
+
+        log("INDEXED", path=p, type=kind)
+        return "indexed"
+
+    def _write(
+        self,
+        p: Path,
+        vec: np.ndarray,
+        metadata: BaseMetadata,
+        description: str,
+        fingerprint: Fingerprint,
+        headHash: str | None = None,
+        ack: Callable[[], None] | None = None,
+    ):
+        """
+        Écrit le fichier et son vecteur dans la même transaction, avec l'acquittement
+        du job s'il a été reporté : un arrêt brutal ne laisse jamais l'un sans l'autre.
+        """
+        with STAGE_SECONDS.time(stage="write"), self.db.transaction():
+            self.db.indexPath(
+                p,
+                metadata,
+                description=description,
+                fingerprint=fingerprint,
+                headHash=headHash,
+            )
+            self.vectorStore.upsertVectors([(p, vec)])
+            if ack:
+                ack()
+
+    def _indexCopy(
+        self, p: Path, source: str, fingerprint: Fingerprint, headHash: str | None
+    ) -> bool:
+        """
+        Indexe une copie octet pour octet d'un fichier indexé : ses métadonnées de base
+        (nom, dates, taille) sont lues et décrites, le contenu extrait de la description
+        et le vecteur sont repris de l'original.
+        Retourne False si l'original n'a pas encore de vecteur.
+        """
+        vec = self.vectorStore.getVector(source)
+        description = self.db.getDescription(source)
+        if vec is None or description is None:
+            return False
 
-        # on ajoute le vecteur d'embedding dans la base de données
-        self.vectorStore.upsertPath(p, description)
+        metadata = getBaseMetadata(str(p))
+        metadata.fileType = filetype(p)
+        description = describeCopy(metadata, description)
+        # une description d'une version précédente en attente ne doit pas écraser celle-ci
+        # (son job est acquitté avec cette écriture)
+        ack = self.embedder.discard(p) if self.embedder else None
+        self._write(p, vec, metadata, description, fingerprint, headHash, ack)
 
-        print("[INDEXED]", p)
+        log("INDEXED-COPY", path=p, source=source)
+        return True
 
     def remove_path(self, p: Path):
-        self.vectorStore.deletePath(p)
-        self.db.deletePath(p)
+        # le vecteur est supprimé avec le fichier (ON DELETE CASCADE) ; le job
+        # d'une description en attente est acquitté avec la suppression
+        ack = self.embedder.discard(p) if self.embedder else None
+        if self.quarantine:
+            self.quarantine.release(p)
+        with self.db.transaction():
+            self.db.deletePath(p)
+            if ack:
+                ack()
 
-        print("[REMOVED]", p)
+        FILES_TOTAL.inc(type=filetype(p) or "other", outcome="removed")
+        log("REMOVED", path=p)
 
     def move_path(self, old: Path, new: Path):
-        self.vectorStore.movePath(old, new)
+        if self.embedder:
+            self.embedder.move(old, new)
+        if self.quarantine:
+            self.quarantine.move(old, new)
         self.db.movePath(old, new)
 
-        print("[MOVED]", old, "->", new)
+        FILES_TOTAL.inc(type=filetype(new) or "other", outcome="moved")
+        log("MOVED", src=old, dst=new)
+
+    def remove_dir(self, p: Path):
+        """
+        Désindexe tout un dossier en une seule suppression par intervalle de chemins.
+        """
+        ack = self.embedder.discardDir(p) if self.embedder else None
+        if self.quarantine:
+            self.quarantine.releaseDir(p)
+        with self.db.transaction():
+            self.db.deleteDir(p)
+            if ack:
+                ack()
+
+        FILES_TOTAL.inc(type="directory", outcome="removed")
+        log("REMOVED-DIR", path=p)
+
+    def move_dir(self, old: Path, new: Path):
+        """
+        Déplace tout un dossier en une seule réécriture du préfixe des chemins.
+        """
+        if self.embedder:
+            self.embedder.moveDir(old, new)
+        if self.quarantine:
+            self.quarantine.moveDir(old, new)
+        self.db.moveDir(old, new)
+
+        FILES_TOTAL.inc(type="directory", outcome="moved")
+        log("MOVED-DIR", src=old, dst=new)
@@ -0,0 +1,132 @@
+import json, time
+from pathlib import Path
+from typing import NamedTuple
+
+from .database import DatabaseService
+from .handler import Job
+
+# jobs d'indexation (dédoublonnés par chemin tant qu'ils attendent)
+INDEX_KINDS = ("created", "modified")
+
+# clés des extras d'un job qui sont des chemins
+PATH_KEYS = ("src", "dst")
+
+
+class JournalJob(NamedTuple):
+    """
+    Job en attente relu du journal : numéro d'ordre, racine et job.
+    """
+
+    seq: int
+    root: str
+    job: Job
+
+
+def _dumps(extra: dict) -> str:
+    return json.dumps(
+        {k: str(v) if isinstance(v, Path) else v for k, v in extra.items()}
+    )
+
+
+def _loads(extra: str) -> dict:
+    out = json.loads(extra) if extra else {}
+    for k in PATH_KEYS:
+        if k in out:
+            out[k] = Path(out[k])
+    return out
+
+
+class JobJournal:
+    """
+    Journal des jobs en attente (table `job_queue` de la base de DatabaseService) :
+    chaque job y est écrit à son arrivée et effacé une fois traité (acquittement).
+    Les jobs non acquittés (arrêt, plantage) sont rejoués au démarrage ;
+    au-delà de la fenêtre en mémoire de JobScheduler, ils n'existent que sur le disque.
+    Les écritures sont différées (lots du thread d'écriture) : l'arrivée d'un
+    événement n'attend jamais le disque.
+    Usage:
+        qjobs = JobScheduler(roots, journal=JobJournal(db))
+    """
+
+    def __init__(self, db: DatabaseService):
+        self.db = db
+        self.pool = db.pool
+
+        # initialisation de la base de données
+        self.pool.execute(
+            """
+            -- jobs en attente, dans l'ordre d'arrivée (seq)
+            CREATE TABLE IF NOT EXISTS job_queue(
+              seq INTEGER PRIMARY KEY,
+              cls TEXT NOT NULL,           -- classe de priorité (cheap, live, backlog)
+              root TEXT NOT NULL,
+              kind TEXT NOT NULL,
+              path TEXT NOT NULL,
+              extra TEXT,                  -- JSON
+              queuedAt REAL NOT NULL
+            );
+            """
+        )
+        self.pool.execute(
+            "CREATE INDEX IF NOT EXISTS job_queue_class ON job_queue(cls, seq);"
+        )
+        self.pool.execute(
+            "CREATE INDEX IF NOT EXISTS job_queue_path ON job_queue(path);"
+        )
+
+    def _params(self, seq: int, cls: str, root: str, job: Job) -> tuple:
+        kind, path, extra = job
+        return (seq, cls, root, kind, str(path), _dumps(extra or {}), time.time())
+
+    def add(self, seq: int, cls: str, root: str, job: Job):
+        self.pool.submit(
+            """INSERT INTO job_queue(seq, cls, root, kind, path, extra, queuedAt)
+               VALUES(?,?,?,?,?,?,?);""",
+            self._params(seq, cls, root, job),
+        )
+
+    def replace(self, seq: int, cls: str, root: str, job: Job):
+        """
+        Ajoute un job d'indexation à la place de ceux qui attendent pour ce chemin.
+        """
+        with self.pool.transaction():
+            self.pool.submit(
+                """DELETE FROM job_queue
+                   WHERE path = ? AND kind IN ('created', 'modified');""",
+                (str(job[1]),),
+            )
+            self.add(seq, cls, root, job)
+
+    def ack(self, seq: int):
+        """
+        Efface un job traité.
+        """
+        self.pool.submit("DELETE FROM job_queue WHERE seq = ?;", (seq,))
+
+    def load(self, cls: str, from_seq: int, limit: int) -> list[JournalJob]:
+        """
+        Relit (dans l'ordre d'arrivée) les jobs d'une classe à partir de `from_seq`,
+        après validation des écritures en attente.
+        """
+        self.pool.flush()
+        rows = self.pool.query(
+            """SELECT seq, root, kind, path, extra FROM job_queue
+               WHERE cls = ? AND seq >= ? ORDER BY seq LIMIT ?;""",
+            (cls, from_seq, limit),
+        )
+        return [
+            JournalJob(seq, root, (kind, Path(path), _loads(extra)))
+            for seq, root, kind, path, extra in rows
+        ]
+
+    def lastSeq(self) -> int:
+        return self.pool.query("SELECT COALESCE(MAX(seq), 0) FROM job_queue;")[0][0]
+
+    def pending(self) -> dict[str, tuple[int, int]]:
+        """
+        Jobs en attente par classe : (plus petit numéro d'ordre, nombre).
+        """
+        rows = self.pool.query(
+            "SELECT cls, MIN(seq), COUNT(*) FROM job_queue GROUP BY cls;"
+        )
+        return {cls: (first, n) for cls, first, n in rows}
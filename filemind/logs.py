@@ -0,0 +1,76 @@
+import json, logging
+
+# journal de FileMind (événements d'indexation, erreurs)
+logger = logging.getLogger("filemind")
+
+# format des lignes : "kv" (clé=valeur, lisible) ou "json" (une ligne JSON par événement)
+LOG_FORMAT = "kv"
+
+# réglages du dernier `setupLogging` (niveau, format), rejoués dans les processus d'extraction
+_config: tuple[str, str] | None = None
+
+
+def log(event: str, level: int = logging.INFO, **fields):
+    """
+    Journalise un événement structuré : un nom ("INDEXED", "ERROR"...) et des champs.
+        log("INDEXED", path=p, type="pdf", ms=12.5)
+    """
+    if logger.isEnabledFor(level):
+        logger.log(level, event, extra={"fields": fields})
+
+
+class KeyValueFormatter(logging.Formatter):
+    """
+    "2024-05-01 12:00:00 INFO [INDEXED] path=/a/b.pdf type=pdf ms=12.5"
+    (valeurs contenant des espaces entre guillemets).
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        parts = [
+            self.formatTime(record, "%Y-%m-%d %H:%M:%S"),
+            record.levelname,
+            f"[{record.getMessage()}]",
+        ]
+        for key, value in getattr(record, "fields", {}).items():
+            value = f"{value:.1f}" if isinstance(value, float) else str(value)
+            if not value or any(c in value for c in ' "='):
+                value = json.dumps(value, ensure_ascii=False)
+            parts.append(f"{key}={value}")
+        if record.exc_info:
+            parts.append("\n" + self.formatException(record.exc_info))
+        return " ".join(parts)
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": record.created,
+            "level": record.levelname,
+            "event": record.getMessage(),
+            "thread": record.threadName,
+        }
+        entry.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def setupLogging(level: str = "INFO", fmt: str = LOG_FORMAT):
+    """
+    Branche la sortie standard d'erreur sur le journal de FileMind.
+    """
+    global _config
+    _config = (level, fmt)
+    handler = logging.StreamHandler()
+    handler.setFormatter(JsonFormatter() if fmt == "json" else KeyValueFormatter())
+    logger.handlers[:] = [handler]
+    logger.setLevel(level)
+    logger.propagate = False
+
+
+def loggingConfig() -> tuple[str, str] | None:
+    """
+    Réglages du journal (niveau, format) à passer à `setupLogging` dans un autre
+    processus ; None si le journal n'a pas été configuré.
+    """
+    return _config
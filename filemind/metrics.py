@@ -0,0 +1,247 @@
+import bisect, logging, os, threading, time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Iterable
+
+from .logs import log
+
+# bornes (en secondes) des histogrammes de latence
+LATENCY_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+
+# adresse d'écoute du serveur HTTP des métriques (local seulement)
+METRICS_HOST = "127.0.0.1"
+
+# étiquettes d'une série : couples (nom, valeur) triés
+Labels = tuple[tuple[str, str], ...]
+
+
+def _labels(labels: dict) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}"
+
+
+class Counter:
+    """
+    Compteur monotone, une série par combinaison d'étiquettes.
+    """
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self.lock = threading.Lock()
+        self.values: dict[Labels, float] = {}
+
+    def inc(self, value: float = 1, **labels):
+        key = _labels(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + value
+
+    def samples(self) -> Iterable[tuple[str, Labels, float]]:
+        with self.lock:
+            items = list(self.values.items())
+        for labels, value in items:
+            yield self.name, labels, value
+
+
+class Gauge:
+    """
+    Valeur instantanée, fixée par `set` ou lue au moment de l'exposition
+    par une fonction retournant [(étiquettes, valeur)].
+    """
+
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        fn: Callable[[], Iterable[tuple[dict, float]]] | None = None,
+    ):
+        self.name = name
+        self.help = help
+        self.fn = fn
+        self.lock = threading.Lock()
+        self.values: dict[Labels, float] = {}
+
+    def set(self, value: float, **labels):
+        with self.lock:
+            self.values[_labels(labels)] = value
+
+    def samples(self) -> Iterable[tuple[str, Labels, float]]:
+        with self.lock:
+            items = list(self.values.items())
+        if self.fn:
+            try:
+                items += [(_labels(labels), value) for labels, value in self.fn()]
+            except Exception as e:
+                log("ERROR-METRICS", logging.ERROR, metric=self.name, error=repr(e))
+        for labels, value in items:
+            yield self.name, labels, value
+
+
+class Histogram:
+    """
+    Distribution de durées (en secondes) par bornes fixes, cumulées à l'exposition.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self.lock = threading.Lock()
+        # [étiquettes] => (comptes par borne (+Inf en dernier), somme, nombre)
+        self.series: dict[Labels, list] = {}
+
+    def observe(self, value: float, **labels):
+        key = _labels(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            s = self.series.get(key)
+            if s is None:
+                s = self.series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            s[0][i] += 1
+            s[1] += value
+            s[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """
+        Mesure la durée du bloc (même s'il lève une exception).
+        """
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0, **labels)
+
+    def samples(self) -> Iterable[tuple[str, Labels, float]]:
+        with self.lock:
+            items = [(k, (list(c), s, n)) for k, (c, s, n) in self.series.items()]
+        for labels, (counts, total, n) in items:
+            cumulated = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulated += count
+                yield self.name + "_bucket", labels + (("le", str(bound)),), cumulated
+            yield self.name + "_sum", labels, total
+            yield self.name + "_count", labels, n
+
+
+class MetricsRegistry:
+    """
+    Métriques du processus, exposées au format texte de Prometheus.
+    Déclarer deux fois le même nom retourne la même métrique.
+    Usage:
+        STAGE_SECONDS = metrics.histogram("filemind_stage_seconds", "...")
+        with STAGE_SECONDS.time(stage="extract"): ...
+        FILES = metrics.counter("filemind_files_total", "...")
+        FILES.inc(type="pdf", outcome="indexed")
+        metrics.render()
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.metrics: dict[str, Counter | Gauge | Histogram] = {}
+
+    def _get(self, cls, name: str, *args):
+        with self.lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = cls(name, *args)
+            return metric
+
+    def counter(self, name: str, help: str) -> Counter:
+        return self._get(Counter, name, help)
+
+    def gauge(self, name: str, help: str, fn=None) -> Gauge:
+        gauge = self._get(Gauge, name, help)
+        if fn is not None:
+            gauge.fn = fn
+        return gauge
+
+    def histogram(
+        self, name: str, help: str, buckets: tuple = LATENCY_BUCKETS
+    ) -> Histogram:
+        return self._get(Histogram, name, help, buckets)
+
+    def render(self) -> str:
+        with self.lock:
+            metrics = list(self.metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{_format(labels)} {value:g}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str | Path):
+        """
+        Écrit l'exposition dans un fichier (fichier temporaire + renommage).
+        """
+        path = Path(path)
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_text(self.render(), encoding="utf-8")
+        os.replace(tmp, path)
+
+
+metrics = MetricsRegistry()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = metrics.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # pas une ligne de log par collecte
+        pass
+
+
+def serve(port: int, host: str = METRICS_HOST) -> ThreadingHTTPServer:
+    """
+    Démarre le point de collecte HTTP (GET /metrics) dans un thread démon.
+    """
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(
+        target=server.serve_forever, name="metrics-http", daemon=True
+    ).start()
+    return server
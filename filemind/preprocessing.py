@@ -1,12 +1,104 @@
-import os
+import logging, os
+from pathlib import Path
+from typing import Iterator
 
 from .extract import getMetadataFile
+from .handler import should_ignore
+from .logs import log
+
+
+def walk_sorted(
+    root: Path, deep: bool = True, after: str | None = None, errors: list | None = None
+) -> Iterator[Path]:
+    """
+    Parcourt `root` en profondeur, entrées triées par nom : les fichiers sortent dans
+    l'ordre de leurs chemins relatifs comparés composant par composant, toujours le même.
+    Les fichiers jusqu'à `after` (chemin relatif, reprise) sont sautés sans parcourir
+    les dossiers déjà entièrement traités.
+    """
+    cursor = Path(after).parts if after else None
+    return _walk(root, (), deep, cursor, errors)
+
+
+def _walk(
+    directory: Path,
+    rel: tuple[str, ...],
+    deep: bool,
+    cursor: tuple[str, ...] | None,
+    errors: list | None,
+) -> Iterator[Path]:
+    try:
+        with os.scandir(directory) as it:
+            entries = sorted(it, key=lambda e: e.name)
+    except OSError as e:
+        if errors is not None:
+            errors.append(f"{directory}: {e}")
+        return
+
+    for entry in entries:
+        parts = rel + (entry.name,)
+        path = Path(entry.path)
+        if should_ignore(path):
+            continue
+        try:
+            if entry.is_dir(follow_symlinks=False):
+                # dossier déjà traité, sauf s'il contient le point de reprise
+                if deep and not (
+                    cursor and parts < cursor and cursor[: len(parts)] != parts
+                ):
+                    yield from _walk(path, parts, deep, cursor, errors)
+            elif entry.is_file(follow_symlinks=False):
+                if not (cursor and parts <= cursor):
+                    yield path
+        except OSError as e:
+            if errors is not None:
+                errors.append(f"{entry.path}: {e}")
 
 
 class Preprocessor:
+    """
+    Parcours d'un dossier pour une indexation en masse.
+    Les fichiers sont produits à la demande (générateurs), dans un ordre stable
+    qui permet de reprendre un parcours interrompu après le dernier fichier traité.
+    Usage:
+        pre = Preprocessor("/archives", deep=True)
+        for path in pre.iterFiles(after="2019/photos/img_0042.jpg"): ...
+    """
+
     def __init__(self, path_dir: str, deep: bool = False):
         self.path_dir = path_dir
         self.deep = deep
+        # erreurs du dernier parcours (dossiers illisibles...)
+        self.errors: list[str] = []
+
+    def iterFiles(
+        self, deep: bool | None = None, after: str | None = None
+    ) -> Iterator[Path]:
+        """
+        Fichiers réguliers non ignorés, triés, après le chemin relatif `after`.
+        """
+        useDeep = deep if deep is not None else self.deep
+        self.errors = []
+        return walk_sorted(Path(self.path_dir), useDeep, after, self.errors)
+
+    def relative(self, path: Path) -> str:
+        """
+        Chemin relatif à la racine (point de reprise de iterFiles).
+        """
+        return str(path.relative_to(self.path_dir))
+
+    def iterMetadata(self, deep: bool | None = None) -> Iterator[dict]:
+        """
+        {"file_path", "metadata"} de chaque fichier, un à la fois.
+        """
+        for path in self.iterFiles(deep):
+            file_path = str(path)
+            try:
+                metadata = getMetadataFile(file_path)
+            except Exception as e:
+                log("ERROR-METADATA", logging.WARNING, path=file_path, error=repr(e))
+                continue
+            yield {"file_path": file_path, "metadata": metadata}
 
     def getFiles(self, deep: bool | None = None):
         useDeep = deep if deep is not None else self.deep
@@ -15,36 +107,9 @@ class Preprocessor:
         return self._get_plane_files()
 
     def _get_deep_files(self):
-
-        files = []
-        n = 0
-
-        for root, _, filenames in os.walk(self.path_dir):
-            for file in filenames:
-                file_path = os.path.join(root, file)
-                if os.path.isfile(file_path):
-                    try:
-                        metadata = getMetadataFile(file_path)
-                        files.append({"file_path": file_path, "metadata": metadata})
-                        n += 1
-                    except Exception as e:
-                        print(f"Error processing file {file_path}: {e}")
-
-        return (files, n)
+        files = list(self.iterMetadata(deep=True))
+        return (files, len(files))
 
     def _get_plane_files(self):
-
-        files = []
-        n = 0
-
-        for file in os.listdir(self.path_dir):
-            file_path = os.path.join(self.path_dir, file)
-            if os.path.isfile(file_path):
-                try:
-                    metadata = getMetadataFile(file_path)
-                    files.append({"file_path": file_path, "metadata": metadata})
-                    n += 1
-                except Exception as e:
-                    print(f"Error processing file {file_path}: {e}")
-
-        return (files, n)
+        files = list(self.iterMetadata(deep=False))
+        return (files, len(files))
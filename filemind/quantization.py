@@ -0,0 +1,118 @@
+import logging, time
+import faiss
+import numpy as np
+from typing import NamedTuple
+
+from .ann_index import AnnIndex
+from .logs import log
+from .vector_matrix import VectorMatrix
+from .vector_store import RERANK
+
+# représentations comparées par défaut : [nom] => fabrique FAISS ({m} = dim // 8 sous-vecteurs)
+QUANTIZERS = {
+    "float32": "IDMap2,Flat",
+    "float16": "IDMap2,SQfp16",
+    "int8": "IDMap2,SQ8",
+    "pq": "IDMap2,PQ{m}",
+}
+
+# nombre de vecteurs utilisés pour l'entraînement (SQ8, PQ)
+TRAIN_SIZE = 50000
+
+# nombre de requêtes tirées parmi les vecteurs stockés
+QUERIES = 200
+
+# nombre minimal de vecteurs pour entraîner une quantification par produit (256 centroïdes)
+PQ_MIN_TRAIN = 256 * 39
+
+
+class QuantizationResult(NamedTuple):
+    name: str
+    factory: str
+    bytesPerVector: float
+    recall: float  # rappel@k sur les scores compressés seuls
+    recallRerank: float  # rappel@k après reclassement float32 des rerank*k candidats
+    searchMs: float  # latence moyenne par requête (avec reclassement)
+
+    def report(self) -> str:
+        return (
+            f"{self.name:<8} {self.factory:<16} {self.bytesPerVector:8.1f} B/vec "
+            f"recall={self.recall:.3f} recall_rerank={self.recallRerank:.3f} "
+            f"search={self.searchMs:.2f}ms"
+        )
+
+
+def sample(
+    matrix: VectorMatrix, n: int, seed: int = 0
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Tire au hasard n vecteurs stockés (ids, vecteurs).
+    """
+    return matrix.sample(n, seed)
+
+
+def recall_at_k(found: np.ndarray, truth: np.ndarray) -> float:
+    """
+    Part moyenne des k vrais plus proches voisins retrouvés.
+    """
+    hits = [
+        len(set(f[f >= 0]) & set(t[t >= 0])) / max(1, (t >= 0).sum())
+        for f, t in zip(found, truth)
+    ]
+    return float(np.mean(hits)) if hits else 0.0
+
+
+def evaluate(
+    matrix: VectorMatrix,
+    quantizers: dict[str, str] = QUANTIZERS,
+    k: int = 10,
+    rerank: int = RERANK,
+    queries: int = QUERIES,
+    train_size: int = TRAIN_SIZE,
+) -> list[QuantizationResult]:
+    """
+    Compare les représentations compressées d'une matrice de vecteurs :
+    mémoire de l'index par vecteur, rappel@k sans et avec reclassement exact,
+    latence de recherche. La vérité terrain est la recherche exhaustive float32.
+    """
+    _, qvecs = sample(matrix, queries, seed=1)
+    truth = np.stack([matrix.search(q, k)[1] for q in qvecs])
+    _, train = sample(matrix, train_size)
+
+    results = []
+    for name, factory in quantizers.items():
+        factory = factory.format(m=matrix.dim // 8)
+        if "PQ" in factory and len(train) < PQ_MIN_TRAIN:
+            # pas assez de vecteurs pour entraîner
+            log(
+                "QUANTIZATION-SKIP",
+                logging.WARNING,
+                name=name,
+                factory=factory,
+                train=len(train),
+            )
+            continue
+        index = AnnIndex("", matrix.dim, factory=factory)
+        index.train(train)
+        for ids, vecs in matrix.iter_chunks():
+            index.add(ids, vecs)
+
+        plain = np.stack([index.search(q, k)[1] for q in qvecs])
+        t0 = time.perf_counter()
+        reranked = []
+        for q in qvecs:
+            _, cand = index.search(q, k * rerank)
+            reranked.append(matrix.rerank(q, cand, k)[1])
+        elapsed = time.perf_counter() - t0
+
+        results.append(
+            QuantizationResult(
+                name,
+                factory,
+                faiss.serialize_index(index.index).nbytes / max(1, index.ntotal),
+                recall_at_k(plain, truth),
+                recall_at_k(np.stack(reranked), truth),
+                elapsed * 1000 / max(1, len(qvecs)),
+            )
+        )
+    return results
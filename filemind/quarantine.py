@@ -0,0 +1,232 @@
+import time
+from pathlib import Path
+from threading import Lock
+from typing import NamedTuple, Optional
+
+from .connection import prefixRange
+from .database import DatabaseService
+from .fingerprint import Fingerprint
+
+# attente avant le premier nouvel essai d'un fichier en quarantaine (en secondes),
+# doublée à chaque échec
+QUARANTINE_BACKOFF_S = 60
+
+# attente maximale entre deux essais (en secondes)
+QUARANTINE_MAX_BACKOFF_S = 24 * 3600
+
+# longueur maximale de la raison enregistrée
+MAX_REASON = 500
+
+
+class QuarantineEntry(NamedTuple):
+    """
+    Fichier dont l'extraction a échoué (exception, budget de temps ou de mémoire dépassé).
+    Les dates sont en secondes depuis l'epoch.
+    """
+
+    path: str
+    reason: str
+    attempts: int
+    fingerprint: Fingerprint
+    firstFailedAt: int
+    lastFailedAt: int
+    retryAt: int
+
+    def blocks(self, fingerprint: Fingerprint, now: Optional[float] = None) -> bool:
+        """
+        Vrai si le fichier doit encore attendre : même empreinte qu'au dernier échec
+        et délai d'attente non écoulé. Un fichier modifié depuis est réessayé tout de suite.
+        """
+        if not self.fingerprint.same_stat(fingerprint):
+            return False
+        return (time.time() if now is None else now) < self.retryAt
+
+
+def backoff(
+    attempts: int,
+    base: float = QUARANTINE_BACKOFF_S,
+    maximum: float = QUARANTINE_MAX_BACKOFF_S,
+) -> float:
+    """
+    Attente (en secondes) après le n-ième échec consécutif : base, 2*base, 4*base...
+    """
+    return min(base * 2 ** max(0, attempts - 1), maximum)
+
+
+class QuarantineService:
+    """
+    Singleton de la quarantaine des fichiers pathologiques (table `quarantine`,
+    dans la base de DatabaseService) : raison du dernier échec, nombre d'essais,
+    empreinte du fichier et date du prochain essai (attente exponentielle).
+    Un fichier en quarantaine n'est pas réextrait à chaque événement ni à chaque
+    démarrage, sauf s'il a changé depuis son dernier échec.
+    Usage:
+        quarantine = QuarantineService.get_instance(db)
+        entry = quarantine.get(path)
+        if entry and entry.blocks(fingerprint): ...
+        quarantine.record(path, fingerprint, error, entry)
+        quarantine.list()
+    """
+
+    _instance = None
+    # pour thread-safety
+    _lock = Lock()
+
+    def __init__(
+        self,
+        db: DatabaseService,
+        base_backoff: float = QUARANTINE_BACKOFF_S,
+        max_backoff: float = QUARANTINE_MAX_BACKOFF_S,
+    ):
+        if hasattr(self, "_initialized") and self._initialized:
+            return
+        self.db = db
+        self.pool = db.pool
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+
+        # initialisation de la base de données
+        self.pool.execute(
+            """
+            -- fichiers dont l'extraction échoue (pas de clé vers `files` : ils n'y sont pas)
+            CREATE TABLE IF NOT EXISTS quarantine(
+              path TEXT PRIMARY KEY,
+              reason TEXT NOT NULL,
+              attempts INTEGER NOT NULL,
+              size INTEGER,
+              mtimeNs INTEGER,
+              inode INTEGER,
+              contentHash TEXT,
+              firstFailedAt INTEGER NOT NULL,
+              lastFailedAt INTEGER NOT NULL,
+              retryAt INTEGER NOT NULL
+            );
+            """
+        )
+
+        self._initialized = True
+
+    @classmethod
+    def get_instance(cls, db: DatabaseService):
+        """
+        Retourne l'unique instance de QuarantineService.
+        La crée si elle n'existe pas encore.
+        """
+        with cls._lock:
+            if cls._instance is None:
+                cls._instance = cls(db)
+            return cls._instance
+
+    @staticmethod
+    def _entry(row: tuple) -> QuarantineEntry:
+        path, reason, attempts, size, mtimeNs, inode, contentHash, *dates = row
+        return QuarantineEntry(
+            path,
+            reason,
+            attempts,
+            Fingerprint(size, mtimeNs, inode, contentHash),
+            *dates,
+        )
+
+    def get(self, path: Path) -> QuarantineEntry | None:
+        """
+        Retourne l'entrée de quarantaine d'un fichier, ou None.
+        """
+        rows = self.pool.query(
+            """SELECT path, reason, attempts, size, mtimeNs, inode, contentHash,
+                      firstFailedAt, lastFailedAt, retryAt
+               FROM quarantine WHERE path = ?;""",
+            (str(path),),
+        )
+        return self._entry(rows[0]) if rows else None
+
+    def record(
+        self,
+        path: Path,
+        fingerprint: Fingerprint,
+        error: BaseException | str,
+        previous: QuarantineEntry | None = None,
+    ) -> QuarantineEntry:
+        """
+        Enregistre un échec d'extraction. Les essais sont comptés tant que le fichier
+        garde la même empreinte (`previous` : entrée lue avant l'extraction).
+        """
+        now = int(time.time())
+        reason = error if isinstance(error, str) else f"{type(error).__name__}: {error}"
+        attempts, first = 1, now
+        if previous and previous.fingerprint.same_stat(fingerprint):
+            attempts, first = previous.attempts + 1, previous.firstFailedAt
+        entry = QuarantineEntry(
+            str(path),
+            reason[:MAX_REASON],
+            attempts,
+            fingerprint,
+            first,
+            now,
+            now + int(backoff(attempts, self.base_backoff, self.max_backoff)),
+        )
+        self.pool.submit(
+            """INSERT OR REPLACE INTO quarantine(path, reason, attempts, size, mtimeNs,
+                                                 inode, contentHash, firstFailedAt,
+                                                 lastFailedAt, retryAt)
+               VALUES(?,?,?,?,?,?,?,?,?,?);""",
+            (
+                entry.path,
+                entry.reason,
+                entry.attempts,
+                *fingerprint,
+                entry.firstFailedAt,
+                entry.lastFailedAt,
+                entry.retryAt,
+            ),
+        )
+        return entry
+
+    def list(self, limit: int = 100, offset: int = 0) -> list[QuarantineEntry]:
+        """
+        Fichiers en quarantaine, du plus récemment en échec au plus ancien.
+        """
+        rows = self.pool.query(
+            """SELECT path, reason, attempts, size, mtimeNs, inode, contentHash,
+                      firstFailedAt, lastFailedAt, retryAt
+               FROM quarantine ORDER BY lastFailedAt DESC, path LIMIT ? OFFSET ?;""",
+            (limit, offset),
+        )
+        return [self._entry(row) for row in rows]
+
+    def count(self) -> int:
+        return self.pool.query("SELECT COUNT(*) FROM quarantine;")[0][0]
+
+    def release(self, path: Path):
+        """
+        Sort un fichier de quarantaine (extraction réussie, fichier supprimé,
+        ou nouvel essai demandé par un opérateur).
+        """
+        self.pool.submit("DELETE FROM quarantine WHERE path = ?;", (str(path),))
+
+    def releaseAll(self):
+        self.pool.submit("DELETE FROM quarantine;")
+
+    def move(self, old: Path, new: Path):
+        """
+        Suit le déplacement d'un fichier en quarantaine.
+        """
+        self.pool.submit(
+            "UPDATE OR REPLACE quarantine SET path=? WHERE path=?;",
+            (str(new), str(old)),
+        )
+
+    def releaseDir(self, path: Path):
+        lo, hi = prefixRange(path)
+        self.pool.submit(
+            "DELETE FROM quarantine WHERE path > ? AND path < ?;", (lo, hi)
+        )
+
+    def moveDir(self, old: Path, new: Path):
+        lo, hi = prefixRange(old)
+        new_prefix, _ = prefixRange(new)
+        self.pool.submit(
+            """UPDATE OR REPLACE quarantine SET path = ? || substr(path, ?)
+               WHERE path > ? AND path < ?;""",
+            (new_prefix, len(lo) + 1, lo, hi),
+        )
@@ -0,0 +1,251 @@
+import logging, os, threading, time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Iterator
+
+from .database import DatabaseService
+from .fingerprint import Fingerprint
+from .handler import Job, should_ignore
+from .logs import log
+from .scheduler import JobScheduler
+
+# nombre de threads qui parcourent les dossiers en parallèle
+WALK_THREADS = 8
+
+# nombre de lignes de la table 'files' lues par lot pendant la comparaison
+DIFF_BATCH = 5000
+
+
+@dataclass
+class ReconcileStats:
+    """
+    Compteurs et durées (en secondes) de chaque phase d'une réconciliation.
+    """
+
+    root: str
+    dirs: int = 0
+    files: int = 0
+    new: int = 0
+    changed: int = 0
+    vanished: int = 0
+    unchanged: int = 0
+    walkSeconds: float = 0.0
+    diffSeconds: float = 0.0
+    errors: list[str] = field(default_factory=list)
+
+    def report(self) -> str:
+        return (
+            f"{self.root} dirs={self.dirs} files={self.files} "
+            f"new={self.new} changed={self.changed} vanished={self.vanished} "
+            f"unchanged={self.unchanged} walk={self.walkSeconds:.2f}s "
+            f"diff={self.diffSeconds:.2f}s errors={len(self.errors)}"
+        )
+
+    def merge(self, other: "ReconcileStats"):
+        """
+        Ajoute les compteurs d'une partie du parcours (un dossier).
+        """
+        self.dirs += other.dirs
+        self.files += other.files
+        self.new += other.new
+        self.changed += other.changed
+        self.vanished += other.vanished
+        self.unchanged += other.unchanged
+        self.diffSeconds += other.diffSeconds
+        self.errors += other.errors
+
+
+# -------------------- COMPARAISON AVEC LA BASE --------------------
+
+
+def diff_root(
+    db: DatabaseService,
+    root: Path,
+    files: list[tuple[str, Fingerprint]],
+    stats: ReconcileStats,
+    force: bool = False,
+    indexed: Iterator[tuple[str, Fingerprint]] | None = None,
+):
+    """
+    Compare la liste triée des fichiers présents sur le disque avec les entrées
+    de la table 'files' sous `root` (lues triées, par lots, ou `indexed`)
+    et produit les jobs des seuls fichiers nouveaux, modifiés ou disparus.
+    """
+    t0 = time.monotonic()
+    files.sort(key=lambda f: f[0])
+    disk = iter(files)
+    if indexed is None:
+        indexed = db.iterFingerprints(root, DIFF_BATCH)
+
+    d = next(disk, None)
+    i = next(indexed, None)
+    while d is not None or i is not None:
+        if i is None or (d is not None and d[0] < i[0]):
+            stats.new += 1
+            yield ("created", Path(d[0]), {})
+            d = next(disk, None)
+        elif d is None or i[0] < d[0]:
+            stats.vanished += 1
+            yield ("deleted", Path(i[0]), {})
+            i = next(indexed, None)
+        else:
+            if force or i[1].mtimeNs is None or not d[1].same_stat(i[1]):
+                stats.changed += 1
+                yield ("modified", Path(d[0]), {})
+            else:
+                stats.unchanged += 1
+            d = next(disk, None)
+            i = next(indexed, None)
+    stats.diffSeconds += time.monotonic() - t0
+
+
+def scan_dir(
+    directory: str, stats: ReconcileStats
+) -> tuple[list[tuple[str, Fingerprint]], set[str]]:
+    """
+    Lit les entrées directes d'un dossier : (chemin, empreinte) des fichiers réguliers
+    et noms des sous-dossiers. Les liens vers des fichiers sont suivis, comme par
+    `regular_stat` qui les indexe ; les liens vers des dossiers ne le sont pas.
+    Les stat des DirEntry sont réutilisés (pas de second appel système par fichier).
+    """
+    files, subdirs = [], set()
+    with os.scandir(directory) as it:
+        for entry in it:
+            if should_ignore(Path(entry.path)):
+                continue
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.add(entry.name)
+                elif entry.is_file():
+                    files.append((entry.path, Fingerprint.from_stat(entry.stat())))
+            except OSError as e:
+                stats.errors.append(f"{entry.path}: {e}")
+    return files, subdirs
+
+
+def diff_dir(
+    db: DatabaseService,
+    directory: str,
+    stats: ReconcileStats,
+    force: bool = False,
+    known: bool = True,
+) -> tuple[list[Job], list[Path], list[Path]]:
+    """
+    Compare un dossier (sans ses sous-dossiers) avec la table 'files' : jobs des
+    fichiers nouveaux, modifiés ou disparus, plus la suppression des sous-dossiers
+    indexés disparus. Retourne aussi ses sous-dossiers présents, connus de la base
+    puis inconnus (déplacés depuis l'extérieur : rien d'indexé dessous).
+    `known=False` : dossier inconnu de la base, comparé sans la lire.
+    Un dossier illisible ne produit aucun job (rien n'est supprimé de la base).
+    """
+    try:
+        files, subdirs = scan_dir(directory, stats)
+    except OSError as e:
+        stats.errors.append(f"{directory}: {e}")
+        return [], [], []
+    stats.files += len(files)
+
+    # entrées de la base : fichiers directement dans le dossier, noms des sous-dossiers
+    # (sans lire le contenu indexé des sous-dossiers)
+    direct, indexedDirs = [], set()
+    if known:
+        direct = db.dirFingerprints(Path(directory))
+        indexedDirs = set(db.childDirs(Path(directory)))
+
+    jobs = list(
+        diff_root(db, Path(directory), files, stats, force=force, indexed=iter(direct))
+    )
+    for name in sorted(indexedDirs - subdirs):
+        stats.vanished += 1
+        jobs.append(("deleted", Path(directory, name), {"directory": True}))
+    return (
+        jobs,
+        [Path(directory, name) for name in sorted(subdirs & indexedDirs)],
+        [Path(directory, name) for name in sorted(subdirs - indexedDirs)],
+    )
+
+
+# -------------------- PARCOURS PARALLELE --------------------
+
+
+def walk_parallel(
+    db: DatabaseService,
+    roots: list[Path],
+    emit: Callable[[Job, Path], None],
+    force: bool = False,
+    known: bool = True,
+    threads: int = WALK_THREADS,
+) -> dict[Path, ReconcileStats]:
+    """
+    Parcourt les racines en parallèle avec os.scandir, chaque dossier étant une tâche
+    comparée aussitôt avec la base (cf. `diff_dir`) : ses jobs sont passés à
+    `emit(job, racine)` pendant le parcours, la mémoire ne dépend que de la taille
+    d'un dossier. `known=False` : racines inconnues de la base, jamais relue.
+    Retourne les compteurs de chaque racine.
+    """
+    results = {root: ReconcileStats(str(root)) for root in roots}
+    lock = threading.Lock()
+    pending = 0
+    done = threading.Event()
+
+    def visit(root: Path, directory: str, known: bool):
+        nonlocal pending
+        stats = ReconcileStats(directory, dirs=1)
+        subdirs = []
+        try:
+            jobs, subknown, subunknown = diff_dir(db, directory, stats, force, known)
+            subdirs = [(d, True) for d in subknown] + [(d, False) for d in subunknown]
+            for job in jobs:
+                emit(job, root)
+        except Exception as e:
+            stats.errors.append(f"{directory}: {e!r}")
+        finally:
+            with lock:
+                results[root].merge(stats)
+                pending += len(subdirs)
+                for d, k in subdirs:
+                    pool.submit(visit, root, str(d), k)
+                pending -= 1
+                if pending == 0:
+                    done.set()
+
+    t0 = time.monotonic()
+    with ThreadPoolExecutor(max_workers=threads, thread_name_prefix="walk") as pool:
+        with lock:
+            pending = len(roots)
+            for root in roots:
+                pool.submit(visit, root, str(root), known)
+        if roots:
+            done.wait()
+
+    elapsed = time.monotonic() - t0
+    for stats in results.values():
+        stats.walkSeconds = elapsed
+    return results
+
+
+def reconcile(
+    roots: list[Path],
+    db: DatabaseService,
+    qjobs: JobScheduler,
+    force: bool = False,
+) -> list[ReconcileStats]:
+    """
+    Réconciliation au démarrage : n'enfile que les fichiers nouveaux, modifiés
+    ou disparus depuis le dernier passage (en backlog, derrière les événements en direct),
+    et affiche les compteurs de chaque phase.
+    """
+    # jobs enfilés dossier par dossier pendant le parcours
+    # (backlog plein : les threads du parcours attendent)
+    walked = walk_parallel(
+        db,
+        roots,
+        lambda job, root: qjobs.put(job, backlog=True, root=str(root)),
+        force=force,
+    )
+    for stats in walked.values():
+        log("RECONCILE", report=stats.report())
+        for err in stats.errors[:10]:
+            log("ERROR-RECONCILE", logging.WARNING, error=err)
+    return list(walked.values())
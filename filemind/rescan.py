@@ -0,0 +1,283 @@
+import inspect, logging, os, threading, time
+from pathlib import Path
+from typing import Callable
+
+from .database import DatabaseService
+from .handler import should_ignore
+from .logs import log
+from .metrics import metrics
+from .reconcile import ReconcileStats, diff_dir, reconcile, walk_parallel
+from .scheduler import JobScheduler
+
+# attente (en secondes) après une perte d'événements, pour regrouper ceux d'une même rafale
+RESCAN_DELAY_S = 1.0
+
+# intervalle minimal (en secondes) entre deux rescans d'un même dossier
+RESCAN_MIN_INTERVAL_S = 10.0
+
+# marge (en secondes) avant la perte d'événements : les dossiers modifiés depuis sont relus
+RESCAN_LOOKBACK_S = 60.0
+
+# intervalle minimal (en secondes) entre deux comparaisons complètes des empreintes
+# d'une même racine (modifications sur place, invisibles dans la date des dossiers)
+RESCAN_FULL_INTERVAL_S = 300.0
+
+# pertes d'événements détectées, par raison (overflow : file inotify pleine, error : émetteur arrêté)
+EVENTS_LOST_TOTAL = metrics.counter(
+    "filemind_events_lost_total",
+    "Pertes d'événements détectées, par raison (overflow, error)",
+)
+
+# rescans effectués, par passe (dirs : dossiers récemment modifiés, full : empreintes)
+RESCANS_TOTAL = metrics.counter(
+    "filemind_rescans_total", "Rescans après une perte d'événements, par passe"
+)
+
+
+def watch_overflows(callback: Callable[[str | None], None]) -> bool:
+    """
+    Appelle `callback(racine)` quand la file du noyau d'une instance inotify déborde
+    (événement IN_Q_OVERFLOW, que watchdog ignore) ; la racine est celle
+    de l'émetteur concerné, None si elle est inconnue.
+    S'appuie sur des internes de watchdog (version fixée dans requirements.txt),
+    vérifiés avant d'être remplacés.
+    Retourne False (avec un avertissement) hors inotify (macOS, Windows...)
+    ou si ces internes ont changé.
+    """
+    try:
+        from watchdog.observers.inotify_c import Inotify, InotifyConstants
+    except ImportError:
+        log("OVERFLOW-DETECTION-UNAVAILABLE", logging.WARNING, reason="no inotify")
+        return False
+
+    parse = inspect.getattr_static(Inotify, "_parse_event_buffer", None)
+    if (
+        not isinstance(parse, staticmethod)
+        or not isinstance(inspect.getattr_static(Inotify, "path", None), property)
+        or not hasattr(InotifyConstants, "IN_Q_OVERFLOW")
+    ):
+        from watchdog.version import VERSION_STRING
+
+        log(
+            "OVERFLOW-DETECTION-UNAVAILABLE",
+            logging.WARNING,
+            reason="unsupported watchdog internals",
+            watchdog=VERSION_STRING,
+        )
+        return False
+    parse = parse.__func__
+
+    def _parse_event_buffer(event_buffer: bytes):
+        for wd, mask, cookie, name in parse(event_buffer):
+            if wd == -1 and mask & InotifyConstants.IN_Q_OVERFLOW:
+                # lu dans le thread InotifyBuffer de l'émetteur qui a débordé
+                # (attribut absent : racine inconnue, toutes les racines sont relues)
+                inotify = getattr(threading.current_thread(), "_inotify", None)
+                path = getattr(inotify, "path", None)
+                callback(os.fsdecode(path) if path else None)
+            yield wd, mask, cookie, name
+
+    Inotify._parse_event_buffer = staticmethod(_parse_event_buffer)
+    return True
+
+
+def emitter_alive(emitter) -> bool:
+    """
+    Vrai si l'émetteur watchdog et son thread de lecture inotify tournent encore.
+    """
+    buffer = getattr(emitter, "_inotify", None)
+    return emitter.is_alive() and (
+        not isinstance(buffer, threading.Thread) or buffer.is_alive()
+    )
+
+
+# -------------------- DOSSIERS RECEMMENT MODIFIES --------------------
+
+
+def changed_dirs(root: Path, since: float, stats: ReconcileStats) -> list[str]:
+    """
+    Dossiers sous `root` (compris) dont la date de modification est postérieure
+    à `since` : fichiers ou sous-dossiers créés, supprimés ou renommés depuis.
+    Seuls les dossiers sont examinés (un stat par dossier, aucun par fichier).
+    """
+    since_ns = int(since * 1e9)
+    changed, stack = [], [str(root)]
+    while stack:
+        directory = stack.pop()
+        stats.dirs += 1
+        try:
+            if os.stat(directory).st_mtime_ns >= since_ns:
+                changed.append(directory)
+            with os.scandir(directory) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False) and not should_ignore(
+                        Path(entry.path)
+                    ):
+                        stack.append(entry.path)
+        except OSError as e:
+            stats.errors.append(f"{directory}: {e}")
+    return changed
+
+
+# -------------------- RESCANS CIBLES --------------------
+
+
+class Rescanner(threading.Thread):
+    """
+    Rattrape les événements perdus (débordement de la file inotify, émetteur arrêté)
+    sans redémarrage : chaque demande porte sur une racine surveillée ou un sous-dossier.
+    Les demandes sont regroupées (un ancêtre couvre ses sous-dossiers) et limitées
+    à un rescan par dossier toutes les `min_interval` secondes.
+    Un rescan :
+      1. replace les surveillances de la racine (`rewatch`) : les dossiers créés pendant
+         la perte n'étaient pas surveillés ;
+      2. relit les dossiers modifiés depuis la perte (moins `lookback`) et compare leurs
+         fichiers avec la table 'files' : créations, suppressions et renommages
+         sont enfilés en direct, en quelques secondes ;
+      3. compare ensuite les empreintes de toute la racine (modifications sur place),
+         en backlog, au plus une fois toutes les `full_interval` secondes.
+    Usage:
+        rescanner = Rescanner(db, qjobs, roots, rewatch=rewatch)
+        rescanner.start()
+        watch_overflows(lambda root: rescanner.request(root, "overflow"))
+    """
+
+    def __init__(
+        self,
+        db: DatabaseService,
+        qjobs: JobScheduler,
+        roots: list[str],
+        rewatch: Callable[[str], None] | None = None,
+        delay: float = RESCAN_DELAY_S,
+        min_interval: float = RESCAN_MIN_INTERVAL_S,
+        lookback: float = RESCAN_LOOKBACK_S,
+        full_interval: float = RESCAN_FULL_INTERVAL_S,
+    ):
+        super().__init__(name="rescan", daemon=True)
+        self.db = db
+        self.qjobs = qjobs
+        self.roots = [str(r) for r in roots]
+        self.rewatch = rewatch
+        self.delay = delay
+        self.min_interval = min_interval
+        self.lookback = lookback
+        self.full_interval = full_interval
+
+        self.cond = threading.Condition()
+        # [dossier] => (date d'exécution, date de la perte la plus ancienne, raisons)
+        self.pending: dict[str, tuple[float, float, set[str]]] = {}
+        # [dossier] => fin du dernier rescan ; [racine] => dernière comparaison complète
+        self.lastRun: dict[str, float] = {}
+        self.lastFull: dict[str, float] = {}
+        self.stopped = False
+
+    def root_of(self, path: str) -> str | None:
+        for root in sorted(self.roots, key=len, reverse=True):
+            if path == root or path.startswith(root.rstrip(os.sep) + os.sep):
+                return root
+        return None
+
+    @staticmethod
+    def _covers(parent: str, path: str) -> bool:
+        return path == parent or path.startswith(parent.rstrip(os.sep) + os.sep)
+
+    def request(self, path: str | None, reason: str):
+        """
+        Demande le rescan d'un dossier (toutes les racines si None) après une perte
+        d'événements ; appelable depuis n'importe quel thread, sans attente.
+        """
+        EVENTS_LOST_TOTAL.inc(reason=reason)
+        now = time.time()
+        paths = self.roots if path is None else [str(path)]
+        with self.cond:
+            for p in paths:
+                lost, reasons = now, {reason}
+                for other in list(self.pending):
+                    if self._covers(other, p):
+                        # un ancêtre en attente couvre déjà ce dossier
+                        due, first, rs = self.pending[other]
+                        self.pending[other] = (due, min(first, lost), rs | reasons)
+                        break
+                    if self._covers(p, other):
+                        _, first, rs = self.pending.pop(other)
+                        lost, reasons = min(lost, first), reasons | rs
+                else:
+                    due = max(
+                        now + self.delay, self.lastRun.get(p, 0) + self.min_interval
+                    )
+                    self.pending[p] = (due, lost, reasons)
+                    log("EVENTS-LOST", logging.WARNING, path=p, reason=reason)
+            self.cond.notify_all()
+
+    def stop(self):
+        with self.cond:
+            self.stopped = True
+            self.cond.notify_all()
+
+    def run(self):
+        while True:
+            with self.cond:
+                while not self.stopped:
+                    now = time.time()
+                    due = [p for p, (at, _, _) in self.pending.items() if at <= now]
+                    if due:
+                        break
+                    wait = min((at for at, _, _ in self.pending.values()), default=None)
+                    self.cond.wait(None if wait is None else wait - now)
+                if self.stopped:
+                    return
+                work = [(p, *self.pending.pop(p)[1:]) for p in due]
+            for path, lost, reasons in work:
+                # les pertes pendant le rescan sont couvertes par la marge `lookback`
+                self.lastRun[path] = time.time()
+                try:
+                    self.rescan(path, lost - self.lookback, reasons)
+                except Exception as e:
+                    log("ERROR-RESCAN", logging.ERROR, path=path, error=repr(e))
+
+    def rescan(self, path: str, since: float, reasons: set[str] = frozenset()):
+        """
+        Rescan d'un dossier : surveillances replacées, dossiers modifiés depuis `since`
+        relus (jobs en direct), puis comparaison complète de la racine (backlog).
+        """
+        root = self.root_of(path) or path
+        if self.rewatch and path == root:
+            self.rewatch(root)
+
+        t0 = time.monotonic()
+        stats = ReconcileStats(path)
+        jobs, unknown = [], []
+        # ordre trié : un dossier passe avant ses sous-dossiers, ceux d'un sous-dossier
+        # inconnu (parcouru en entier plus bas) sont ignorés
+        for directory in sorted(changed_dirs(Path(path), since, stats)):
+            if any(self._covers(str(sub), directory) for sub in unknown):
+                continue
+            dir_jobs, _, dir_unknown = diff_dir(self.db, directory, stats)
+            jobs += dir_jobs
+            unknown += dir_unknown
+        for job in jobs:
+            self.qjobs.put(job, root=root)
+        # sous-dossiers arrivés d'ailleurs (date de modification ancienne) : parcours
+        # complet, sans lire la base (rien d'indexé dessous)
+        walked = walk_parallel(
+            self.db, unknown, lambda job, _: self.qjobs.put(job, root=root), known=False
+        )
+        for sub_stats in walked.values():
+            stats.files += sub_stats.files
+            stats.new += sub_stats.new
+            stats.errors += sub_stats.errors
+        stats.walkSeconds = time.monotonic() - t0
+        RESCANS_TOTAL.inc(phase="dirs")
+        log(
+            "RESCAN",
+            logging.WARNING,
+            path=path,
+            reasons=",".join(sorted(reasons)),
+            jobs=len(jobs) + sum(s.new for s in walked.values()),
+            report=stats.report(),
+        )
+
+        if time.time() - self.lastFull.get(root, 0) >= self.full_interval:
+            self.lastFull[root] = time.time()
+            RESCANS_TOTAL.inc(phase="full")
+            reconcile([Path(root)], self.db, self.qjobs)
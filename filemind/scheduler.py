@@ -0,0 +1,374 @@
+import logging, os, threading, time
+from collections import deque
+from functools import partial
+from pathlib import Path
+from typing import Callable
+
+from .handler import Job
+from .job_journal import INDEX_KINDS, JobJournal
+from .logs import log
+from .metrics import metrics
+
+# classes de priorité, servies dans cet ordre
+CHEAP = "cheap"  # suppressions et déplacements (aucune extraction)
+LIVE = "live"  # événements en direct (création / modification)
+BACKLOG = "backlog"  # fichiers de la réconciliation initiale
+CLASSES = (CHEAP, LIVE, BACKLOG)
+
+# nombre maximal de jobs du backlog en mémoire
+# (au-delà : sur le disque avec un journal, sinon le producteur attend)
+MAX_BACKLOG = 10000
+
+# nombre maximal de jobs en mémoire des autres classes avec un journal (au-delà : sur le disque)
+MAX_MEMORY_JOBS = 10000
+
+# un job du backlog est servi au moins toutes les BACKLOG_EVERY distributions
+BACKLOG_EVERY = 16
+
+# taille de la fenêtre glissante des temps d'attente
+WAIT_WINDOW = 1000
+
+# jobs reçus par l'ordonnanceur, par devenir
+# (queued : en mémoire, spilled : sur le disque, deduped : déjà en attente, replayed)
+QUEUE_JOBS_TOTAL = metrics.counter(
+    "filemind_queue_jobs_total",
+    "Jobs reçus par l'ordonnanceur, par devenir (queued, spilled, deduped, replayed)",
+)
+
+
+class ClassQueue:
+    """
+    File d'une classe de priorité : une sous-file par racine surveillée,
+    servies à tour de rôle pour qu'une grosse racine n'affame pas les autres.
+    """
+
+    def __init__(self):
+        self.byRoot: dict[str, deque[tuple[Job, int, float]]] = {}
+        # racines ayant des jobs, dans l'ordre du tourniquet
+        self.ring: deque[str] = deque()
+        self.size = 0
+        self.served = 0
+        self.waits: deque[float] = deque(maxlen=WAIT_WINDOW)
+
+    def put(self, job: Job, root: str, seq: int = 0):
+        q = self.byRoot.get(root)
+        if q is None:
+            q = self.byRoot[root] = deque()
+        if not q:
+            self.ring.append(root)
+        q.append((job, seq, time.monotonic()))
+        self.size += 1
+
+    def get(self) -> tuple[Job, int]:
+        root = self.ring.popleft()
+        q = self.byRoot[root]
+        job, seq, queued = q.popleft()
+        if q:
+            self.ring.append(root)
+        else:
+            del self.byRoot[root]
+        self.size -= 1
+        self.served += 1
+        self.waits.append(time.monotonic() - queued)
+        return job, seq
+
+    def stats(self) -> dict:
+        waits = sorted(self.waits)
+        oldest = min((q[0][2] for q in self.byRoot.values()), default=None)
+        return {
+            "depth": self.size,
+            "roots": len(self.byRoot),
+            "served": self.served,
+            "waitP50Ms": waits[len(waits) // 2] * 1000 if waits else 0.0,
+            "waitMaxMs": waits[-1] * 1000 if waits else 0.0,
+            "oldestMs": (time.monotonic() - oldest) * 1000 if oldest else 0.0,
+        }
+
+
+class JobScheduler:
+    """
+    Ordonnanceur des jobs à la place d'une simple file FIFO :
+    les suppressions/déplacements passent avant les événements en direct,
+    qui passent avant le backlog de la réconciliation initiale ; dans chaque classe,
+    les racines surveillées sont servies à tour de rôle.
+    Un job d'indexation déjà en attente pour un chemin n'est pas ajouté une seconde
+    fois (un job en direct remplace celui du backlog).
+    Avec un journal (JobJournal), les jobs sont persistés jusqu'à leur acquittement
+    (task_done, ou avec l'écriture de leur résultat si le Worker l'a reporté par defer)
+    et rejoués au démarrage ; au-delà de la fenêtre en mémoire de chaque
+    classe, ils ne sont que sur le disque et relus par lots : aucun producteur n'attend.
+    Même interface que queue.Queue pour les Workers (get, task_done, join, qsize).
+    Usage:
+        qjobs = JobScheduler(roots, journal=JobJournal(db))
+        qjobs.put(("modified", path, {}))
+        qjobs.put(("created", path, {}), backlog=True)
+    """
+
+    def __init__(
+        self,
+        roots: list[str] = (),
+        max_backlog: int = MAX_BACKLOG,
+        backlog_every: int = BACKLOG_EVERY,
+        journal: JobJournal | None = None,
+        max_memory: int = MAX_MEMORY_JOBS,
+    ):
+        # racines triées de la plus longue à la plus courte (racines imbriquées)
+        self.roots = sorted((str(r) for r in roots), key=len, reverse=True)
+        self.max_backlog = max_backlog
+        self.backlog_every = backlog_every
+        self.journal = journal
+        self.max_memory = max_memory
+        self.classes = {c: ClassQueue() for c in CLASSES}
+
+        self.cond = threading.Condition()
+        self.unfinished = 0
+        # jobs distribués pas encore terminés ; plus aucune distribution après close()
+        self.active = 0
+        self.closed = False
+        # distributions depuis le dernier job du backlog
+        self.sinceBacklog = 0
+        # numéro d'ordre du prochain job
+        self.seq = 1
+        # [chemin] => (numéro d'ordre, classe) du job d'indexation en attente en mémoire
+        self.indexing: dict[Path, tuple[int, str]] = {}
+        # numéro d'ordre du job en cours, par Worker (acquitté par task_done)
+        self.local = threading.local()
+
+        # jobs sur le disque seulement : premier numéro d'ordre à relire par classe
+        # (None : aucun), nombre (approché) et nombre total de jobs écrits sur le disque
+        self.diskFrom: dict[str, int | None] = {c: None for c in CLASSES}
+        self.spilled = {c: 0 for c in CLASSES}
+        self.spills = {c: 0 for c in CLASSES}
+        self.refilling = False
+
+        if journal:
+            self.seq = journal.lastSeq() + 1
+            for cls, (first, n) in journal.pending().items():
+                self.diskFrom[cls] = first
+                self.spilled[cls] = n
+                QUEUE_JOBS_TOTAL.inc(n, result="replayed")
+                log("QUEUE-REPLAY", logging.INFO, queue=cls, jobs=n)
+
+        metrics.gauge(
+            "filemind_queue_depth",
+            "Jobs en attente, par classe de priorité",
+            lambda: [
+                ({"class": c}, s["depth"] + s["spilled"])
+                for c, s in self.stats().items()
+            ],
+        )
+        metrics.gauge(
+            "filemind_queue_oldest_seconds",
+            "Attente du plus ancien job en file, par classe de priorité",
+            lambda: [
+                ({"class": c}, s["oldestMs"] / 1000) for c, s in self.stats().items()
+            ],
+        )
+
+    def root_of(self, path: Path) -> str:
+        p = str(path)
+        for root in self.roots:
+            if p == root or p.startswith(root.rstrip(os.sep) + os.sep):
+                return root
+        return ""
+
+    def classify(self, job: Job, backlog: bool) -> str:
+        kind = job[0]
+        if kind not in INDEX_KINDS:
+            return CHEAP
+        return BACKLOG if backlog else LIVE
+
+    def _window(self, cls: str) -> int:
+        return self.max_backlog if cls == BACKLOG else self.max_memory
+
+    def put(self, job: Job, backlog: bool = False, root: str | None = None):
+        """
+        Ajoute un job. Sans journal, seuls les jobs du backlog attendent s'il est plein ;
+        avec un journal, personne n'attend (les jobs au-delà de la fenêtre vont sur le disque).
+        """
+        cls = self.classify(job, backlog)
+        if root is None:
+            root = self.root_of(job[1])
+        root = str(root)
+        index = job[0] in INDEX_KINDS
+        with self.cond:
+            if self.journal is None and cls == BACKLOG:
+                while self.classes[BACKLOG].size >= self.max_backlog:
+                    self.cond.wait()
+            if index:
+                pending = self.indexing.get(job[1])
+                if pending and (pending[1] != BACKLOG or cls == BACKLOG):
+                    # même travail déjà en attente, à une priorité au moins égale
+                    QUEUE_JOBS_TOTAL.inc(result="deduped")
+                    return
+                if pending:
+                    # le job en direct remplace celui du backlog (ignoré à sa sortie)
+                    del self.indexing[job[1]]
+                    self.unfinished -= 1
+
+            seq, self.seq = self.seq, self.seq + 1
+            if self.journal:
+                if index and cls != BACKLOG:
+                    self.journal.replace(seq, cls, root, job)
+                else:
+                    # doublons du backlog sur le disque : écartés à la relecture (_refill)
+                    self.journal.add(seq, cls, root, job)
+                full = self.classes[cls].size >= self._window(cls)
+                if full or self.diskFrom[cls] is not None:
+                    # sur le disque seulement, relu dans l'ordre quand la fenêtre se vide
+                    if self.diskFrom[cls] is None:
+                        self.diskFrom[cls] = seq
+                    self.spilled[cls] += 1
+                    self.spills[cls] += 1
+                    QUEUE_JOBS_TOTAL.inc(result="spilled")
+                    self.cond.notify_all()
+                    return
+
+            self._queue(cls, root, job, seq)
+            QUEUE_JOBS_TOTAL.inc(result="queued")
+            self.cond.notify_all()
+
+    def _queue(self, cls: str, root: str, job: Job, seq: int):
+        self.classes[cls].put(job, root, seq)
+        self.unfinished += 1
+        if job[0] in INDEX_KINDS:
+            self.indexing[job[1]] = (seq, cls)
+
+    def _refill(self, cls: str):
+        """
+        Relit du journal le début des jobs d'une classe qui ne sont que sur le disque
+        (appelée sous self.cond, relâché pendant la lecture).
+        """
+        start, spills = self.diskFrom[cls], self.spills[cls]
+        limit = max(1, self._window(cls) // 2)
+        self.refilling = True
+        self.cond.release()
+        try:
+            rows = self.journal.load(cls, start, limit)
+        finally:
+            self.cond.acquire()
+            self.refilling = False
+            self.cond.notify_all()
+
+        for seq, root, job in rows:
+            if job[0] in INDEX_KINDS and job[1] in self.indexing:
+                # doublon d'un job déjà en mémoire
+                self.journal.ack(seq)
+                continue
+            self._queue(cls, root, job, seq)
+        self.spilled[cls] = max(0, self.spilled[cls] - len(rows))
+        if len(rows) < limit and self.spills[cls] == spills:
+            # tout ce qui a été écrit avant la lecture est relu
+            self.diskFrom[cls] = None
+            self.spilled[cls] = 0
+        else:
+            self.diskFrom[cls] = rows[-1].seq + 1 if rows else start
+
+    def _pick(self) -> str | None:
+        def ready(cls: str) -> bool:
+            return bool(self.classes[cls].size) or (
+                self.diskFrom[cls] is not None and not self.refilling
+            )
+
+        if ready(BACKLOG) and self.sinceBacklog >= self.backlog_every:
+            return BACKLOG
+        for cls in CLASSES:
+            if ready(cls):
+                return cls
+        return None
+
+    def get(self) -> Job:
+        with self.cond:
+            while True:
+                cls = None if self.closed else self._pick()
+                if cls is None:
+                    self.cond.wait()
+                    continue
+                if not self.classes[cls].size:
+                    self._refill(cls)
+                    continue
+                job, seq = self.classes[cls].get()
+                if job[0] in INDEX_KINDS:
+                    if self.indexing.get(job[1], (None,))[0] != seq:
+                        # remplacé par un job en direct
+                        continue
+                    del self.indexing[job[1]]
+                break
+            self.sinceBacklog = 0 if cls == BACKLOG else self.sinceBacklog + 1
+            self.active += 1
+            self.local.seq = seq
+            # libère un producteur du backlog en attente
+            self.cond.notify_all()
+            return job
+
+    def defer(self) -> Callable[[], None] | None:
+        """
+        Reporte l'acquittement du job en cours du Worker appelant : task_done ne l'efface
+        plus du journal, c'est la fonction retournée qui le fait, à appeler dans la
+        transaction qui écrit son résultat (ex. après l'embedding). None sans journal.
+        """
+        seq = getattr(self.local, "seq", None)
+        if self.journal is None or seq is None:
+            return None
+        self.local.seq = None
+        return partial(self.journal.ack, seq)
+
+    def task_done(self):
+        seq = getattr(self.local, "seq", None)
+        self.local.seq = None
+        if self.journal and seq is not None:
+            self.journal.ack(seq)
+        with self.cond:
+            self.unfinished -= 1
+            self.active -= 1
+            if self.unfinished <= 0 or self.closed:
+                self.cond.notify_all()
+
+    def join(self):
+        with self.cond:
+            while self.unfinished > 0 or any(
+                d is not None for d in self.diskFrom.values()
+            ):
+                self.cond.wait()
+
+    def close(self) -> int:
+        """
+        Arrêt sans vider la file : plus aucun job n'est distribué, attend la fin
+        des jobs en cours. Retourne le nombre de jobs en attente (rejoués au
+        prochain démarrage avec un journal).
+        """
+        with self.cond:
+            self.closed = True
+            while self.active > 0:
+                self.cond.wait()
+        if self.journal:
+            self.journal.db.flush()
+        return self.qsize()
+
+    def qsize(self) -> int:
+        with self.cond:
+            return sum(c.size for c in self.classes.values()) + sum(
+                self.spilled.values()
+            )
+
+    def empty(self) -> bool:
+        return self.qsize() == 0
+
+    def stats(self) -> dict:
+        """
+        Profondeur (en mémoire et sur le disque), temps d'attente
+        et nombre de jobs servis par classe.
+        """
+        with self.cond:
+            return {
+                cls: {**q.stats(), "spilled": self.spilled[cls]}
+                for cls, q in self.classes.items()
+            }
+
+    def report(self) -> str:
+        return " ".join(
+            f"{cls}[depth={s['depth']} spilled={s['spilled']} served={s['served']} "
+            f"wait_p50={s['waitP50Ms']:.0f}ms wait_max={s['waitMaxMs']:.0f}ms "
+            f"oldest={s['oldestMs']:.0f}ms]"
+            for cls, s in self.stats().items()
+        )
@@ -0,0 +1,281 @@
+import os
+import numpy as np
+from pathlib import Path
+
+# nombre de lignes réservées à chaque agrandissement du fichier (au minimum)
+GROW_ROWS = 4096
+
+# nombre de lignes scorées par produit matrice-vecteur lors d'une recherche
+SEARCH_CHUNK = 65536
+
+# nombre de modifications de la matrice avant une sauvegarde automatique de la table des ids
+SAVE_EVERY = 1000
+
+
+class VectorMatrix:
+    """
+    Copie contiguë des vecteurs float32 d'un espace, dans un fichier projeté en mémoire
+    (np.memmap) : une ligne par vecteur, plus une table ligne => `vectors.id`
+    (-1 pour une ligne libre, réutilisée par le prochain ajout).
+    La table `vectors` de SQLite reste la source de vérité ; la matrice se reconstruit depuis elle.
+    Ouvrir la matrice ne décode rien : les pages sont lues à la demande et partagées
+    entre processus par le cache du système.
+    Une reconstruction s'écrit dans un fichier temporaire qui remplace l'ancien à la
+    sauvegarde : les processus qui l'ont projeté gardent leur copie intacte.
+    En lecture seule (`readonly`), la matrice est seulement projetée, jamais modifiée.
+    Même interface que AnnIndex (load, reset, add, remove, search, save...).
+    """
+
+    def __init__(
+        self,
+        path: str,
+        dim: int,
+        grow_rows: int = GROW_ROWS,
+        search_chunk: int = SEARCH_CHUNK,
+        save_every: int = SAVE_EVERY,
+        readonly: bool = False,
+    ):
+        self.path = Path(path)
+        self.ids_path = self.path.with_name(self.path.name + ".ids.npy")
+        # fichier des lignes en cours d'écriture (temporaire pendant une reconstruction)
+        self.file = self.path
+        self.readonly = readonly
+        self.dim = dim
+        self.grow_rows = grow_rows
+        self.search_chunk = search_chunk
+        self.save_every = save_every
+
+        # nombre de modifications depuis la dernière sauvegarde
+        self.pending = 0
+        self.rows: np.memmap | None = None
+        # [ligne] => id (-1 si libre)
+        self.ids = np.empty(0, dtype="int64")
+        # [id] => ligne et lignes libres, construits au premier ajout/retrait
+        # (un processus qui ne fait que chercher n'a rien à décoder)
+        self._slots: dict[int, int] | None = {}
+        self._free: list[int] = []
+
+    @property
+    def slots(self) -> dict[int, int]:
+        if self._slots is None:
+            self._slots = {int(i): row for row, i in enumerate(self.ids) if i >= 0}
+            self._free = [int(row) for row in np.flatnonzero(self.ids < 0)[::-1]]
+        return self._slots
+
+    @property
+    def free(self) -> list[int]:
+        self.slots
+        return self._free
+
+    @property
+    def ntotal(self) -> int:
+        if self._slots is None:
+            return int(np.count_nonzero(self.ids >= 0))
+        return len(self._slots)
+
+    @property
+    def capacity(self) -> int:
+        return len(self.ids)
+
+    def _map(self, capacity: int):
+        if self.rows is not None:
+            self.rows.flush()
+            self.rows = None
+        if capacity == 0:
+            return
+        self.rows = np.memmap(
+            self.file,
+            dtype="float32",
+            mode="r" if self.readonly else "r+",
+            shape=(capacity, self.dim),
+        )
+
+    def _writable(self):
+        if self.readonly:
+            raise RuntimeError(f"{self.path} : matrice ouverte en lecture seule")
+
+    def load(self) -> bool:
+        """
+        Projette la matrice persistée. Retourne False si elle est absente ou incohérente.
+        """
+        if not self.path.exists() or not self.ids_path.exists():
+            return False
+        try:
+            ids = np.load(self.ids_path)
+        except (OSError, ValueError):
+            return False
+        if ids.ndim != 1 or self.path.stat().st_size != len(ids) * self.dim * 4:
+            return False
+        self.ids = ids.astype("int64", copy=False)
+        self._slots = None
+        self.file = self.path
+        self._map(self.capacity)
+        self.pending = 0
+        return True
+
+    def reset(self):
+        """
+        Vide la matrice (avant une reconstruction), dans un fichier temporaire
+        qui ne remplace le fichier projeté qu'à la sauvegarde.
+        """
+        self._writable()
+        self.rows = None
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.file = self.path.with_name(self.path.name + ".tmp")
+        with open(self.file, "wb"):
+            pass
+        self.ids = np.empty(0, dtype="int64")
+        self._slots = {}
+        self._free = []
+        self.pending = 0
+
+    def _grow(self, n: int):
+        capacity = max(self.capacity + n, self.capacity * 2, self.grow_rows)
+        if self.rows is not None:
+            self.rows.flush()
+            self.rows = None
+        with open(self.file, "a+b") as f:
+            f.truncate(capacity * self.dim * 4)
+        self.free.extend(range(capacity - 1, self.capacity - 1, -1))
+        self.ids = np.concatenate(
+            [self.ids, np.full(capacity - self.capacity, -1, dtype="int64")]
+        )
+        self._map(capacity)
+
+    def train(self, vecs: np.ndarray):
+        """
+        Rien à entraîner (recherche exhaustive exacte).
+        """
+
+    def add(self, ids: np.ndarray, vecs: np.ndarray):
+        if len(ids) == 0:
+            return
+        self._writable()
+        slots = self.slots
+        new = sum(1 for i in ids if int(i) not in slots)
+        if new > len(self.free):
+            self._grow(new - len(self.free))
+        rows = np.empty(len(ids), dtype="int64")
+        for n, i in enumerate(ids):
+            i = int(i)
+            row = slots.get(i)
+            if row is None:
+                row = slots[i] = self._free.pop()
+                self.ids[row] = i
+            rows[n] = row
+        self.rows[rows] = np.asarray(vecs, dtype="float32").reshape(len(ids), self.dim)
+        self.pending += len(ids)
+
+    def remove(self, ids: np.ndarray):
+        if len(ids) == 0:
+            return
+        self._writable()
+        rows = [row for i in ids if (row := self.slots.pop(int(i), None)) is not None]
+        if not rows:
+            return
+        self.ids[rows] = -1
+        self.rows[rows] = 0
+        self.free.extend(rows)
+        self.pending += len(rows)
+
+    def get(self, ids: np.ndarray) -> np.ndarray:
+        """
+        Retourne les vecteurs des ids donnés (lignes à zéro pour les ids inconnus).
+        """
+        out = np.zeros((len(ids), self.dim), dtype="float32")
+        if self._slots is None:
+            # processus de recherche : un parcours vectorisé de la table des ids
+            # plutôt que la construction de la table [id] => ligne
+            found = np.flatnonzero(np.isin(self.ids, ids))
+            slots = dict(zip(self.ids[found].tolist(), found.tolist()))
+        else:
+            slots = self._slots
+        for n, i in enumerate(ids):
+            row = slots.get(int(i))
+            if row is not None:
+                out[n] = self.rows[row]
+        return out
+
+    def rerank(
+        self, query: np.ndarray, ids: np.ndarray, k: int
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Recalcule exactement (float32) les scores de candidats issus d'un index
+        compressé et retourne (scores, ids) des k meilleurs, comme `search`.
+        """
+        query = np.asarray(query, dtype="float32").reshape(-1)
+        ids = np.asarray(ids, dtype="int64")
+        ids = ids[ids >= 0]
+        scores = self.get(ids) @ query
+        order = np.argsort(-scores, kind="stable")[:k]
+        pad = k - len(order)
+        return (
+            np.concatenate([scores[order], np.full(pad, -np.inf, dtype="float32")]),
+            np.concatenate([ids[order], np.full(pad, -1, dtype="int64")]),
+        )
+
+    def sample(self, n: int, seed: int = 0) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Tire au hasard n vecteurs stockés (ids, vecteurs), par ex. pour entraîner
+        un index sans charger toute la matrice.
+        """
+        used = np.flatnonzero(self.ids >= 0)
+        rows = np.sort(np.random.default_rng(seed).permutation(used)[:n])
+        return self.ids[rows], np.asarray(self.rows[rows], dtype="float32")
+
+    def iter_chunks(self):
+        """
+        Parcourt la matrice par blocs contigus : produit des couples (ids, vecteurs)
+        des lignes occupées (reconstruction d'un index FAISS sans relire SQLite).
+        """
+        for start in range(0, self.capacity, self.search_chunk):
+            ids = self.ids[start : start + self.search_chunk]
+            used = ids >= 0
+            if used.any():
+                yield ids[used], np.asarray(
+                    self.rows[start : start + len(ids)][used], dtype="float32"
+                )
+
+    def search(self, query: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Retourne (scores, ids) des k vecteurs de plus grand produit scalaire
+        avec la requête, par un produit matrice-vecteur par bloc de lignes.
+        Les ids à -1 correspondent à des places vides (moins de k vecteurs).
+        """
+        query = np.asarray(query, dtype="float32").reshape(-1)
+        best_scores = np.full(k, -np.inf, dtype="float32")
+        best_ids = np.full(k, -1, dtype="int64")
+        for start in range(0, self.capacity, self.search_chunk):
+            ids = self.ids[start : start + self.search_chunk]
+            scores = self.rows[start : start + len(ids)] @ query
+            scores[ids < 0] = -np.inf
+            scores = np.concatenate([best_scores, scores])
+            cand = np.concatenate([best_ids, ids])
+            top = np.argpartition(-scores, k - 1)[:k]
+            best_scores, best_ids = scores[top], cand[top]
+        order = np.argsort(-best_scores, kind="stable")
+        best_scores, best_ids = best_scores[order], best_ids[order]
+        best_ids[np.isneginf(best_scores)] = -1
+        return best_scores, best_ids
+
+    def should_save(self) -> bool:
+        return self.pending >= self.save_every
+
+    def save(self):
+        """
+        Écrit les lignes modifiées sur disque (après une reconstruction, le fichier
+        temporaire remplace l'ancien), puis la table des ids de façon atomique
+        (fichier temporaire + renommage).
+        """
+        self._writable()
+        if self.rows is not None:
+            self.rows.flush()
+        if self.file != self.path:
+            # la projection en cours suit le fichier renommé
+            os.replace(self.file, self.path)
+            self.file = self.path
+        tmp = self.ids_path.with_name(self.ids_path.name + ".tmp")
+        with open(tmp, "wb") as f:
+            np.save(f, self.ids)
+        os.replace(tmp, self.ids_path)
+        self.pending = 0
@@ -1,31 +1,63 @@
-# from sentence_transformers import SentenceTransformer
-import numpy as np, sqlite3
+import logging, math, numpy as np, sqlite3
 from pathlib import Path
 from threading import Lock
 
-MODEL_NAME = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
-SPACE = "sbert"
+from .database import DatabaseService
+from .embedding_cache import EmbeddingCache
+from .embedding_model import EmbeddingModel
+from .logs import log
+from .vector_matrix import VectorMatrix
+from .write_batcher import WriteOp
 
+# nombre de lignes lues par lot lors de la reconstruction de l'index
+REBUILD_BATCH = 10000
 
-class EmbeddingModel:
+# nombre maximal de paramètres par requête "IN (...)"
+IN_BATCH = 500
 
-    def __init__(self, model: str, model_name: str = MODEL_NAME, space: str = SPACE):
-        self.model_name = model_name
-        self.space = space
+# index FAISS approché en plus de la matrice (cf. faiss.index_factory), qui doit
+# supporter la suppression de vecteurs (remove_ids, donc pas HNSW), par ex.
+#   "IVF1024,SQ8"    listes inversées, int8 (1 octet par dimension, sous-linéaire)
+#   "IDMap2,SQ8"     quantification scalaire int8, recherche exhaustive
+#   "IDMap2,PQ48"    quantification par produit (48 octets par vecteur)
+# "auto" : recherche exacte sur la matrice projetée en mémoire sous ANN_AUTO_MIN_VECTORS
+# vecteurs, index IVF au-delà (cf. auto_factory) ; None : toujours exacte
+# (cf. ann_report.py pour comparer rappel et mémoire sur ses propres vecteurs)
+ANN_FACTORY = "auto"
 
-        # self.model = SentenceTransformer(model_name)
-        self.model = model
+# nombre de vecteurs à partir duquel "auto" construit un index IVF
+# (choisi à l'ouverture et à chaque reconstruction de l'index)
+ANN_AUTO_MIN_VECTORS = 50000
 
-    def getDimension(self):
-        return 3
+# vecteurs tirés de la matrice pour entraîner l'index : au moins ANN_TRAIN_SIZE,
+# et ANN_TRAIN_PER_LIST par liste inversée (IVF)
+ANN_TRAIN_SIZE = 50000
+ANN_TRAIN_PER_LIST = 64
 
-    def encode(self, text: str, normalize_embeddings=True):
-        return np.array([[0.3, 0.3, 0.3]])
+# candidats demandés à l'index FAISS, en multiple de k, puis reclassés
+# exactement avec la matrice float32 (1 : pas de reclassement)
+RERANK = 4
 
-    def embed_text(self, text: str) -> np.ndarray:
-        # avec normalisation L2
-        v = self.model.encode(text, normalize_embeddings=True)
-        return v.astype("float32")
+# cache des vecteurs par texte encodé (LRU en mémoire + table `embedding_cache`)
+EMBEDDING_CACHE = True
+
+# insertion / mise à jour du vecteur d'un fichier (repéré par son chemin dans `files`)
+UPSERT_SQL = """INSERT INTO vectors(fileId, space, dim, vec)
+                SELECT id, ?, ?, ? FROM files WHERE path=?
+                ON CONFLICT(fileId, space) DO UPDATE SET
+                  vec=excluded.vec,
+                  dim=excluded.dim;"""
+
+
+def auto_factory(count: int) -> str | None:
+    """
+    Fabrique FAISS de "auto" pour `count` vecteurs : None (recherche exacte) sous
+    ANN_AUTO_MIN_VECTORS, sinon IVF à environ √count listes inversées (puissance de 2)
+    et vecteurs en int8, dont les candidats sont reclassés avec la matrice float32.
+    """
+    if count < ANN_AUTO_MIN_VECTORS:
+        return None
+    return f"IVF{1 << round(math.log2(math.sqrt(count)))},SQ8"
 
 
 def to_blob(vec: np.ndarray) -> bytes:
@@ -37,93 +69,474 @@ def from_blob(b: bytes, dim: int) -> np.ndarray:
 
 
 class VectorStoreService:
+    """
+    Singleton qui stocke les vecteurs d'embedding dans la base de DatabaseService
+    (table `vectors`, source de vérité, qui référence `files.id`) et maintient une copie
+    contiguë float32 projetée en mémoire (VectorMatrix) pour la recherche de plus proches
+    voisins, plus un index FAISS approché optionnel.
+    Les écritures passent par le thread d'écriture de la base : un fichier et son vecteur
+    sont validés dans la même transaction (cf. `DatabaseService.transaction`). Supprimer
+    ou déplacer un fichier n'a rien à faire ici : le vecteur suit `files.id`
+    (ON DELETE CASCADE). La matrice et l'index sont mis à jour après chaque validation
+    pour les fichiers touchés.
+    Les recherches passent par une connexion en lecture seule propre à chaque thread.
+    Un processus qui ne fait que chercher (`readonly`) projette la matrice telle que
+    sauvegardée, sans jamais l'écrire ni la reconstruire (l'indexation peut tourner
+    en parallèle dans un autre processus).
+    Usage:
+        store = VectorStoreService.get_instance(db)
+        with db.transaction():
+            db.indexPath(path, metadata, description)
+            store.upsertPath(path, description)
+        store.search("facture électricité", k=10)
+    """
 
     _instance = None
     # pour thread-safety
     _lock = Lock()
 
     def __init__(
-        self, db_path: str = "app.db", model: EmbeddingModel = EmbeddingModel()
+        self,
+        db: DatabaseService,
+        model: EmbeddingModel | None = None,
+        index_path: str | None = None,
+        ann_factory: str | None = ANN_FACTORY,
+        rerank: int = RERANK,
+        embedding_cache: bool = EMBEDDING_CACHE,
+        readonly: bool = False,
     ):
         if hasattr(self, "_initialized") and self._initialized:
             return
-        self.db_path = Path(db_path)
-        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
-        self.conn.execute(
-            "PRAGMA journal_mode=WAL;"
-        )  # mode WAL = perfs + accès concurrent
+        self.db = db
+        self.db_path = db.db_path
+        self.readonly = readonly
+
+        # connexions de la base partagée, dont on suit les lots d'écriture
+        self.pool = db.pool
 
         # chargement du modele d'embeding
-        self.model = model
+        self.model = model or EmbeddingModel(None)
         self.space = self.model.space
         self.dim = self.model.getDimension()
 
+        # un texte déjà encodé par ce modèle ne repasse pas par le modèle
+        self.cache = (
+            EmbeddingCache(self.pool, self.model.model_name, self.space, self.dim)
+            if embedding_cache and not readonly
+            else None
+        )
+
+        # matrice des vecteurs et index FAISS optionnel,
+        # reconstruits depuis le miroir SQLite s'ils ne sont pas à jour
+        self.indexLock = Lock()
+        self.matrix = VectorMatrix(
+            f"{self.db_path}.{self.space}.f32", self.dim, readonly=readonly
+        )
+        # index FAISS choisi à l'ouverture (selon le nombre de vecteurs pour "auto")
+        self.index = None
+        self.annFactory = ann_factory
+        self.indexPath = index_path or f"{self.db_path}.{self.space}.faiss"
+        self.rerank = rerank
+        self.dirty = False
+        if readonly:
+            self._openIndex()
+            self._initialized = True
+            return
+
+        # ancienne table `vectors` repérée par chemin dans la même base : reprise plus bas
+        columns = {row[1] for row in self.query("PRAGMA table_info(vectors);")}
+        legacy = "path" in columns
+        if legacy:
+            self.execute("ALTER TABLE vectors RENAME TO vectors_legacy;")
+
         # initialisation de la base de données
         self.execute(
             """
             -- vecteurs (un espace par type: 'sbert', 'clip', ...)
             CREATE TABLE IF NOT EXISTS vectors(
               id INTEGER PRIMARY KEY,
-              path TEXT,
+              fileId INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
               space TEXT NOT NULL,         -- 'sbert'
               dim INTEGER NOT NULL,
               vec BLOB NOT NULL,           -- float32[] en BLOB
-              UNIQUE(path, space)
+              UNIQUE(fileId, space)
             );
             """
         )
+        self.execute(
+            """
+            -- état de la matrice/index FAISS de chaque espace (dirty = modifié depuis la dernière sauvegarde)
+            CREATE TABLE IF NOT EXISTS vector_index_state(
+              space TEXT PRIMARY KEY,
+              dirty INTEGER NOT NULL
+            );
+            """
+        )
+
+        self.pool.listen(self._beforeFlush, self._afterFlush)
+        if legacy:
+            self._importVectors("main.vectors_legacy")
+            self.execute("DROP TABLE vectors_legacy;")
+            self.rebuildIndex()
+        else:
+            self._syncIndex()
 
         self._initialized = True
 
     @classmethod
-    def get_instance(cls, db_path: str = "app.db"):
+    def get_instance(
+        cls,
+        db: DatabaseService,
+        readonly: bool = False,
+        ann_factory: str | None = ANN_FACTORY,
+    ):
         """
-        Retourne l'unique instance de DatabaseService.
-        La crée si elle n'existe pas encore.
+        Retourne l'unique instance de VectorStoreService.
+        La crée si elle n'existe pas encore (en lecture seule si `readonly`).
         """
         with cls._lock:
             if cls._instance is None:
-                cls._instance = cls(db_path)
+                cls._instance = cls(db, readonly=readonly, ann_factory=ann_factory)
             return cls._instance
 
+    def importLegacy(self, path: str) -> int:
+        """
+        Reprend les vecteurs d'une ancienne base séparée (vector_store.db, vecteurs
+        repérés par leur chemin) pour les fichiers présents dans `files`, puis
+        reconstruit la matrice. Retourne le nombre de vecteurs repris.
+        """
+        self.flush()
+        before = self.query("SELECT COUNT(*) FROM vectors")[0][0]
+        self.execute("ATTACH DATABASE ? AS legacy;", (str(path),))
+        try:
+            self._importVectors("legacy.vectors")
+        finally:
+            self.execute("DETACH DATABASE legacy;")
+        self.rebuildIndex()
+        return self.query("SELECT COUNT(*) FROM vectors")[0][0] - before
+
+    def _importVectors(self, table: str):
+        self.execute(
+            f"""INSERT OR IGNORE INTO vectors(fileId, space, dim, vec)
+                SELECT f.id, v.space, v.dim, v.vec
+                FROM {table} v JOIN files f ON f.path = v.path;"""
+        )
+
     def execute(self, sql: str, params: tuple = ()):
         """
-        Exécute une requête SQL avec commit automatique.
-        Retourne le curseur.
+        Exécute une requête SQL d'écriture et attend sa validation.
         """
-        cur = self.conn.cursor()
-        cur.execute(sql, params)
-        self.conn.commit()
-        return cur
+        self.pool.execute(sql, params)
 
-    def upsertPath(self, path: Path, text: str):
-        vec = self.model.embed_text(text).reshape(1, -1)
+    def query(self, sql: str, params: tuple = ()):
+        """
+        Exécute une requête SQL SELECT et retourne toutes les lignes.
+        """
+        return self.pool.query(sql, params)
 
-        # 1) miroir SQLite
+    def flush(self):
+        """
+        Valide immédiatement les écritures différées (et met à jour l'index FAISS).
+        """
+        self.pool.flush()
+
+    # -------------------- INDEX FAISS --------------------
+
+    def _setDirty(self, dirty: bool):
+        """
+        Marque l'index comme (non) synchronisé avec le miroir SQLite.
+        Un index marqué dirty au démarrage est reconstruit.
+        """
+        if self.dirty == dirty:
+            return
         self.execute(
-            """INSERT INTO vectors(path, space, dim, vec)
-               VALUES(?,?,?,?)
-               ON CONFLICT(path, space) DO UPDATE SET
-                 vec=excluded.vec,
-                 dim=excluded.dim;""",
-            (str(path), self.space, self.dim, to_blob(vec[0])),
+            """INSERT INTO vector_index_state(space, dirty) VALUES(?,?)
+               ON CONFLICT(space) DO UPDATE SET dirty=excluded.dirty;""",
+            (self.space, int(dirty)),
         )
+        self.dirty = dirty
+
+    def _indexes(self) -> list:
+        return [self.matrix] + ([self.index] if self.index else [])
+
+    def _newAnnIndex(self, count: int):
+        """
+        Index FAISS vide de la fabrique configurée pour `count` vecteurs,
+        None pour une recherche exacte sur la matrice.
+        """
+        factory = auto_factory(count) if self.annFactory == "auto" else self.annFactory
+        if not factory:
+            return None
+        # faiss n'est importé que si un index approché est utilisé
+        from .ann_index import AnnIndex
+
+        return AnnIndex(self.indexPath, self.dim, factory=factory)
 
-    def deletePath(self, path: Path):
-        # DB
-        cur = self.execute(
-            "SELECT id FROM vectors WHERE path=? AND space=?",
-            (str(path), self.space),
+    def _syncIndex(self):
+        """
+        Projette la matrice persistée (et charge l'index FAISS) et les reconstruit
+        s'ils sont absents, s'ils n'ont pas été sauvegardés proprement
+        ou s'ils divergent du miroir SQLite.
+        """
+        rows = self.query(
+            "SELECT dirty FROM vector_index_state WHERE space=?", (self.space,)
         )
-        row = cur.fetchone()
-        if not row:
+        self.dirty = bool(rows and rows[0][0])
+        count = self.query("SELECT COUNT(*) FROM vectors WHERE space=?", (self.space,))[
+            0
+        ][0]
+
+        with self.indexLock:
+            self.index = self._newAnnIndex(count)
+            loaded = all(ix.load() for ix in self._indexes())
+            if (
+                loaded
+                and not self.dirty
+                and all(ix.ntotal == count for ix in self._indexes())
+            ):
+                return
+        log("INDEX-REBUILD", logging.WARNING, space=self.space, vectors=count)
+        self.rebuildIndex()
+
+    def _openIndex(self):
+        """
+        Lecture seule : projette la matrice et charge l'index FAISS tels que sauvegardés
+        par le processus d'indexation, même s'il les modifie encore (dirty).
+        Sans matrice sauvegardée, les recherches par vecteur ne trouvent rien.
+        """
+        with self.indexLock:
+            if not self.matrix.load():
+                log(
+                    "INDEX-MISSING",
+                    logging.WARNING,
+                    space=self.space,
+                    path=self.matrix.path,
+                )
+            self.index = self._newAnnIndex(self.matrix.ntotal)
+            if self.index and (
+                not self.index.load() or self.index.ntotal != self.matrix.ntotal
+            ):
+                # index absent ou d'une autre sauvegarde : recherche exacte sur la matrice
+                self.index = None
+
+    def rebuildIndex(self):
+        """
+        Reconstruit entièrement la matrice depuis la table `vectors`,
+        puis l'index FAISS depuis la matrice (sans redécoder les BLOB).
+        """
+        if self.readonly:
+            raise RuntimeError(
+                "VectorStoreService en lecture seule : pas de reconstruction"
+            )
+        with self.indexLock:
+            cur = self.pool.reader().cursor()
+            self.matrix.reset()
+            cur.execute(
+                "SELECT id, vec FROM vectors WHERE space=? AND dim=? ORDER BY id",
+                (self.space, self.dim),
+            )
+            while True:
+                rows = cur.fetchmany(REBUILD_BATCH)
+                if not rows:
+                    break
+                ids = np.fromiter((r[0] for r in rows), dtype="int64", count=len(rows))
+                vecs = np.stack([from_blob(r[1], self.dim) for r in rows])
+                self.matrix.add(ids, vecs)
+            self.matrix.save()
+
+            # fabrique choisie à nouveau ("auto" : IVF dimensionné pour la matrice)
+            self.index = self._newAnnIndex(self.matrix.ntotal)
+            if self.index:
+                if not self.index.index.is_trained and self.matrix.ntotal:
+                    # échantillon de la matrice : l'entraînement ne la charge pas en entier
+                    n = max(ANN_TRAIN_SIZE, ANN_TRAIN_PER_LIST * self.index.nlist)
+                    self.index.train(self.matrix.sample(n)[1])
+                for ids, vecs in self.matrix.iter_chunks():
+                    self.index.add(ids, vecs)
+                self.index.save()
+        self._markClean()
+
+    def saveIndex(self):
+        """
+        Sauvegarde la matrice et l'index FAISS sur disque (à appeler à l'arrêt).
+        """
+        self.flush()
+        self._saveIndexFile()
+
+    def _saveIndexFile(self):
+        with self.indexLock:
+            for ix in self._indexes():
+                ix.save()
+        self._markClean()
+
+    def _markClean(self):
+        # une mise à jour appliquée depuis la sauvegarde garde l'index dirty
+        if all(ix.pending == 0 for ix in self._indexes()):
+            self._setDirty(False)
+
+    def _updateIndex(self, remove: list[int], add: list[tuple[int, np.ndarray]] = ()):
+        self._setDirty(True)
+        with self.indexLock:
+            for ix in self._indexes():
+                ix.remove(np.array(remove, dtype="int64"))
+                if add:
+                    ix.add(
+                        np.array([i for i, _ in add], dtype="int64"),
+                        np.stack([v for _, v in add]),
+                    )
+            save = any(ix.should_save() for ix in self._indexes())
+        if save:
+            self._saveIndexFile()
+
+    def _selectByPaths(self, cur: sqlite3.Cursor, columns: str, paths: list[str]):
+        rows = []
+        for i in range(0, len(paths), IN_BATCH):
+            chunk = paths[i : i + IN_BATCH]
+            marks = ",".join("?" * len(chunk))
+            cur.execute(
+                f"""SELECT {columns} FROM files f JOIN vectors v ON v.fileId = f.id
+                    WHERE f.path IN ({marks}) AND v.space=?""",
+                (*chunk, self.space),
+            )
+            rows.extend(cur.fetchall())
+        return rows
+
+    def _selectByRanges(self, cur: sqlite3.Cursor, ranges: set[tuple[str, str]]):
+        ids = []
+        for lo, hi in ranges:
+            cur.execute(
+                """SELECT v.id FROM files f JOIN vectors v ON v.fileId = f.id
+                   WHERE f.path > ? AND f.path < ? AND v.space=?""",
+                (lo, hi, self.space),
+            )
+            ids.extend(id for (id,) in cur.fetchall())
+        return ids
+
+    def _existingIds(self, cur: sqlite3.Cursor, ids: list[int]) -> set[int]:
+        found = set()
+        for i in range(0, len(ids), IN_BATCH):
+            chunk = ids[i : i + IN_BATCH]
+            marks = ",".join("?" * len(chunk))
+            cur.execute(f"SELECT id FROM vectors WHERE id IN ({marks})", chunk)
+            found.update(id for (id,) in cur.fetchall())
+        return found
+
+    def _beforeFlush(self, cur: sqlite3.Cursor, ops: list[WriteOp]):
+        """
+        Relève les identifiants des chemins et des dossiers touchés avant l'écriture du lot.
+        """
+        paths = list({p for op in ops for p in op.paths})
+        ranges = {r for op in ops for r in op.ranges}
+        if not paths and not ranges:
+            return None
+        return (
+            paths,
+            [id for (id,) in self._selectByPaths(cur, "v.id", paths)],
+            self._selectByRanges(cur, ranges),
+        )
+
+    def _afterFlush(self, cur: sqlite3.Cursor, ops: list[WriteOp], state):
+        """
+        Répercute sur la matrice et l'index FAISS l'état validé des fichiers touchés
+        par le lot : les vecteurs écrits sont (ré)insérés, ceux qui ont disparu
+        (fichier ou dossier supprimé, fichier remplacé à la destination d'un
+        déplacement) sont retirés. Un déplacement garde ses identifiants.
+        """
+        if state is None:
             return
+        paths, old_ids, range_ids = state
+        written = list({p for op in ops if op.sql == UPSERT_SQL for p in op.paths})
+        rows = self._selectByPaths(cur, "v.id, v.vec", written)
+        touched = list(set(old_ids) | set(range_ids))
+        remove = set(touched) - self._existingIds(cur, touched)
+        remove |= {id for id, _ in rows}
+        if not remove and not rows:
+            return
+        self._updateIndex(
+            list(remove),
+            [(id, from_blob(vec, self.dim)) for id, vec in rows],
+        )
+
+    # -------------------- MISE A JOUR --------------------
+
+    def embedTexts(self, texts: list[str]) -> np.ndarray:
+        """
+        Encode un lot de descriptions : seuls les textes absents du cache
+        passent par le modèle (en un seul appel), puis sont mis en cache.
+        Retourne une matrice (len(texts), dim).
+        """
+        if self.cache is None:
+            return self.model.embed_texts(texts)
+        cached = self.cache.getMany(texts)
+        todo = {}
+        for i, vec in enumerate(cached):
+            if vec is None:
+                todo.setdefault(texts[i], []).append(i)
+        out = np.empty((len(texts), self.dim), dtype="float32")
+        if todo:
+            computed = self.model.embed_texts(list(todo))
+            self.cache.putMany(list(todo), computed)
+            for rows, vec in zip(todo.values(), computed):
+                out[rows] = vec
+        for i, vec in enumerate(cached):
+            if vec is not None:
+                out[i] = vec
+        return out
+
+    def upsertPath(self, path: Path, text: str):
+        self.upsertVectors([(path, self.embedTexts([text])[0])])
+
+    def upsertVectors(self, items: list[tuple[Path, np.ndarray]]):
+        """
+        Insère ou met à jour un lot de vecteurs déjà calculés (écriture différée).
+        Le fichier doit être dans `files` au plus tard dans la même transaction.
+        """
+        for path, vec in items:
+            self.pool.submit(
+                UPSERT_SQL,
+                (self.space, self.dim, to_blob(vec), str(path)),
+                (str(path),),
+            )
+
+    def getVector(self, path: Path) -> np.ndarray | None:
+        """
+        Retourne le vecteur stocké d'un fichier dans l'espace du modèle, ou None.
+        """
+        rows = self.query(
+            """SELECT v.vec FROM vectors v JOIN files f ON f.id = v.fileId
+               WHERE f.path = ? AND v.space = ? AND v.dim = ?;""",
+            (str(path), self.space, self.dim),
+        )
+        return from_blob(rows[0][0], self.dim) if rows else None
 
-        id = int(row[0])
-        self.execute("DELETE FROM vectors WHERE id=?", (id,))
+    # -------------------- RECHERCHE --------------------
 
-    def movePath(self, old: Path, new: Path):
+    def search(self, query: str, k: int = 10) -> list[tuple[str, float]]:
         """
-        Met à jour le chemin d'un fichier (cas de renommage/déplacement).
+        Retourne les k fichiers les plus proches sémantiquement de la requête,
+        sous la forme [(chemin, score)] triée par score décroissant.
+        Avec un index FAISS (compressé), ses `rerank * k` premiers candidats
+        sont reclassés avec les vecteurs float32 exacts de la matrice.
         """
-        self.execute("UPDATE vectors SET path=? WHERE path=?;", (str(new), str(old)))
+        vec = self.model.embed_text(query).reshape(-1)
+        with self.indexLock:
+            if self.index is None:
+                scores, ids = self.matrix.search(vec, k)
+            elif self.rerank > 1:
+                _, ids = self.index.search(vec, k * self.rerank)
+                scores, ids = self.matrix.rerank(vec, ids, k)
+            else:
+                scores, ids = self.index.search(vec, k)
+
+        hits = [(int(i), float(s)) for i, s in zip(ids, scores) if i >= 0]
+        if not hits:
+            return []
+        marks = ",".join("?" * len(hits))
+        paths = dict(
+            self.query(
+                f"""SELECT v.id, f.path FROM vectors v JOIN files f ON f.id = v.fileId
+                    WHERE v.id IN ({marks})""",
+                tuple(i for i, _ in hits),
+            )
+        )
+        return [(paths[i], s) for i, s in hits if i in paths]
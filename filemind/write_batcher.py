@@ -0,0 +1,248 @@
+import logging, sqlite3, threading, time
+from itertools import groupby
+from typing import Any, Callable, NamedTuple
+
+from .logs import log
+from .metrics import metrics
+
+# délai maximal (en millisecondes) entre une écriture et sa validation
+FLUSH_MS = 200
+
+# nombre d'opérations en attente qui déclenche une validation immédiate
+MAX_OPS = 1000
+
+# durée d'un lot d'écriture (écouteurs, requêtes et validation), par thread d'écriture
+COMMIT_SECONDS = metrics.histogram(
+    "filemind_db_commit_seconds",
+    "Durée d'un lot d'écriture SQLite (requêtes + validation), par thread d'écriture",
+)
+
+# opérations écrites, par thread d'écriture
+COMMIT_OPS = metrics.counter(
+    "filemind_db_ops_total", "Opérations SQLite écrites, par thread d'écriture"
+)
+
+
+class WriteOp(NamedTuple):
+    """
+    Écriture différée : requête, paramètres, chemins touchés et intervalles
+    de chemins [lo, hi) touchés par une opération de dossier (pour les écouteurs),
+    et numéro du bloc `submitMany` dont elle fait partie (0 : écriture isolée).
+    """
+
+    sql: str
+    params: tuple
+    paths: tuple = ()
+    ranges: tuple = ()
+    group: int = 0
+
+
+class WriteBatcher(threading.Thread):
+    """
+    Thread d'écriture unique : il possède la connexion SQLite d'écriture et sérialise
+    toutes les écritures soumises par les autres threads via sa file d'attente.
+    Les écritures sont validées ensemble en une seule transaction, toutes les
+    `flush_ms` millisecondes ou dès que `max_ops` opérations sont en attente.
+    Les opérations consécutives de même requête passent par un seul `executemany`,
+    qui réutilise la requête préparée du cache de la connexion.
+
+    `before_flush(cur, ops)` est appelé dans la transaction avant les écritures,
+    `after_flush(cur, ops, state)` après la validation avec ce qu'a retourné `before_flush`.
+    Les deux sont exécutés dans le thread d'écriture.
+    """
+
+    def __init__(
+        self,
+        conn: sqlite3.Connection,
+        flush_ms: int = FLUSH_MS,
+        max_ops: int = MAX_OPS,
+        before_flush: Callable[[sqlite3.Cursor, list[WriteOp]], Any] | None = None,
+        after_flush: Callable[[sqlite3.Cursor, list[WriteOp], Any], None] | None = None,
+        *a,
+        **kw,
+    ):
+        kw.setdefault("daemon", True)
+        super().__init__(*a, **kw)
+        self.conn = conn
+        self.flush_interval = flush_ms / 1000
+        self.max_ops = max_ops
+        self.before_flush = before_flush
+        self.after_flush = after_flush
+
+        self.cond = threading.Condition()
+        self.pending: list[WriteOp] = []
+        # instant de la plus ancienne opération en attente
+        self.oldest = 0.0
+        # nombre d'opérations soumises / traitées (pour attendre une validation)
+        self.submitted = 0
+        self.committed = 0
+        self.flushRequested = False
+        self.stopped = False
+        # numéro du dernier bloc soumis par submitMany
+        self.groups = 0
+
+        # statistiques
+        self.flushes = 0
+        self.ops = 0
+        self.flushSeconds = 0.0
+
+    def submit(
+        self, sql: str, params: tuple = (), paths: tuple = (), ranges: tuple = ()
+    ):
+        with self.cond:
+            if not self.pending:
+                # réveille le thread pour qu'il arme le délai de validation
+                self.oldest = time.monotonic()
+                self.cond.notify_all()
+            self.pending.append(WriteOp(sql, params, paths, ranges))
+            self.submitted += 1
+            if len(self.pending) >= self.max_ops:
+                self.cond.notify_all()
+
+    def submitMany(self, ops: list[WriteOp]):
+        """
+        Soumet plusieurs écritures d'un bloc : elles sont validées dans la même transaction,
+        y compris quand le lot échoue et que ses blocs sont rejoués séparément.
+        """
+        if not ops:
+            return
+        with self.cond:
+            if not self.pending:
+                self.oldest = time.monotonic()
+            self.groups += 1
+            self.pending.extend(op._replace(group=self.groups) for op in ops)
+            self.submitted += len(ops)
+            self.cond.notify_all()
+
+    def execute(self, sql: str, params: tuple = ()):
+        """
+        Écriture immédiate (schéma, état...) : attend sa validation.
+        """
+        if threading.current_thread() is self:
+            self.conn.execute(sql, params)
+            self.conn.commit()
+            return
+        self.submit(sql, params)
+        self.flush()
+
+    def flush(self):
+        """
+        Demande la validation immédiate des écritures en attente et l'attend
+        (arrêt, tests, lecture de ses propres écritures...).
+        """
+        if threading.current_thread() is self or not self.is_alive():
+            # thread d'écriture lui-même, pas encore démarré ou arrêté : on écrit directement
+            self._drain()
+            return
+        with self.cond:
+            target = self.submitted
+            self.flushRequested = True
+            self.cond.notify_all()
+            while self.committed < target and self.is_alive():
+                self.cond.wait(0.1)
+
+    def stop(self):
+        """
+        Valide les écritures en attente et arrête le thread.
+        """
+        with self.cond:
+            self.stopped = True
+            self.cond.notify_all()
+        if self.is_alive() and threading.current_thread() is not self:
+            self.join()
+        self._drain()
+
+    def _drain(self):
+        with self.cond:
+            ops, self.pending = self.pending, []
+            self.flushRequested = False
+        try:
+            if ops:
+                self._write(ops)
+        finally:
+            with self.cond:
+                self.committed += len(ops)
+                self.cond.notify_all()
+
+    @staticmethod
+    def _units(ops: list[WriteOp]) -> list[list[WriteOp]]:
+        """
+        Découpe un lot en unités rejouables : une écriture isolée,
+        ou toutes les écritures consécutives d'un même bloc de submitMany.
+        """
+        units = []
+        for op in ops:
+            if op.group and units and units[-1][0].group == op.group:
+                units[-1].append(op)
+            else:
+                units.append([op])
+        return units
+
+    def _write(self, ops: list[WriteOp]):
+        t0 = time.monotonic()
+        cur = self.conn.cursor()
+        before_flush, after_flush = self.before_flush, self.after_flush
+        try:
+            state = before_flush(cur, ops) if before_flush else None
+            for sql, group in groupby(ops, key=lambda op: op.sql):
+                group = list(group)
+                if len(group) == 1:
+                    cur.execute(sql, group[0].params)
+                else:
+                    cur.executemany(sql, [op.params for op in group])
+            self.conn.commit()
+        except sqlite3.Error as e:
+            # on isole le bloc fautif : les autres sont rejoués un par un, chaque
+            # bloc de submitMany (ex. fichier + vecteur) restant validé ou annulé en entier
+            self.conn.rollback()
+            log("ERROR-FLUSH", logging.ERROR, ops=len(ops), error=repr(e))
+            state = before_flush(cur, ops) if before_flush else None
+            for unit in self._units(ops):
+                try:
+                    for op in unit:
+                        cur.execute(op.sql, op.params)
+                    self.conn.commit()
+                except sqlite3.Error as e:
+                    self.conn.rollback()
+                    op = unit[0]
+                    log(
+                        "ERROR-WRITE",
+                        logging.ERROR,
+                        statement=op.sql.split()[0],
+                        paths=list(op.paths),
+                        ops=len(unit),
+                        error=repr(e),
+                    )
+
+        if after_flush:
+            after_flush(cur, ops, state)
+
+        elapsed = time.monotonic() - t0
+        self.flushes += 1
+        self.ops += len(ops)
+        self.flushSeconds += elapsed
+        COMMIT_SECONDS.observe(elapsed, writer=self.name)
+        COMMIT_OPS.inc(len(ops), writer=self.name)
+
+    def run(self):
+        while True:
+            with self.cond:
+                while not self.stopped:
+                    if self.pending:
+                        wait = self.oldest + self.flush_interval - time.monotonic()
+                        if (
+                            wait <= 0
+                            or self.flushRequested
+                            or len(self.pending) >= self.max_ops
+                        ):
+                            break
+                        self.cond.wait(wait)
+                    else:
+                        self.flushRequested = False
+                        self.cond.wait()
+                if self.stopped:
+                    return
+            try:
+                self._drain()
+            except Exception as e:
+                log("ERROR-FLUSH", logging.ERROR, error=repr(e))
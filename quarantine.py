@@ -0,0 +1,47 @@
+import argparse, time
+
+from filemind.config import DB_PATH
+from filemind.database import DatabaseService
+from filemind.quarantine import QuarantineService
+
+
+def when(ts: int) -> str:
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(ts))
+
+
+# -------------------- FICHIERS EN QUARANTAINE --------------------
+def main():
+    parser = argparse.ArgumentParser(
+        description="Liste les fichiers dont l'extraction échoue (quarantaine FileMind)."
+    )
+    parser.add_argument("-n", type=int, default=100, help="nombre de fichiers listés")
+    parser.add_argument(
+        "--release",
+        nargs="+",
+        metavar="PATH",
+        help="sort ces fichiers de quarantaine (réessayés au prochain événement ou démarrage)",
+    )
+    parser.add_argument(
+        "--release-all", action="store_true", help="vide la quarantaine"
+    )
+    args = parser.parse_args()
+
+    db = DatabaseService.get_instance(db_path=DB_PATH)
+    quarantine = QuarantineService.get_instance(db)
+
+    if args.release_all:
+        quarantine.releaseAll()
+    for path in args.release or ():
+        quarantine.release(path)
+    db.flush()
+
+    print("[QUARANTINE]", quarantine.count())
+    for entry in quarantine.list(limit=args.n):
+        print(
+            f"{entry.attempts:>3}x  retry={when(entry.retryAt)}  "
+            f"last={when(entry.lastFailedAt)}  {entry.path}\n      {entry.reason}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+import argparse
+
+from filemind.config import DB_PATH
+from filemind.database import DatabaseService
+from filemind.hybrid_search import HybridSearch
+from filemind.vector_store import VectorStoreService
+
+
+# -------------------- RECHERCHE EN LIGNE DE COMMANDE --------------------
+def main():
+    parser = argparse.ArgumentParser(
+        description="Recherche dans les fichiers indexés par FileMind."
+    )
+    parser.add_argument("query", nargs="?", help="texte de la requête")
+    parser.add_argument("-k", type=int, default=10, help="nombre de résultats")
+    parser.add_argument(
+        "--mode",
+        choices=("hybrid", "text", "vector"),
+        default="hybrid",
+        help="plein texte (BM25), sémantique (vecteurs) ou fusion des deux",
+    )
+    parser.add_argument(
+        "--rebuild",
+        action="store_true",
+        help="reconstruit la matrice et l'index FAISS depuis la base des vecteurs "
+        "(watcher arrêté)",
+    )
+    args = parser.parse_args()
+
+    db = DatabaseService.get_instance(db_path=DB_PATH)
+    # recherche seule : matrice projetée telle que sauvegardée, jamais reconstruite
+    # (l'indexation peut tourner en même temps)
+    vector_store = VectorStoreService.get_instance(db, readonly=not args.rebuild)
+
+    if args.rebuild:
+        vector_store.rebuildIndex()
+        print("[REBUILT]", vector_store.matrix.ntotal)
+
+    if args.query:
+        if args.mode == "text":
+            hits = db.searchText(args.query, k=args.k)
+        elif args.mode == "vector":
+            hits = vector_store.search(args.query, k=args.k)
+        else:
+            hits = HybridSearch(db, vector_store).search(args.query, k=args.k)
+        for path, score in hits:
+            print(f"{score:.4f}\t{path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,15 @@
+from pathlib import Path
+
+import pytest
+
+from filemind.database import DatabaseService
+
+
+@pytest.fixture
+def db(tmp_path: Path):
+    """
+    Base neuve dans un dossier temporaire (hors singleton).
+    """
+    service = DatabaseService(str(tmp_path / "app.db"))
+    yield service
+    service.close()
@@ -0,0 +1,21 @@
+from filemind.database import DatabaseService
+
+
+def add_files(db: DatabaseService, *paths, size: int = 1, description: str = "x"):
+    """
+    Insère directement des fichiers indexés dans `files` (empreinte factice).
+    """
+    for n, path in enumerate(paths):
+        db.execute(
+            """INSERT INTO files(path, description, size, mtimeNs, inode)
+               VALUES(?,?,?,?,?);""",
+            (str(path), description, size, 1, n + 1),
+        )
+
+
+def indexed_paths(db: DatabaseService) -> list[str]:
+    """
+    Chemins de `files`, triés, après validation des écritures différées.
+    """
+    db.flush()
+    return [p for (p,) in db.query("SELECT path FROM files ORDER BY path;")]
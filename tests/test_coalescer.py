@@ -0,0 +1,119 @@
+from pathlib import Path
+
+from filemind.handler import EventCoalescer
+
+A, B, C = Path("/w/a.txt"), Path("/w/b.txt"), Path("/w/c.txt")
+
+
+def coalescer(**kw) -> tuple[EventCoalescer, list]:
+    # thread non démarré : rien n'est émis avant flush, sauf les barrières
+    emitted = []
+    return EventCoalescer(emitted.append, **kw), emitted
+
+
+def pushed(*events) -> list:
+    c, emitted = coalescer()
+    for kind, path, *extra in events:
+        c.push(kind, path, *extra)
+    c.flush()
+    return emitted
+
+
+# -------------------- _merge --------------------
+
+
+def test_created_then_modified_is_created():
+    assert pushed(("created", A), ("modified", A)) == [("created", A, {})]
+
+
+def test_deleted_then_created_is_created():
+    assert pushed(("deleted", A), ("created", A)) == [("created", A, {})]
+
+
+def test_modified_then_deleted_is_deleted():
+    assert pushed(("modified", A), ("deleted", A)) == [("deleted", A, {})]
+
+
+def test_moved_then_modified_reindexes():
+    assert pushed(("moved", B, {"src": A, "dst": B}), ("modified", B)) == [
+        ("moved", B, {"src": A, "dst": B, "reindex": True})
+    ]
+
+
+def test_moved_then_deleted_deletes_source():
+    assert pushed(("moved", B, {"src": A, "dst": B}), ("deleted", B)) == [
+        ("deleted", A, {}),
+        ("deleted", B, {}),
+    ]
+
+
+# -------------------- _push_move --------------------
+
+
+def test_chained_moves_collapse():
+    assert pushed(
+        ("moved", B, {"src": A, "dst": B}), ("moved", C, {"src": B, "dst": C})
+    ) == [("moved", C, {"src": A, "dst": C})]
+
+
+def test_move_of_created_file_indexes_destination():
+    assert pushed(("created", A), ("moved", B, {"src": A, "dst": B})) == [
+        ("deleted", A, {}),
+        ("created", B, {}),
+    ]
+
+
+def test_move_of_modified_file_reindexes():
+    assert pushed(("modified", A), ("moved", B, {"src": A, "dst": B})) == [
+        ("moved", B, {"src": A, "dst": B, "reindex": True})
+    ]
+
+
+def test_new_event_on_move_source_releases_the_move():
+    c, emitted = coalescer()
+    c.push("moved", B, {"src": A, "dst": B})
+    c.push("created", A)
+    # le déplacement part avant : il ne doit pas emporter le nouveau fichier
+    assert emitted == [("moved", B, {"src": A, "dst": B})]
+    c.flush()
+    assert emitted[1:] == [("created", A, {})]
+
+
+def test_full_table_emits_oldest():
+    c, emitted = coalescer(max_pending=2)
+    for path in (A, B, C):
+        c.push("modified", path)
+    assert emitted == [("modified", A, {})]
+
+
+# -------------------- push_dir --------------------
+
+
+def test_dir_move_reparents_pending_writes():
+    src, dst = Path("/w/src"), Path("/w/dst")
+    c, emitted = coalescer()
+    c.push("created", src / "x.txt")
+    c.push("deleted", src / "y.txt")
+    c.push("modified", A)
+    extra = {"src": src, "dst": dst, "directory": True}
+    c.push_dir("moved", dst, extra)
+    # opérations sous la source émises avant le déplacement du dossier
+    assert emitted == [("deleted", src / "y.txt", {}), ("moved", dst, extra)]
+    c.flush()
+    # création reportée sous la destination (en fin de file)
+    assert emitted[2:] == [("modified", A, {}), ("created", dst / "x.txt", {})]
+
+
+def test_dir_delete_is_a_barrier():
+    d = Path("/w/d")
+    c, emitted = coalescer()
+    c.push("modified", d / "x.txt")
+    c.push("moved", B, {"src": d / "y.txt", "dst": B})
+    c.push_dir("deleted", d, {"directory": True})
+    assert emitted == [
+        ("modified", d / "x.txt", {}),
+        ("moved", B, {"src": d / "y.txt", "dst": B}),
+        ("deleted", d, {"directory": True}),
+    ]
+    c.flush()
+    assert len(emitted) == 3
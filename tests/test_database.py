@@ -0,0 +1,48 @@
+from pathlib import Path
+
+from filemind.fingerprint import Fingerprint
+
+from .helpers import add_files, indexed_paths
+
+# "/r/ab" et "/r/a.txt" partagent le préfixe texte de "/r/a" sans être dessous
+TREE = ("/r/a/x.txt", "/r/a/b/y.txt", "/r/ab/z.txt", "/r/a.txt")
+
+
+def test_move_dir_rewrites_only_the_subtree(db):
+    add_files(db, *TREE)
+    db.moveDir(Path("/r/a"), Path("/r/c"))
+    assert indexed_paths(db) == [
+        "/r/a.txt",
+        "/r/ab/z.txt",
+        "/r/c/b/y.txt",
+        "/r/c/x.txt",
+    ]
+
+
+def test_move_dir_replaces_existing_destination(db):
+    add_files(db, "/r/a/x.txt", "/r/c/x.txt", "/r/c/keep.txt")
+    db.moveDir(Path("/r/a"), Path("/r/c"))
+    assert indexed_paths(db) == ["/r/c/keep.txt", "/r/c/x.txt"]
+    # la ligne déplacée (inode 1) a remplacé celle de la destination
+    assert db.query("SELECT inode FROM files WHERE path = '/r/c/x.txt';") == [(1,)]
+
+
+def test_delete_dir_keeps_siblings(db):
+    add_files(db, *TREE)
+    db.deleteDir(Path("/r/a"))
+    assert indexed_paths(db) == ["/r/a.txt", "/r/ab/z.txt"]
+
+
+def test_child_dirs(db):
+    add_files(db, *TREE, "/r/ab/deep/w.txt")
+    db.flush()
+    assert db.childDirs(Path("/r")) == ["a", "ab"]
+    assert db.childDirs(Path("/r/a")) == ["b"]
+    assert db.childDirs(Path("/r/a/b")) == []
+
+
+def test_dir_fingerprints_lists_direct_children_only(db):
+    add_files(db, *TREE, size=7)
+    db.flush()
+    assert db.dirFingerprints(Path("/r/a")) == [("/r/a/x.txt", Fingerprint(7, 1, 1))]
+    assert [p for p, _ in db.dirFingerprints(Path("/r"))] == ["/r/a.txt"]
@@ -0,0 +1,94 @@
+from pathlib import Path
+
+import pytest
+
+from filemind import duplicates
+from filemind.duplicates import DuplicateFinder, StagedHashes
+from filemind.fingerprint import content_hash, head_hash
+
+from .helpers import add_files
+
+
+def write(path: Path, data: bytes) -> Path:
+    path.write_bytes(data)
+    return path
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    """
+    Compte les lectures faites par `stage` (chemins hachés, par étape).
+    """
+    seen = {"head": [], "content": []}
+
+    def counted_head(p, size):
+        seen["head"].append(p.name)
+        return head_hash(p, size)
+
+    def counted_content(p):
+        seen["content"].append(p.name)
+        return content_hash(p)
+
+    monkeypatch.setattr(duplicates, "head_hash", counted_head)
+    monkeypatch.setattr(duplicates, "content_hash", counted_content)
+    return seen
+
+
+def test_small_file_is_not_read(db, tmp_path, calls):
+    finder = DuplicateFinder(db, min_size=10)
+    new = write(tmp_path / "new.txt", b"abc")
+    assert finder.stage(new, 3) == StagedHashes(None, None, None)
+    assert calls == {"head": [], "content": []}
+
+
+def test_unique_size_is_not_read(db, tmp_path, calls):
+    add_files(db, write(tmp_path / "old.txt", b"abcd"), size=4)
+    new = write(tmp_path / "new.txt", b"abc")
+    assert DuplicateFinder(db).stage(new, 3) == StagedHashes(None, None, None)
+    assert calls == {"head": [], "content": []}
+
+
+def test_copy_is_found_and_hashes_saved(db, tmp_path, calls):
+    old = write(tmp_path / "old.txt", b"same")
+    add_files(db, old, size=4)
+    new = write(tmp_path / "new.txt", b"same")
+    staged = DuplicateFinder(db).stage(new, 4)
+    assert staged == StagedHashes(head_hash(new, 4), content_hash(new), str(old))
+    db.flush()
+    # empreintes du fichier indexé enregistrées, celles du nouveau laissées à indexPath
+    assert db.query("SELECT headHash, contentHash FROM files;") == [
+        (staged.headHash, staged.contentHash)
+    ]
+
+
+def test_different_head_skips_full_hash(db, tmp_path, calls):
+    add_files(db, write(tmp_path / "old.txt", b"aaaa"), size=4)
+    new = write(tmp_path / "new.txt", b"bbbb")
+    staged = DuplicateFinder(db).stage(new, 4)
+    assert staged.contentHash is None and staged.source is None
+    assert calls["content"] == []
+
+
+def test_undescribed_files_are_ignored(db, tmp_path, calls):
+    add_files(db, write(tmp_path / "old.txt", b"same"), size=4, description=None)
+    new = write(tmp_path / "new.txt", b"same")
+    assert DuplicateFinder(db).stage(new, 4) == StagedHashes(None, None, None)
+
+
+def test_known_content_hash_is_not_read(db, tmp_path, calls):
+    old = write(tmp_path / "old.txt", b"same")
+    add_files(db, old, size=4)
+    db.updateHashes(old, None, content_hash(old))
+    new = write(tmp_path / "new.txt", b"same")
+    staged = DuplicateFinder(db).stage(new, 4, content_hash(new))
+    assert staged == StagedHashes(None, content_hash(new), str(old))
+    assert calls == {"head": [], "content": []}
+
+
+def test_missing_heads_are_capped(db, tmp_path, calls):
+    others = [write(tmp_path / f"old{n}.txt", b"diff%d" % n) for n in range(5)]
+    add_files(db, *others, size=5)
+    new = write(tmp_path / "new.txt", b"other")
+    DuplicateFinder(db, max_stage_heads=2).stage(new, 5)
+    # deux têtes d'autres fichiers, plus celle du nouveau
+    assert len(calls["head"]) == 3 and "new.txt" in calls["head"]
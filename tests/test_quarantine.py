@@ -0,0 +1,33 @@
+from filemind.fingerprint import Fingerprint
+from filemind.quarantine import QuarantineEntry, backoff
+
+FP = Fingerprint(10, 1000, 42)
+
+
+def entry(retryAt: int = 200) -> QuarantineEntry:
+    return QuarantineEntry("/r/a.pdf", "timeout", 2, FP, 0, 100, retryAt)
+
+
+def test_backoff_doubles_up_to_maximum():
+    assert [backoff(n, base=60, maximum=300) for n in (1, 2, 3, 4)] == [
+        60,
+        120,
+        240,
+        300,
+    ]
+
+
+def test_backoff_first_attempt_waits_base():
+    assert backoff(0, base=60) == backoff(1, base=60) == 60
+
+
+def test_blocks_until_retry():
+    assert entry().blocks(FP, now=150)
+    assert not entry().blocks(FP, now=200)
+
+
+def test_changed_file_is_retried_at_once():
+    assert not entry().blocks(FP._replace(mtimeNs=2000), now=150)
+    assert not entry().blocks(FP._replace(inode=43), now=150)
+    # seule l'empreinte stat compte
+    assert entry().blocks(FP._replace(contentHash="abc"), now=150)
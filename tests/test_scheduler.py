@@ -0,0 +1,68 @@
+from pathlib import Path
+
+from filemind.job_journal import JobJournal
+from filemind.scheduler import JobScheduler
+
+ROOT = "/r"
+
+
+def journaled(db) -> list[tuple[str, str, str]]:
+    db.flush()
+    return db.query("SELECT cls, kind, path FROM job_queue ORDER BY seq;")
+
+
+def test_task_done_acks(db):
+    q = JobScheduler([ROOT], journal=JobJournal(db))
+    q.put(("created", Path("/r/a.txt"), {}))
+    assert journaled(db) == [("live", "created", "/r/a.txt")]
+    assert q.get() == ("created", Path("/r/a.txt"), {})
+    q.task_done()
+    assert journaled(db) == []
+
+
+def test_unacked_jobs_are_replayed(db):
+    q = JobScheduler([ROOT], journal=JobJournal(db))
+    q.put(("created", Path("/r/a.txt"), {}))
+    q.put(("created", Path("/r/b.txt"), {}), backlog=True)
+    q.put(("deleted", Path("/r/c.txt"), {}))
+    q.get()  # distribué mais pas terminé : arrêt brutal, sans close()
+    db.flush()
+
+    q = JobScheduler([ROOT], journal=JobJournal(db))
+    assert q.seq == 4
+    replayed = [q.get() for _ in range(3)]
+    assert [(k, p.name) for k, p, _ in replayed] == [
+        ("deleted", "c.txt"),
+        ("created", "a.txt"),
+        ("created", "b.txt"),
+    ]
+
+
+def test_deferred_ack(db):
+    q = JobScheduler([ROOT], journal=JobJournal(db))
+    q.put(("modified", Path("/r/a.txt"), {}))
+    q.get()
+    ack = q.defer()
+    q.task_done()
+    assert journaled(db) == [("live", "modified", "/r/a.txt")]
+    ack()
+    assert journaled(db) == []
+
+
+def test_live_job_replaces_backlog_job(db):
+    q = JobScheduler([ROOT], journal=JobJournal(db))
+    q.put(("created", Path("/r/a.txt"), {}), backlog=True)
+    q.put(("modified", Path("/r/a.txt"), {}))
+    assert journaled(db) == [("live", "modified", "/r/a.txt")]
+    assert q.get() == ("modified", Path("/r/a.txt"), {})
+    q.task_done()
+    # le job du backlog remplacé n'est plus à faire
+    q.join()
+
+
+def test_no_defer_without_journal():
+    q = JobScheduler([ROOT])
+    q.put(("created", Path("/r/a.txt"), {}))
+    q.get()
+    assert q.defer() is None
+    q.task_done()
@@ -1,74 +1,207 @@
 # from __future__ import annotations
 from watchdog.observers import Observer
 from pathlib import Path
-import queue, sys, time
+import argparse, logging, threading, time
 
 from filemind.indexer import Indexer
+from filemind.logs import LOG_FORMAT, log, setupLogging
+from filemind.metrics import METRICS_HOST, metrics, serve
 from filemind.database import DatabaseService
-from filemind.handler import Handler, Job, Worker, should_ignore
-from filemind.vector_store import VectorStoreService
-
-# chemin de la base SQLite
-DB_PATH = "app.db"
-
-VECTOR_STORE_PATH = "vector_store.db"
+from filemind.duplicates import DuplicateFinder
+from filemind.handler import WATCHED_EVENTS, Handler, Worker
+from filemind.job_journal import JobJournal
+from filemind.quarantine import QuarantineService
+from filemind.reconcile import reconcile
+from filemind.rescan import Rescanner, emitter_alive, watch_overflows
+from filemind.scheduler import JobScheduler
+from filemind.vector_store import (
+    ANN_AUTO_MIN_VECTORS,
+    ANN_FACTORY,
+    VectorStoreService,
+)
+from filemind.embedding_batcher import EmbeddingBatcher
+from filemind.config import DB_PATH, VECTOR_STORE_PATH
+from filemind.extract.pool import EXTRACT_PROCESSES, ExtractionPool
+
+# intervalle (en secondes) entre deux affichages de l'état de la file
+STATS_EVERY_S = 60
 
 # nombre de threads pour traiter la file
-WORKERS = 4
-
-
-# -------------------- SCAN INITIAL --------------------
-def scan(root: Path, file: queue.Queue[Job]):
-    """
-    Scanne tout un dossier au démarrage pour indexer les fichiers déjà présents.
-    """
-    for p in root.rglob("*"):
-        if p.is_file() and not should_ignore(p):
-            file.put(("created", p, {}))
+# (assez pour occuper tous les processus d'extraction pendant les écritures/embeddings)
+WORKERS = max(4, 2 * EXTRACT_PROCESSES)
 
 
 # -------------------- LANCEUR PRINCIPAL --------------------
-def run_watch(paths: list[str]):
-
-    # files des fichiers a gerer
-    qjobs: queue.Queue[Job] = queue.Queue(maxsize=10000)
+def run_watch(
+    paths: list[str],
+    force: bool = False,
+    metrics_port: int = 0,
+    metrics_file: str | None = None,
+    ann_factory: str | None = ANN_FACTORY,
+):
+
+    # chemins absolus : mêmes clés pour la réconciliation et pour watchdog
+    paths = [str(Path(p).resolve()) for p in paths]
+
+    # métriques (GET http://127.0.0.1:<port>/metrics) et/ou fichier réécrit périodiquement
+    if metrics_port:
+        serve(metrics_port)
+        log("METRICS", url=f"http://{METRICS_HOST}:{metrics_port}/metrics")
 
     # service de la base de donnees
     db = DatabaseService.get_instance(db_path=DB_PATH)
 
-    # service de stockage de vecteurs
-    vector_store = VectorStoreService.get_instance(db_path=VECTOR_STORE_PATH)
+    # files des fichiers a gerer, par priorité puis par racine, journalisées dans la base
+    # (les jobs non terminés au dernier arrêt sont rejoués)
+    qjobs = JobScheduler(paths, journal=JobJournal(db))
+
+    # service de stockage de vecteurs (dans la même base)
+    vector_store = VectorStoreService.get_instance(db, ann_factory=ann_factory)
+    legacy = Path(VECTOR_STORE_PATH)
+    if legacy.exists():
+        log("MIGRATED", path=legacy, vectors=vector_store.importLegacy(legacy))
+        legacy.rename(legacy.with_name(legacy.name + ".migrated"))
+
+    # regroupement des embeddings de tous les workers en lots
+    embedder = EmbeddingBatcher(vector_store)
+    embedder.start()
+
+    # extraction des métadonnées et descriptions dans un pool de processus
+    extraction = ExtractionPool()
+
+    # fichiers dont l'extraction échoue (délais d'attente persistés dans la base)
+    quarantine = QuarantineService.get_instance(db)
+    log("QUARANTINE-COUNT", files=quarantine.count())
 
     # l'indexateur de fichier
-    indexer = Indexer(db, vector_store)
+    indexer = Indexer(
+        db,
+        vector_store,
+        embedder,
+        force=force,
+        extractor=extraction.extract,
+        quarantine=quarantine,
+        duplicates=DuplicateFinder(db),
+    )
 
     # Lance les threads de traitement
-    workers = [Worker(qjobs, indexer, name=f"worker-{i}") for i in range(WORKERS)]
+    # (threads démons : à l'arrêt, les jobs en attente restent dans le journal)
+    workers = [
+        Worker(qjobs, indexer, name=f"worker-{i}", daemon=True) for i in range(WORKERS)
+    ]
     for w in workers:
         w.start()
 
-    # Scan initial (avant de démarrer la surveillance)
-    for p in paths:
-        scan(Path(p), qjobs)
-
     # Démarre l'observateur watchdog
     obs = Observer()
     handler = Handler(qjobs)
-    for p in paths:
-        obs.schedule(handler, p, recursive=True)
-    obs.start()
 
-    print("[WATCHING]", ", ".join(paths))
+    def schedule(root: str):
+        return obs.schedule(handler, root, recursive=True, event_filter=WATCHED_EVENTS)
+
+    watches = {p: schedule(p) for p in paths}
+    watches_lock = threading.Lock()
+
+    def rewatch(root: str):
+        # nouvel émetteur : surveillances replacées sur tous les sous-dossiers actuels
+        with watches_lock:
+            try:
+                obs.unschedule(watches[root])
+            except Exception as e:
+                log("ERROR-REWATCH", logging.ERROR, root=root, error=repr(e))
+            watches[root] = schedule(root)
+
+    # événements perdus (file inotify pleine, émetteur arrêté) : rescans ciblés
+    rescanner = Rescanner(db, qjobs, paths, rewatch=rewatch)
+    rescanner.start()
+    watch_overflows(lambda root: rescanner.request(root, "overflow"))
+    obs.start()
+    # émetteurs arrêtés déjà signalés
+    lost_emitters = set()
+
+    # Réconciliation initiale en arrière-plan : seuls les fichiers nouveaux,
+    # modifiés ou disparus sont enfilés, en backlog derrière les événements en direct
+    threading.Thread(
+        target=reconcile,
+        args=([Path(p) for p in paths], db, qjobs),
+        kwargs={"force": force},
+        name="reconcile",
+        daemon=True,
+    ).start()
+
+    log("WATCHING", paths=", ".join(paths))
     try:
+        last_report = time.monotonic()
         while True:
             time.sleep(1)
+            for emitter in list(obs.emitters):
+                if not emitter_alive(emitter) and emitter not in lost_emitters:
+                    lost_emitters.add(emitter)
+                    rescanner.request(emitter.watch.path, "error")
+            if time.monotonic() - last_report >= STATS_EVERY_S:
+                last_report = time.monotonic()
+                log("QUEUE-STATS", report=qjobs.report())
+                if metrics_file:
+                    metrics.write(metrics_file)
     except KeyboardInterrupt:
-        print("\n[SHUTDOWN] waiting queue…")
+        log("SHUTDOWN", reason="waiting running jobs")
+        rescanner.stop()
         obs.stop()
         obs.join()
-        qjobs.join()
-        print("[BYE]")
+        handler.coalescer.flush()
+        log("QUEUE-PENDING", jobs=qjobs.close())
+        extraction.shutdown()
+        embedder.stop()
+        log("EMBEDDING-STATS", report=embedder.stats.report())
+        if vector_store.cache:
+            log("EMBEDDING-CACHE", report=vector_store.cache.report())
+        db.flush()
+        vector_store.saveIndex()
+        if metrics_file:
+            metrics.write(metrics_file)
+        log("BYE")
 
 
 if __name__ == "__main__":
-    run_watch(sys.argv[1:] or ["./temp"])
+    parser = argparse.ArgumentParser(
+        description="Indexe et surveille des dossiers avec FileMind."
+    )
+    parser.add_argument("paths", nargs="*", default=["./temp"])
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="réindexe tous les fichiers, même inchangés (nouveau modèle, nouvelle description)",
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        default=0,
+        help="expose les métriques au format Prometheus sur ce port local",
+    )
+    parser.add_argument(
+        "--metrics-file",
+        help=f"fichier où écrire les métriques (toutes les {STATS_EVERY_S:g} s et à l'arrêt)",
+    )
+    parser.add_argument(
+        "--ann",
+        default=ANN_FACTORY,
+        help=f"index approché : 'auto' (défaut : recherche exacte sous "
+        f"{ANN_AUTO_MIN_VECTORS} vecteurs, IVF au-delà), 'none' (toujours exacte) "
+        "ou une fabrique FAISS avec suppression (ex. IVF1024,SQ8)",
+    )
+    parser.add_argument("--log-level", default="INFO", help="niveau du journal")
+    parser.add_argument(
+        "--log-format",
+        choices=("kv", "json"),
+        default=LOG_FORMAT,
+        help="journal en clé=valeur ou en JSON (une ligne par événement)",
+    )
+    args = parser.parse_args()
+    setupLogging(args.log_level, args.log_format)
+    run_watch(
+        args.paths,
+        force=args.force,
+        metrics_port=args.metrics_port,
+        metrics_file=args.metrics_file,
+        ann_factory=None if args.ann == "none" else args.ann,
+    )